@@ -25,17 +25,21 @@ class Settings(BaseSettings):
     deepseek_api_key: str | None = None
     deepseek_base_url: str = "https://api.deepseek.com/v1"
     deepseek_model: str = "deepseek-chat"
+    deepseek_fast_model: str | None = None
     deepseek_embedding_model: str | None = None
 
     qwen_api_key: str | None = None
     qwen_base_url: str = "https://dashscope.aliyuncs.com/compatible-mode/v1"
     qwen_model: str = "qwen-plus"
+    # Optional cheaper model for high fan-out calls such as summary chunk summaries
+    qwen_fast_model: str | None = None
     qwen_embedding_model: str = "text-embedding-v4"
     dashscope_embedding_model: str = "qwen3-vl-embedding"
     dashscope_base_url: str | None = None  # If None, uses default. Set to "https://dashscope-intl.aliyuncs.com/api/v1" for international
 
     chunk_size: int = 1000
     chunk_overlap: int = 150
+    chunk_fast_splitter_enabled: bool = False
     index_text_cleanup_enabled: bool = True
     index_text_cleanup_mode: str = "conservative"
     index_text_cleanup_non_pdf_mode: str = "structure_preserving"
@@ -47,6 +51,7 @@ class Settings(BaseSettings):
     lexical_stopwords_kb_rel_path: str = "rag_storage/lexicon/stopwords.txt"
     lexical_userdict_kb_rel_path: str = "rag_storage/lexicon/userdict.txt"
     lexical_tokenizer_version: str = "v2"
+    text_encoding_detector: str = "auto"
     ocr_enabled: bool = True
     ocr_engine: str = "rapidocr"
     ocr_fallback_engines: str = "rapidocr,tesseract"
@@ -58,13 +63,19 @@ class Settings(BaseSettings):
     ocr_preprocess_enabled: bool = True
     ocr_deskew_enabled: bool = True
     ocr_low_confidence_threshold: float = 0.72
+    ocr_max_workers: int = 4
     pdf_parser_mode: str = "auto"
     pdf_layout_engine: str = "pymupdf"
+    pdf_legacy_backend: str = "pymupdf"
+    pdf_legacy_workers: int = 1
     pdf_garbled_ocr_enabled: bool = True
     pdf_garbled_ocr_force: bool = True
     pdf_garbled_ocr_min_len_ratio: float = 0.30
     pdf_garbled_single_char_line_ratio: float = 0.45
     pdf_garbled_short_line_ratio: float = 0.65
+    pdf_extraction_cache_enabled: bool = True
+    ingest_embedding_batch_size: int = 10
+    ingest_vector_batch_size: int = 250
 
     quiz_context_reconstruct_enabled: bool = True
     quiz_context_seed_k_multiplier: float = 2.0
@@ -23,8 +23,7 @@ def _build_default_metadata(kb_id: str) -> Dict[str, Any]:
 def load_kb_metadata(user_id: str, kb_id: str) -> Dict[str, Any]:
     ensure_kb_dirs(user_id, kb_id)
     path = _metadata_path(user_id, kb_id)
-    if not os.path.exists(path):
-        return _build_default_metadata(kb_id)
+    # A missing file lands in the except below; no separate exists() probe is needed.
     try:
         with open(path, "r", encoding="utf-8") as f:
             return json.load(f)
@@ -1,9 +1,14 @@
 from __future__ import annotations
 
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
 import dashscope
+import httpx
 from langchain_core.embeddings import Embeddings
 from langchain_openai import ChatOpenAI
-from openai import OpenAI
+from openai import DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
 
 from app.core.config import settings
 
@@ -14,6 +19,17 @@ EMBEDDING_AUTO_FALLBACK_PRIORITY = ("qwen", "dashscope")
 LEGACY_LLM_PROVIDERS = {"openai", "gemini"}
 LEGACY_EMBEDDING_PROVIDERS = {"openai", "gemini", "deepseek"}
 _UNCONFIGURED_PROVIDER = "unconfigured"
+_EMBEDDINGS_CACHE_MAX = 32
+# Embedding clients keyed by their full configuration, so every vectorstore shares one HTTP pool.
+# Keys include per-user API keys, so least recently used clients are evicted past the bound.
+_EMBEDDINGS_CACHE: OrderedDict[tuple[str | None, ...], Embeddings] = OrderedDict()
+# The multimodal endpoint embeds one text per request; overlap the round-trips.
+_DASHSCOPE_EMBED_WORKERS = 8
+# Chat calls arrive in bursts (map-step batches, chat turns) that are often further apart than
+# httpx's 5s idle expiry; one shared pool with a longer keepalive lets them reuse warm connections.
+_LLM_HTTP_LIMITS = httpx.Limits(max_connections=200, max_keepalive_connections=100, keepalive_expiry=30.0)
+_LLM_HTTP_CLIENT = DefaultHttpxClient(limits=_LLM_HTTP_LIMITS)
+_LLM_HTTP_ASYNC_CLIENT = DefaultAsyncHttpxClient(limits=_LLM_HTTP_LIMITS)
 
 
 class QwenEmbeddings(Embeddings):
@@ -62,27 +78,29 @@ class DashScopeVLEmbeddings(Embeddings):
             raise ValueError(f"DashScope embedding invalid: {resp}")
         return vector
 
+    def _embed_one(self, text: str) -> list[float]:
+        try:
+            resp = dashscope.MultiModalEmbedding.call(
+                model=self.model,
+                input=[{"text": str(text)}],
+            )
+        except Exception as exc:
+            error_msg = str(exc)
+            if "Failed to resolve" in error_msg or "No address associated" in error_msg:
+                raise ConnectionError(
+                    "DashScope DNS resolution failed. If you're outside China, set "
+                    "DASHSCOPE_BASE_URL=https://dashscope-intl.aliyuncs.com/api/v1 "
+                    f"or switch to EMBEDDING_PROVIDER=qwen. Error: {error_msg}"
+                ) from exc
+            raise ValueError(f"DashScope embedding API call failed: {error_msg}") from exc
+        return self._parse_response_vector(resp)
+
     def embed_documents(self, texts: list[str]) -> list[list[float]]:
         self._configure_client()
-        embeddings = []
-        for text in texts:
-            try:
-                resp = dashscope.MultiModalEmbedding.call(
-                    model=self.model,
-                    input=[{"text": str(text)}],
-                )
-            except Exception as exc:
-                error_msg = str(exc)
-                if "Failed to resolve" in error_msg or "No address associated" in error_msg:
-                    raise ConnectionError(
-                        "DashScope DNS resolution failed. If you're outside China, set "
-                        "DASHSCOPE_BASE_URL=https://dashscope-intl.aliyuncs.com/api/v1 "
-                        f"or switch to EMBEDDING_PROVIDER=qwen. Error: {error_msg}"
-                    ) from exc
-                raise ValueError(f"DashScope embedding API call failed: {error_msg}") from exc
-
-            embeddings.append(self._parse_response_vector(resp))
-        return embeddings
+        if len(texts) <= 1:
+            return [self._embed_one(text) for text in texts]
+        with ThreadPoolExecutor(max_workers=min(_DASHSCOPE_EMBED_WORKERS, len(texts))) as pool:
+            return list(pool.map(self._embed_one, texts))
 
     def embed_query(self, text: str) -> list[float]:
         return self.embed_documents([text])[0]
@@ -194,25 +212,52 @@ def embedding_provider_status(*, resolved_llm_provider: str | None = None) -> di
     }
 
 
-def get_llm(temperature: float = 0.2):
+def _chat_model(provider: str, tier: str) -> str:
+    model = getattr(settings, f"{provider}_model")
+    fast_model = getattr(settings, f"{provider}_fast_model")
+    if tier != "fast" or not fast_model:
+        return model
+    # The fast model is a deployment setting; a user's own endpoint may not serve it.
+    base_url_key = f"{provider}_base_url"
+    if getattr(settings, base_url_key) != object.__getattribute__(settings, base_url_key):
+        return model
+    return fast_model
+
+
+def get_llm(temperature: float = 0.2, *, tier: str = "quality"):
     provider, _, _ = resolve_llm_provider(strict=True)
     if provider == "deepseek":
         return ChatOpenAI(
             api_key=settings.deepseek_api_key,
             base_url=settings.deepseek_base_url,
-            model=settings.deepseek_model,
+            model=_chat_model(provider, tier),
             temperature=temperature,
+            http_client=_LLM_HTTP_CLIENT,
+            http_async_client=_LLM_HTTP_ASYNC_CLIENT,
         )
     if provider == "qwen":
         return ChatOpenAI(
             api_key=settings.qwen_api_key,
             base_url=settings.qwen_base_url,
-            model=settings.qwen_model,
+            model=_chat_model(provider, tier),
             temperature=temperature,
+            http_client=_LLM_HTTP_CLIENT,
+            http_async_client=_LLM_HTTP_ASYNC_CLIENT,
         )
     raise ValueError(f"Unsupported LLM provider: {provider}")
 
 
+def _cached_embeddings(key: tuple[str | None, ...], factory: Callable[[], Embeddings]) -> Embeddings:
+    embeddings = _EMBEDDINGS_CACHE.get(key)
+    if embeddings is None:
+        embeddings = factory()
+        _EMBEDDINGS_CACHE[key] = embeddings
+    _EMBEDDINGS_CACHE.move_to_end(key)
+    while len(_EMBEDDINGS_CACHE) > _EMBEDDINGS_CACHE_MAX:
+        _EMBEDDINGS_CACHE.popitem(last=False)
+    return embeddings
+
+
 def get_embeddings():
     llm_provider, _, _ = resolve_llm_provider(strict=False)
     if llm_provider == _UNCONFIGURED_PROVIDER:
@@ -222,15 +267,23 @@ def get_embeddings():
         resolved_llm_provider=llm_provider,
     )
     if provider == "qwen":
-        return QwenEmbeddings(
-            api_key=settings.qwen_api_key,
-            base_url=settings.qwen_base_url,
-            model=settings.qwen_embedding_model,
+        key = (provider, settings.qwen_api_key, settings.qwen_base_url, settings.qwen_embedding_model)
+        return _cached_embeddings(
+            key,
+            lambda: QwenEmbeddings(
+                api_key=settings.qwen_api_key,
+                base_url=settings.qwen_base_url,
+                model=settings.qwen_embedding_model,
+            ),
         )
     if provider == "dashscope":
-        return DashScopeVLEmbeddings(
-            api_key=settings.qwen_api_key,
-            model=settings.dashscope_embedding_model,
-            base_url=settings.dashscope_base_url,
+        key = (provider, settings.qwen_api_key, settings.dashscope_embedding_model, settings.dashscope_base_url)
+        return _cached_embeddings(
+            key,
+            lambda: DashScopeVLEmbeddings(
+                api_key=settings.qwen_api_key,
+                model=settings.dashscope_embedding_model,
+                base_url=settings.dashscope_base_url,
+            ),
         )
     raise ValueError(f"Unsupported embedding provider: {provider}")
@@ -2,6 +2,9 @@ import os
 
 from app.core.config import settings
 
+# Base directories whose subdirectories are known to exist; skips repeated makedirs syscalls.
+_ENSURED_DIRS: set[str] = set()
+
 
 def user_base_dir(user_id: str) -> str:
     return os.path.join(settings.data_dir, "users", user_id)
@@ -17,11 +20,21 @@ def ensure_data_dirs():
 
 def ensure_user_dirs(user_id: str):
     base = user_base_dir(user_id)
+    if base in _ENSURED_DIRS:
+        return
     for name in ("uploads", "text", "chroma", "lexical", "kb"):
         os.makedirs(os.path.join(base, name), exist_ok=True)
+    _ENSURED_DIRS.add(base)
 
 
 def ensure_kb_dirs(user_id: str, kb_id: str):
     base = kb_base_dir(user_id, kb_id)
+    if base in _ENSURED_DIRS:
+        return
     for name in ("raw", "content_list", "rag_storage"):
         os.makedirs(os.path.join(base, name), exist_ok=True)
+    _ENSURED_DIRS.add(base)
+
+
+def forget_kb_dirs(user_id: str, kb_id: str):
+    _ENSURED_DIRS.discard(kb_base_dir(user_id, kb_id))
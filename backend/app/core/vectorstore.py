@@ -103,7 +103,8 @@ def get_doc_vector_entries(user_id: str, doc_id: str) -> list[dict[str, Any]]:
             {
                 "id": row_id if isinstance(row_id, str) else None,
                 "content": content,
-                "metadata": dict(metadata or {}),
+                # Chroma hands back fresh dicts for every get(); no defensive copy is needed.
+                "metadata": metadata if isinstance(metadata, dict) else dict(metadata or {}),
             }
         )
 
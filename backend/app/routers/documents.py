@@ -2,6 +2,7 @@ import hashlib
 import glob
 import os
 import shutil
+from typing import Callable
 from uuid import uuid4
 import re
 
@@ -57,6 +58,7 @@ from app.services.layout_sidecar import (
     resolve_block_id,
     should_skip_text_sidecar_preview,
 )
+from app.services.text_extraction import remove_pdf_extraction_cache
 from app.services.text_noise_guard import clean_fragment, infer_format_hint, is_low_quality
 from app.utils.document_validator import DocumentValidator
 from app.utils.pagination import normalize_page_args
@@ -227,6 +229,16 @@ def _find_raw_candidates(user_id: str, kb_id: str | None, doc_id: str) -> list[s
     return sorted(glob.glob(os.path.join(raw_dir, f"{doc_id}_*")))
 
 
+def _find_raw_path(user_id: str, kb_id: str | None, doc_id: str, filename: str) -> str | None:
+    if not kb_id:
+        return None
+    # Uploads are stored as "{doc_id}_{filename}"; only scan the raw dir when that file is gone (e.g. after a rename).
+    expected = os.path.join(kb_base_dir(user_id, kb_id), "raw", f"{doc_id}_{filename}")
+    if os.path.isfile(expected):
+        return expected
+    return _pick_raw_path(_find_raw_candidates(user_id, kb_id, doc_id), filename)
+
+
 def _pick_raw_path(candidates: list[str], filename: str) -> str | None:
     if not candidates:
         return None
@@ -246,17 +258,23 @@ def _normalize_int(value) -> int | None:
         return None
 
 
-def _contains_query(text: str, query: str) -> bool:
+def _query_matcher(query: str) -> Callable[[str], bool]:
+    # Lower and split the query once; the preview scans every vector entry of the document with it.
     if not query:
-        return True
-    text_l = text.lower()
+        return lambda _text: True
     query_l = query.lower()
-    if query_l in text_l:
-        return True
     tokens = [t for t in re.split(r"\s+", query_l) if len(t) >= 2]
-    if not tokens:
-        return False
-    return sum(1 for token in tokens if token in text_l) >= max(1, len(tokens) // 2)
+    required = max(1, len(tokens) // 2)
+
+    def _matches(text: str) -> bool:
+        text_l = text.lower()
+        if query_l in text_l:
+            return True
+        if not tokens:
+            return False
+        return sum(1 for token in tokens if token in text_l) >= required
+
+    return _matches
 
 
 def _clean_preview_snippet(
@@ -288,6 +306,7 @@ def _build_source_preview(
     target_page = _normalize_int(page)
     target_chunk = _normalize_int(chunk)
     sidecar = load_layout_sidecar(doc.user_id, doc.kb_id, doc.id)
+    matches_query = _query_matcher(query_text)
 
     selected_entry: dict | None = None
     matched_by = "fallback"
@@ -296,7 +315,7 @@ def _build_source_preview(
         for entry in vector_entries:
             meta = entry.get("metadata") or {}
             if resolve_block_id(meta, sidecar) == target_block_id:
-                if not query_text or _contains_query(entry.get("content", ""), query_text):
+                if matches_query(entry.get("content", "")):
                     selected_entry = entry
                     matched_by = "block_id"
                     break
@@ -305,7 +324,7 @@ def _build_source_preview(
         for entry in vector_entries:
             meta = entry.get("metadata") or {}
             if _normalize_int(meta.get("chunk")) == target_chunk:
-                if not query_text or _contains_query(entry.get("content", ""), query_text):
+                if matches_query(entry.get("content", "")):
                     selected_entry = entry
                     matched_by = "chunk"
                     break
@@ -316,7 +335,7 @@ def _build_source_preview(
                 entry
                 for entry in vector_entries
                 if _normalize_int((entry.get("metadata") or {}).get("page")) == target_page
-                and (not query_text or _contains_query(entry.get("content", ""), query_text))
+                and matches_query(entry.get("content", ""))
             ),
             None,
         )
@@ -328,7 +347,7 @@ def _build_source_preview(
             (
                 entry
                 for entry in vector_entries
-                if _contains_query(entry.get("content", ""), query_text)
+                if matches_query(entry.get("content", ""))
             ),
             None,
         )
@@ -393,8 +412,7 @@ def _queue_doc_reprocess(
     if not doc.kb_id:
         return False, "Document has no knowledge base"
 
-    raw_candidates = _find_raw_candidates(resolved_user_id, doc.kb_id, doc.id)
-    file_path = _pick_raw_path(raw_candidates, doc.filename)
+    file_path = _find_raw_path(resolved_user_id, doc.kb_id, doc.id, doc.filename)
     if not file_path:
         return False, "Original file not found, reprocess is unavailable"
 
@@ -422,10 +440,20 @@ def _queue_doc_reprocess(
         file_path,
         doc.filename,
         doc.file_hash or "",
+        refresh_cache=True,
     )
     return True, None
 
 
+def _release_pdf_extraction_cache(db: Session, file_hash: str | None) -> None:
+    # The extraction cache is shared by content hash, so keep it while any document still uses it.
+    if not file_hash:
+        return
+    if db.query(Document.id).filter(Document.file_hash == file_hash).first():
+        return
+    remove_pdf_extraction_cache(file_hash)
+
+
 def _delete_doc_records(db: Session, doc: Document) -> None:
     quiz_ids = [row[0] for row in db.query(Quiz.id).filter(Quiz.doc_id == doc.id).all()]
     if quiz_ids:
@@ -482,8 +510,10 @@ def delete_doc(doc_id: str, user_id: str | None = None, db: Session = Depends(ge
     if doc.kb_id:
         remove_file_hash(resolved_user_id, doc.kb_id, doc.filename)
 
+    file_hash = doc.file_hash
     _delete_doc_records(db, doc)
     db.commit()
+    _release_pdf_extraction_cache(db, file_hash)
     return {"doc_id": doc_id, "deleted": True}
 
 
@@ -634,13 +664,8 @@ def preview_doc_source(
 ):
     resolved_user_id = ensure_user(db, user_id)
     doc = _get_doc_or_404(db, resolved_user_id, doc_id)
+    # Entries already come back ordered by (page, chunk).
     vector_entries = get_doc_vector_entries(resolved_user_id, doc_id)
-    vector_entries.sort(
-        key=lambda entry: (
-            _normalize_int((entry.get("metadata") or {}).get("page")) or 0,
-            _normalize_int((entry.get("metadata") or {}).get("chunk")) or 0,
-        )
-    )
     preview = _build_source_preview(
         doc,
         vector_entries,
@@ -8,7 +8,7 @@ from sqlalchemy.orm import Session
 from app.core.knowledge_bases import ensure_default_kb
 from app.core.kb_metadata import init_kb_metadata
 from app.core.kb_metadata import remove_file_hash
-from app.core.paths import ensure_kb_dirs, kb_base_dir, user_base_dir
+from app.core.paths import ensure_kb_dirs, forget_kb_dirs, kb_base_dir, user_base_dir
 from app.core.vectorstore import delete_doc_vectors
 from app.core.users import ensure_user
 from app.db import get_db
@@ -31,6 +31,7 @@ from app.schemas import (
     KnowledgeBaseUpdateRequest,
 )
 from app.services.lexical import remove_doc_chunks
+from app.services.text_extraction import remove_pdf_extraction_cache
 
 router = APIRouter()
 	
@@ -150,6 +151,7 @@ def delete_kb(
         )
 
     doc_ids = [doc.id for doc in docs]
+    file_hashes = {doc.file_hash for doc in docs if doc.file_hash}
 
     for doc in docs:
         delete_doc_vectors(resolved_user_id, doc.id)
@@ -240,8 +242,13 @@ def delete_kb(
     kb_dir = kb_base_dir(resolved_user_id, kb.id)
     if os.path.exists(kb_dir):
         shutil.rmtree(kb_dir, ignore_errors=True)
+    forget_kb_dirs(resolved_user_id, kb.id)
     lexical_path = os.path.join(user_base_dir(resolved_user_id), "lexical", f"{kb.id}.jsonl")
     if os.path.exists(lexical_path):
         os.remove(lexical_path)
+    # Cached PDF extractions are keyed by content hash and may still back documents elsewhere.
+    for file_hash in file_hashes:
+        if not db.query(Document.id).filter(Document.file_hash == file_hash).first():
+            remove_pdf_extraction_cache(file_hash)
 
     return {"kb_id": kb_id, "deleted": True, "cascade": cascade}
@@ -1,3 +1,4 @@
+import heapq
 import logging
 import time
 from collections import defaultdict
@@ -605,8 +606,7 @@ def get_recommendations(
             )
         )
 
-    ranked_items.sort(key=lambda row: (row[0], row[1]), reverse=True)
-    items = [row[2] for row in ranked_items[:limit]]
+    items = [row[2] for row in heapq.nlargest(limit, ranked_items, key=lambda row: (row[0], row[1]))]
 
     next_step = None
     if items and items[0].primary_action:
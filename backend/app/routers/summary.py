@@ -1,25 +1,34 @@
 import json
+import logging
 from uuid import uuid4
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.core.users import ensure_user
 from app.db import get_db
 from app.models import Document, SummaryRecord
 from app.schemas import SummaryRequest, SummaryResponse
-from app.services.summary import summarize_text
+from app.services.summary import stream_summary_text, summarize_text
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
+_SUMMARY_FAILED_DETAIL = "Summary generation failed. Check LLM output or model settings."
+
+
+def _normalize_summary(value):
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False)
 
-@router.post("/summary", response_model=SummaryResponse)
-async def generate_summary(payload: SummaryRequest, db: Session = Depends(get_db)):
-    def _normalize_summary(value):
-        if isinstance(value, str):
-            return value
-        return json.dumps(value, ensure_ascii=False)
 
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _resolve_summary_doc(payload: SummaryRequest, db: Session) -> tuple[str, Document]:
     resolved_user_id = ensure_user(db, payload.user_id)
     doc = db.query(Document).filter(Document.id == payload.doc_id).first()
     if not doc:
@@ -28,41 +37,93 @@ async def generate_summary(payload: SummaryRequest, db: Session = Depends(get_db
         raise HTTPException(status_code=404, detail="Document not found")
     if doc.status != "ready":
         raise HTTPException(status_code=409, detail="Document is still processing")
+    return resolved_user_id, doc
 
-    if not payload.force:
-        cached = (
-            db.query(SummaryRecord)
-            .filter(
-                SummaryRecord.doc_id == payload.doc_id,
-                SummaryRecord.user_id == resolved_user_id,
-            )
-            .order_by(SummaryRecord.created_at.desc())
-            .first()
+
+def _latest_cached_summary(payload: SummaryRequest, db: Session, user_id: str) -> str | None:
+    if payload.force:
+        return None
+    cached = (
+        db.query(SummaryRecord)
+        .filter(
+            SummaryRecord.doc_id == payload.doc_id,
+            SummaryRecord.user_id == user_id,
         )
-        if cached:
-            return SummaryResponse(
-                doc_id=doc.id,
-                summary=_normalize_summary(cached.summary_text),
-                cached=True,
-            )
+        .order_by(SummaryRecord.created_at.desc())
+        .first()
+    )
+    return _normalize_summary(cached.summary_text) if cached else None
 
+
+def _read_doc_text(doc: Document) -> str:
     with open(doc.text_path, "r", encoding="utf-8", errors="ignore") as f:
-        text = f.read()
+        return f.read()
 
-    try:
-        summary = await summarize_text(text)
-    except Exception as exc:
-        raise HTTPException(
-            status_code=500,
-            detail="Summary generation failed. Check LLM output or model settings.",
-        ) from exc
-    summary = _normalize_summary(summary)
+
+def _save_summary(db: Session, user_id: str, doc_id: str, summary: str) -> None:
     record = SummaryRecord(
         id=str(uuid4()),
-        user_id=resolved_user_id,
-        doc_id=doc.id,
+        user_id=user_id,
+        doc_id=doc_id,
         summary_text=summary,
     )
     db.add(record)
     db.commit()
+
+
+@router.post("/summary", response_model=SummaryResponse)
+async def generate_summary(payload: SummaryRequest, db: Session = Depends(get_db)):
+    resolved_user_id, doc = _resolve_summary_doc(payload, db)
+    cached = _latest_cached_summary(payload, db, resolved_user_id)
+    if cached is not None:
+        return SummaryResponse(doc_id=doc.id, summary=cached, cached=True)
+
+    text = _read_doc_text(doc)
+
+    try:
+        summary = await summarize_text(text)
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=_SUMMARY_FAILED_DETAIL) from exc
+    summary = _normalize_summary(summary)
+    _save_summary(db, resolved_user_id, doc.id, summary)
     return SummaryResponse(doc_id=doc.id, summary=summary, cached=False)
+
+
+@router.post("/summary/stream")
+async def generate_summary_stream(payload: SummaryRequest, db: Session = Depends(get_db)):
+    # Validation errors surface as plain HTTP errors before the event stream starts.
+    resolved_user_id, doc = _resolve_summary_doc(payload, db)
+    cached = _latest_cached_summary(payload, db, resolved_user_id)
+
+    async def event_iter():
+        if cached is not None:
+            yield _sse_event("done", {"doc_id": doc.id, "summary": cached, "cached": True})
+            return
+        yield _sse_event("status", {"stage": "generating", "message": "正在生成摘要..."})
+        parts: list[str] = []
+        try:
+            async for delta in stream_summary_text(_read_doc_text(doc)):
+                parts.append(delta)
+                yield _sse_event("chunk", {"delta": delta})
+            summary = "".join(parts).strip()
+            _save_summary(db, resolved_user_id, doc.id, summary)
+        except Exception:
+            if db.in_transaction():
+                db.rollback()
+            logger.exception("Summary stream failed")
+            yield _sse_event(
+                "error",
+                {"code": "generation_failed", "message": _SUMMARY_FAILED_DETAIL, "retryable": True},
+            )
+            return
+        yield _sse_event("done", {"doc_id": doc.id, "summary": summary, "cached": False})
+
+    return StreamingResponse(
+        event_iter(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        },
+    )
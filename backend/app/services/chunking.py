@@ -3,21 +3,23 @@ from __future__ import annotations
 import json
 import logging
 import re
+from collections import Counter
 from dataclasses import dataclass, field
 from typing import Any
 
 from langchain_core.documents import Document as LCDocument
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_text_splitters import RecursiveCharacterTextSplitter, TextSplitter
 
 from app.core.config import settings
 from app.services.index_text_cleaning import clean_text_for_indexing_with_stats
-from app.services.text_noise_guard import clean_fragment
+from app.services.text_noise_guard import clean_fragment, visible_chars
 from app.services.text_extraction import ExtractionResult
 
 
 CHINESE_SEPARATORS = ["\n\n", "\n", "。", "！", "？", "；", "，", " ", ""]
 logger = logging.getLogger(__name__)
 _PDF_PAGE_NUMBER_LINE_RE = re.compile(r"^(第?\s*\d{1,4}\s*页?|[0-9]{1,4})$")
+_OVERLAP_BOUNDARY_RE = re.compile(r"[\s。！？；，]")
 
 
 @dataclass
@@ -34,13 +36,29 @@ class _BufferedTextSegment:
     block_ids: list[str]
     order_hint: int = 0
     meta_extra: dict[str, Any] = field(default_factory=dict)
+    # Length of "\n\n".join(pieces), maintained incrementally by add_piece.
+    joined_len: int = 0
+
+    def add_piece(self, piece: str) -> None:
+        self.joined_len += len(piece) + (2 if self.pieces else 0)
+        self.pieces.append(piece)
 
     def text(self) -> str:
         return "\n\n".join([p for p in self.pieces if p]).strip()
 
 
-def _splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
-    return RecursiveCharacterTextSplitter(
+class _RecursiveTextSplitter(RecursiveCharacterTextSplitter):
+    def split_text(self, text: str) -> list[str]:
+        # Most pages and flushed layout segments already fit in one chunk, and the separator
+        # recursion would hand them back unchanged apart from stripping.
+        if len(text) <= self._chunk_size:
+            stripped = text.strip()
+            return [stripped] if stripped else []
+        return super().split_text(text)
+
+
+def _recursive_splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    return _RecursiveTextSplitter(
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
         separators=CHINESE_SEPARATORS,
@@ -48,6 +66,56 @@ def _splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSpli
     )
 
 
+class _ParagraphMergeSplitter(TextSplitter):
+    """Split on blank lines with one str.split, greedily merge paragraphs, recurse only into oversized ones."""
+
+    def __init__(self, chunk_size: int, chunk_overlap: int) -> None:
+        super().__init__(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        self._fallback = _recursive_splitter(chunk_size, chunk_overlap)
+
+    def _overlap_tail(self, chunk: str) -> str:
+        if self._chunk_overlap <= 0:
+            return ""
+        tail = chunk[-self._chunk_overlap :]
+        if len(tail) < len(chunk):
+            # Start the carried text on a separator so it does not open mid-word.
+            match = _OVERLAP_BOUNDARY_RE.search(tail)
+            if match and match.end() < len(tail):
+                tail = tail[match.end() :]
+        return tail.strip()
+
+    def split_text(self, text: str) -> list[str]:
+        chunks: list[str] = []
+        pending: list[str] = []
+        for paragraph in text.split("\n\n"):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            if len(paragraph) <= self._chunk_size:
+                # _merge_splits overlaps chunks inside one run; the first chunk after an
+                # oversized paragraph takes its overlap from the fallback output instead.
+                if not pending and chunks:
+                    tail = self._overlap_tail(chunks[-1])
+                    if tail and len(tail) + 2 + len(paragraph) <= self._chunk_size:
+                        pending.append(tail)
+                pending.append(paragraph)
+                continue
+            if pending:
+                chunks.extend(self._merge_splits(pending, "\n\n"))
+                pending = []
+            tail = self._overlap_tail(chunks[-1]) if chunks else ""
+            chunks.extend(self._fallback.split_text(f"{tail} {paragraph}" if tail else paragraph))
+        if pending:
+            chunks.extend(self._merge_splits(pending, "\n\n"))
+        return chunks
+
+
+def _splitter(chunk_size: int, chunk_overlap: int) -> TextSplitter:
+    if bool(getattr(settings, "chunk_fast_splitter_enabled", False)):
+        return _ParagraphMergeSplitter(chunk_size, chunk_overlap)
+    return _recursive_splitter(chunk_size, chunk_overlap)
+
+
 def _safe_json(value: Any) -> str:
     try:
         return json.dumps(value, ensure_ascii=False)
@@ -67,13 +135,11 @@ def _doc_base_metadata(doc_id: str, kb_id: str, filename: str, page: int | None)
 
 
 def _visible_len(text: str) -> int:
-    return len("".join(ch for ch in str(text or "") if not ch.isspace()))
+    return len(visible_chars(str(text or "")))
 
 
 def _normalize_edge_key(text: str) -> str:
-    normalized = str(text or "").strip().lower()
-    normalized = re.sub(r"\s+", "", normalized)
-    return normalized
+    return visible_chars(str(text or "").lower())
 
 
 def _extract_edge_lines(page_text: str) -> tuple[str, str]:
@@ -98,16 +164,15 @@ def _is_repeated_edge_candidate(line: str) -> bool:
 
 
 def _build_pdf_repeated_edge_keys(pages: list[str]) -> set[str]:
-    counts: dict[str, int] = {}
+    counts: Counter[str] = Counter()
     for page_text in pages or []:
         top, bottom = _extract_edge_lines(page_text)
         for line in {top, bottom}:
             if not _is_repeated_edge_candidate(line):
                 continue
             key = _normalize_edge_key(line)
-            if not key:
-                continue
-            counts[key] = counts.get(key, 0) + 1
+            if key:
+                counts[key] += 1
     return {key for key, count in counts.items() if count >= 2}
 
 
@@ -233,7 +298,7 @@ def _make_text_docs_from_segment(
     *,
     meta: dict[str, Any],
     block_ids: list[str],
-    splitter: RecursiveCharacterTextSplitter,
+    splitter: TextSplitter,
     order_hint: int | None = None,
     enable_cleanup: bool = False,
     format_hint: str | None = None,
@@ -246,18 +311,31 @@ def _make_text_docs_from_segment(
     )
     if not text:
         return []
-    docs = splitter.create_documents([text])
-    out: list[LCDocument] = []
-    for idx, d in enumerate(docs, start=1):
-        md = dict(meta)
-        md["modality"] = "text"
-        md["chunk_kind"] = "text"
-        md["block_ids"] = _safe_json(block_ids)
-        if order_hint is not None:
-            base = int(order_hint)
-            md["_order_hint"] = base * 1000 + idx
-        out.append(LCDocument(page_content=d.page_content, metadata=md))
-    return out
+    # Shared fields are resolved once; each chunk still gets its own metadata dict.
+    chunk_meta = dict(meta, modality="text", chunk_kind="text", block_ids=_safe_json(block_ids))
+    chunks = splitter.split_text(text)
+    if order_hint is None:
+        return [LCDocument(page_content=chunk, metadata=dict(chunk_meta)) for chunk in chunks]
+    base = int(order_hint) * 1000
+    return [
+        LCDocument(page_content=chunk, metadata=dict(chunk_meta, _order_hint=base + idx))
+        for idx, chunk in enumerate(chunks, start=1)
+    ]
+
+
+def _split_text_docs(
+    text: str,
+    *,
+    meta: dict[str, Any],
+    splitter: TextSplitter,
+) -> list[LCDocument]:
+    if not text:
+        return []
+    chunk_meta = dict(meta, modality="text", chunk_kind="text")
+    return [
+        LCDocument(page_content=chunk, metadata=dict(chunk_meta, _order_hint=local_idx))
+        for local_idx, chunk in enumerate(splitter.split_text(text), start=1)
+    ]
 
 
 def _flush_text_segment(
@@ -267,7 +345,7 @@ def _flush_text_segment(
     doc_id: str,
     kb_id: str,
     filename: str,
-    splitter: RecursiveCharacterTextSplitter,
+    splitter: TextSplitter,
     enable_cleanup: bool,
     format_hint: str | None = None,
 ) -> _BufferedTextSegment | None:
@@ -367,11 +445,11 @@ def build_chunked_documents(
                                 "ocr_override": False,
                             },
                         )
-                    buffer.pieces.append(text)
+                    buffer.add_piece(text)
                     block_id = getattr(block, "block_id", None)
                     if block_id:
                         buffer.block_ids.append(block_id)
-                    if len("\n\n".join(buffer.pieces)) >= chunk_size:
+                    if buffer.joined_len >= chunk_size:
                         buffer = _flush_text_segment(
                             buffer,
                             out=text_docs,
@@ -414,21 +492,7 @@ def build_chunked_documents(
                     enable_cleanup=True,
                     format_hint=suffix,
                 )
-                if not cleaned_page_text:
-                    continue
-                docs = splitter.create_documents([cleaned_page_text])
-                for local_idx, d in enumerate(docs, start=1):
-                    text_docs.append(
-                        LCDocument(
-                            page_content=d.page_content,
-                            metadata={
-                                **meta,
-                                "modality": "text",
-                                "chunk_kind": "text",
-                                "_order_hint": local_idx,
-                            },
-                        )
-                    )
+                text_docs.extend(_split_text_docs(cleaned_page_text, meta=meta, splitter=splitter))
         else:
             meta = {
                 "doc_id": doc_id,
@@ -441,22 +505,7 @@ def build_chunked_documents(
                 enable_cleanup=True,
                 format_hint=suffix,
             )
-            if not cleaned_text:
-                docs = []
-            else:
-                docs = splitter.create_documents([cleaned_text])
-            for local_idx, d in enumerate(docs, start=1):
-                text_docs.append(
-                    LCDocument(
-                        page_content=d.page_content,
-                        metadata={
-                            **meta,
-                            "modality": "text",
-                            "chunk_kind": "text",
-                            "_order_hint": local_idx,
-                        },
-                    )
-                )
+            text_docs.extend(_split_text_docs(cleaned_text, meta=meta, splitter=splitter))
 
     if removed_pdf_edge_lines_total > 0:
         logger.info(
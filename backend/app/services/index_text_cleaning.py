@@ -8,6 +8,16 @@ from app.services.text_noise_guard import clean_fragment_with_stats
 
 _CHINESE_CHAR_RE = re.compile(r"[\u4e00-\u9fff]")
 _PINYIN_PAIR_RE = re.compile(r"([\u4e00-\u9fff])([A-Za-z]{1,8})")
+_ASCII_TO_CHINESE_PUNCT = {
+    ",": "，",
+    ".": "。",
+    ";": "；",
+    ":": "：",
+    "!": "！",
+    "?": "？",
+}
+# Full-width replacements never satisfy the look-arounds, so one pass matches the old per-mark passes.
+_CHINESE_CONTEXT_ASCII_PUNCT_RE = re.compile(r"(?<=[\u4e00-\u9fff])[,.;:!?](?=$|[\s”’」』】）)])")
 
 
 def _normalize_text(text: str) -> str:
@@ -87,22 +97,10 @@ def _merge_short_lines(text: str) -> tuple[str, int]:
 
 
 def _normalize_chinese_context_ascii_punct(text: str) -> str:
-    normalized = str(text or "")
-    punct_map = {
-        ",": "，",
-        ".": "。",
-        ";": "；",
-        ":": "：",
-        "!": "！",
-        "?": "？",
-    }
-    for ascii_punct, zh_punct in punct_map.items():
-        normalized = re.sub(
-            rf"(?<=[\u4e00-\u9fff]){re.escape(ascii_punct)}(?=$|[\s”’」』】）)])",
-            zh_punct,
-            normalized,
-        )
-    return normalized
+    return _CHINESE_CONTEXT_ASCII_PUNCT_RE.sub(
+        lambda match: _ASCII_TO_CHINESE_PUNCT[match.group(0)],
+        str(text or ""),
+    )
 
 
 def clean_text_for_indexing_with_stats(
@@ -1,17 +1,49 @@
-import json
+import contextvars
 import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from typing import Tuple
 
+from langchain_core.documents import Document
+
 from app.core.config import settings
 from app.core.paths import ensure_user_dirs, kb_base_dir, user_base_dir
 from app.core.vectorstore import get_vectorstore
 from app.services.chunking import build_chunked_documents
-from app.services.lexical import append_lexical_chunks
+from app.services.lexical import append_lexical_chunks, remove_doc_chunks
 from app.services.text_extraction import extract_text
+from app.utils.json_tools import dumps_json_bytes
 
 SUPPORTED_TYPES = {".pdf", ".txt", ".md", ".docx", ".pptx"}
 
 
+def _index_dense_docs(vectorstore, docs: list[Document]) -> None:
+    embed_batch = max(1, int(settings.ingest_embedding_batch_size or 1))
+    collection = getattr(vectorstore, "_collection", None)
+    embeddings = getattr(vectorstore, "embeddings", None)
+    if len(docs) <= embed_batch or collection is None or embeddings is None:
+        vectorstore.add_documents(docs)
+        return
+
+    # Embed in provider-sized requests, then write straight to the collection in
+    # store-sized upserts instead of letting one oversized call hit either limit.
+    texts = [doc.page_content for doc in docs]
+    vectors: list[list[float]] = []
+    for start in range(0, len(texts), embed_batch):
+        vectors.extend(embeddings.embed_documents(texts[start : start + embed_batch]))
+
+    store_batch = max(1, int(settings.ingest_vector_batch_size or 1))
+    for start in range(0, len(docs), store_batch):
+        end = start + store_batch
+        batch_docs = docs[start:end]
+        collection.upsert(
+            ids=[doc.id or str(uuid.uuid4()) for doc in batch_docs],
+            embeddings=vectors[start:end],
+            documents=texts[start:end],
+            metadatas=[doc.metadata for doc in batch_docs],
+        )
+
+
 def _layout_sidecar_path(user_id: str, kb_id: str, doc_id: str) -> str:
     return os.path.join(kb_base_dir(user_id, kb_id), "content_list", f"{doc_id}.layout.json")
 
@@ -33,24 +65,41 @@ def _write_layout_sidecar(
     payload.setdefault("page_count", int(getattr(extraction, "page_count", 0) or 0))
     payload.setdefault("parser", "layout")
     payload["chunk_manifest"] = chunk_manifest
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(payload, f, ensure_ascii=False, indent=2)
+    with open(path, "wb") as f:
+        f.write(dumps_json_bytes(payload, indent=True))
 
 
 def ingest_document(
-    file_path: str, filename: str, doc_id: str, user_id: str, kb_id: str
+    file_path: str,
+    filename: str,
+    doc_id: str,
+    user_id: str,
+    kb_id: str,
+    *,
+    file_hash: str | None = None,
+    refresh_cache: bool = False,
 ) -> Tuple[str, int, int, int]:
     suffix = os.path.splitext(filename)[1].lower()
     if suffix not in SUPPORTED_TYPES:
         raise ValueError("Unsupported file type")
 
-    extraction = extract_text(file_path, suffix, user_id=user_id, kb_id=kb_id, doc_id=doc_id)
+    # The upload already hashed the raw bytes; reuse it so the extraction cache need not reread the file.
+    extraction = extract_text(
+        file_path,
+        suffix,
+        user_id=user_id,
+        kb_id=kb_id,
+        doc_id=doc_id,
+        file_hash=file_hash,
+        refresh_cache=refresh_cache,
+    )
     text = (extraction.text or "").strip()
 
     ensure_user_dirs(user_id)
     text_path = os.path.join(user_base_dir(user_id), "text", f"{doc_id}.txt")
-    with open(text_path, "w", encoding="utf-8") as f:
-        f.write(text)
+    # One encoded blob, one write: no incremental encoder or text-layer flushes for multi-MB documents.
+    with open(text_path, "wb") as f:
+        f.write(text.encode("utf-8"))
 
     chunk_size = max(200, settings.chunk_size)
     chunk_overlap = max(0, min(settings.chunk_overlap, chunk_size - 1))
@@ -71,9 +120,21 @@ def ingest_document(
         raise ValueError("No text extracted from file")
 
     vectorstore = get_vectorstore(user_id)
-    vectorstore.add_documents(text_docs)
+    # Dense indexing mostly waits on embedding requests while the lexical index is local
+    # tokenization and disk work, so the two run side by side. The worker copies the
+    # context so per-user runtime settings still apply to tokenization.
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        lexical_future = pool.submit(
+            contextvars.copy_context().run, append_lexical_chunks, user_id, kb_id, text_docs
+        )
+        try:
+            _index_dense_docs(vectorstore, text_docs)
+        except Exception:
+            if lexical_future.exception() is None:
+                remove_doc_chunks(user_id, kb_id, doc_id)
+            raise
+        lexical_future.result()
 
-    append_lexical_chunks(user_id, kb_id, text_docs)
     _write_layout_sidecar(
         user_id=user_id,
         kb_id=kb_id,
@@ -17,6 +17,7 @@ def process_document_task(
     file_path: str,
     filename: str,
     file_hash: str,
+    refresh_cache: bool = False,
 ) -> None:
     db: Session = SessionLocal()
     try:
@@ -27,7 +28,13 @@ def process_document_task(
 
         try:
             text_path, num_chunks, num_pages, char_count = ingest_document(
-                file_path, filename, doc_id, user_id, kb_id
+                file_path,
+                filename,
+                doc_id,
+                user_id,
+                kb_id,
+                file_hash=file_hash or None,
+                refresh_cache=refresh_cache,
             )
             doc.text_path = text_path
             doc.num_chunks = num_chunks
@@ -5,7 +5,7 @@ from typing import Any, Optional
 
 from sqlalchemy.orm import Session
 
-from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 from app.core.llm import get_llm
@@ -18,6 +18,7 @@ from app.utils.json_tools import safe_json_loads
 
 logger = logging.getLogger(__name__)
 
+# Sent verbatim as a SystemMessage, so its JSON braces are literal; never pass it through .format.
 KEYPOINT_SYSTEM = (
     "你是一位知识提取专家。从材料中提取核心和关键的知识点。"
     "重点关注：(1) 可以独立学习的独立概念/理论/方法，"
@@ -25,47 +26,38 @@ KEYPOINT_SYSTEM = (
     "(3) 重要的关系或模式。"
     "每个知识点应该简洁且聚焦 - 避免冗长的描述。"
     "优先考虑深度和重要性，而非数量。"
-    "返回 JSON 数组：[{{text: string, explanation?: string}}, ...]。"
+    "返回 JSON 数组：[{text: string, explanation?: string}, ...]。"
     "text 应该是简洁清晰的陈述（通常 10-30 个字）。"
     "explanation 是可选的，仅在提供必要说明时添加（保持简短，不超过 50 个字）。"
     "\n\n重要：所有输出必须使用中文（简体中文）。"
 )
 
-CHUNK_PROMPT = ChatPromptTemplate.from_messages(
-    [
-        ("system", KEYPOINT_SYSTEM),
-        (
-            "human",
-            "从此文档片段中提取 3-5 个核心知识点。专注于最重要的概念，"
-            "忽略次要细节。每个知识点必须独立且有意义。"
-            "仅返回 JSON 对象数组（不要其他文本）。"
-            "所有内容必须使用中文（简体中文）。\n\n文档片段：\n{chunk}",
-        ),
-    ]
+_KEYPOINT_SYSTEM_MESSAGE = SystemMessage(content=KEYPOINT_SYSTEM)
+
+CHUNK_HUMAN_TEMPLATE = (
+    "从此文档片段中提取 3-5 个核心知识点。专注于最重要的概念，"
+    "忽略次要细节。每个知识点必须独立且有意义。"
+    "仅返回 JSON 对象数组（不要其他文本）。"
+    "所有内容必须使用中文（简体中文）。\n\n文档片段：\n{chunk}"
 )
 
-FINAL_PROMPT = ChatPromptTemplate.from_messages(
-    [
-        ("system", KEYPOINT_SYSTEM),
-        (
-            "human",
-            "审查并精炼这些知识点。你的任务：\n"
-            "1. 删除重复项并合并相似的点\n"
-            "2. 仅保留最重要和核心的点（优先深度而非广度）\n"
-            "3. 确保每个点独立且可以独立存在\n"
-            "4. 使文本简洁且聚焦 - 删除不必要的词语\n"
-            "5. 保持解释简短，如果冗余则删除\n"
-            "目标：8-12 个核心要点（如果能抓住核心，更少更好）。"
-            "仅返回 JSON 数组 [{{text, explanation?}}]（不要其他文本）。"
-            "所有内容必须使用中文（简体中文）。\n\n知识点列表：\n{points}",
-        ),
-    ]
+FINAL_HUMAN_TEMPLATE = (
+    "审查并精炼这些知识点。你的任务：\n"
+    "1. 删除重复项并合并相似的点\n"
+    "2. 仅保留最重要和核心的点（优先深度而非广度）\n"
+    "3. 确保每个点独立且可以独立存在\n"
+    "4. 使文本简洁且聚焦 - 删除不必要的词语\n"
+    "5. 保持解释简短，如果冗余则删除\n"
+    "目标：8-12 个核心要点（如果能抓住核心，更少更好）。"
+    "仅返回 JSON 数组 [{{text, explanation?}}]（不要其他文本）。"
+    "所有内容必须使用中文（简体中文）。\n\n知识点列表：\n{points}"
 )
 
 # Larger chunks = fewer LLM calls; cap prevents runaway on huge docs
 _KP_CHUNK_SIZE = 6000
 _KP_CHUNK_OVERLAP = 300
 _MAX_CHUNKS = 15
+_SPLITTER = RecursiveCharacterTextSplitter(chunk_size=_KP_CHUNK_SIZE, chunk_overlap=_KP_CHUNK_OVERLAP)
 _KP_MIN_TEXT_LEN = 4
 _KP_MAX_TEXT_LEN = 40
 _KP_MAX_EXPLANATION_LEN = 80
@@ -399,15 +391,11 @@ async def extract_keypoints(
     doc_id: Optional[str] = None,
 ) -> list[dict]:
     llm = get_llm(temperature=0.2)
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=_KP_CHUNK_SIZE, chunk_overlap=_KP_CHUNK_OVERLAP
-    )
-    chunks = splitter.split_text(text)
+    chunks = _SPLITTER.split_text(text)
     chunks = sample_evenly(chunks, _MAX_CHUNKS)
 
     async def _process_chunk(chunk_index: int, chunk: str) -> list[dict]:
-        safe_chunk = chunk.replace("{", "{{").replace("}", "}}")
-        msg = CHUNK_PROMPT.format_messages(chunk=safe_chunk)
+        msg = [_KEYPOINT_SYSTEM_MESSAGE, HumanMessage(content=CHUNK_HUMAN_TEMPLATE.format(chunk=chunk))]
         result = await llm.ainvoke(msg)
         try:
             raw_points = safe_json_loads(result.content)
@@ -460,7 +448,7 @@ async def extract_keypoints(
         f"- {p.get('text', '')}" + (f" ({p.get('explanation')})" if p.get("explanation") else "")
         for p in all_points
     )
-    final_msg = FINAL_PROMPT.format_messages(points=points_str)
+    final_msg = [_KEYPOINT_SYSTEM_MESSAGE, HumanMessage(content=FINAL_HUMAN_TEMPLATE.format(points=points_str))]
     final_result = await llm.ainvoke(final_msg)
     try:
         raw_final_points = safe_json_loads(final_result.content)
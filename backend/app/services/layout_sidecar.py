@@ -6,8 +6,11 @@ import re
 from typing import Any
 
 from app.core.paths import kb_base_dir
+from app.utils.json_tools import read_json_file
 
 _OCR_BLOCK_SENTINEL_RE = re.compile(r":ocr$", re.IGNORECASE)
+# Anything _normalize_ws would rewrite; clean text skips the rewrite passes entirely.
+_WS_DIRTY_RE = re.compile(r"[\r\x00]|[ \t]+\n|\n{3,}|[ \t]{2,}")
 
 
 def _safe_int(value: Any) -> int | None:
@@ -30,7 +33,10 @@ def _is_truthy(value: Any) -> bool:
 
 
 def _normalize_ws(text: str) -> str:
-    normalized = str(text or "").replace("\r\n", "\n").replace("\r", "\n").replace("\x00", "")
+    normalized = str(text or "")
+    if not _WS_DIRTY_RE.search(normalized):
+        return normalized.strip()
+    normalized = normalized.replace("\r\n", "\n").replace("\r", "\n").replace("\x00", "")
     normalized = re.sub(r"[ \t]+\n", "\n", normalized)
     normalized = re.sub(r"\n{3,}", "\n\n", normalized)
     normalized = re.sub(r"[ \t]{2,}", " ", normalized)
@@ -89,11 +95,8 @@ def load_layout_sidecar(user_id: str, kb_id: str | None, doc_id: str) -> dict[st
     if not kb_id:
         return None
     path = os.path.join(kb_base_dir(user_id, kb_id), "content_list", f"{doc_id}.layout.json")
-    if not os.path.exists(path):
-        return None
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            payload = json.load(f)
+        payload = read_json_file(path)
     except Exception:
         return None
     return payload if isinstance(payload, dict) else None
@@ -153,18 +156,26 @@ def extract_snippet_window(text: str, query: str | None, window_chars: int = 220
     return normalized[start:end]
 
 
-def _collect_text_from_blocks(blocks: list[dict[str, Any]], left: int, right: int) -> tuple[str, int]:
-    parts: list[str] = []
-    visible = 0
-    for idx in range(left, right + 1):
-        block = blocks[idx]
+def _block_texts(blocks: list[dict[str, Any]]) -> list[tuple[str, int]]:
+    # Normalize each block once; the preview window below may re-read the same blocks many times.
+    out: list[tuple[str, int]] = []
+    for block in blocks:
         if str(block.get("kind") or "") == "image":
+            out.append(("", 0))
             continue
         text = _normalize_ws(str(block.get("text") or ""))
+        out.append((text, _visible_chars(text) if text else 0))
+    return out
+
+
+def _collect_text_from_blocks(block_texts: list[tuple[str, int]], left: int, right: int) -> tuple[str, int]:
+    parts: list[str] = []
+    visible = 0
+    for text, text_visible in block_texts[left : right + 1]:
         if not text:
             continue
         parts.append(text)
-        visible += _visible_chars(text)
+        visible += text_visible
     return "\n\n".join(parts).strip(), visible
 
 
@@ -199,21 +210,22 @@ def build_text_preview_from_sidecar(
             if str(block.get("block_id") or "") in target_ids:
                 positions.append(idx)
 
+    block_texts = _block_texts(ordered_blocks)
     if positions:
         left = min(positions)
         right = max(positions)
         min_visible = max(220, int(target_chars * 0.4))
-        passage, visible = _collect_text_from_blocks(ordered_blocks, left, right)
+        passage, visible = _collect_text_from_blocks(block_texts, left, right)
         while visible < min_visible and (left > 0 or right < len(ordered_blocks) - 1):
             if left > 0:
                 left -= 1
             if right < len(ordered_blocks) - 1:
                 right += 1
-            passage, visible = _collect_text_from_blocks(ordered_blocks, left, right)
+            passage, visible = _collect_text_from_blocks(block_texts, left, right)
             if right - left > 16:
                 break
     else:
-        passage, _ = _collect_text_from_blocks(ordered_blocks, 0, len(ordered_blocks) - 1)
+        passage, _ = _collect_text_from_blocks(block_texts, 0, len(ordered_blocks) - 1)
 
     if not passage:
         return ""
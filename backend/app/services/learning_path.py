@@ -382,14 +382,10 @@ def _tokenize_text(text: str) -> list[str]:
     return _TOKEN_RE.findall((text or "").lower())
 
 
-def _token_overlap_count(a: str, b: str) -> int:
-    if not a or not b:
-        return 0
-    tokens_a = set(_tokenize_text(a))
-    tokens_b = set(_tokenize_text(b))
-    if not tokens_a or not tokens_b:
-        return 0
-    return len(tokens_a.intersection(tokens_b))
+def _token_overlap_count(tokens_a: frozenset[str], tokens_b: frozenset[str]) -> int:
+    if len(tokens_a) > len(tokens_b):
+        tokens_a, tokens_b = tokens_b, tokens_a
+    return sum(1 for token in tokens_a if token in tokens_b)
 
 
 def _contains_cjk(text: str) -> bool:
@@ -577,28 +573,34 @@ def _infer_rule_dependency_edges(
 
     candidate_map: dict[tuple[str, str], _DependencyEdgeCandidate] = {}
     grouped: dict[str, list[Keypoint]] = defaultdict(list)
+    # Each keypoint is compared against several neighbors; derive its text features only once.
+    token_sets: dict[str, frozenset[str]] = {}
+    order_numbers: dict[str, Optional[int]] = {}
+    basic_hints: dict[str, bool] = {}
     for kp in keypoints:
         grouped[str(kp.doc_id or "")].append(kp)
+        kp_text = str(kp.text or "")
+        token_sets[kp.id] = frozenset(_tokenize_text(kp_text))
+        order_numbers[kp.id] = _extract_order_number(kp_text)
+        basic_hints[kp.id] = _looks_basic(kp_text)
 
     for doc_kps in grouped.values():
         ordered = sorted(doc_kps, key=_keypoint_local_sort_tuple)
         for idx, left in enumerate(ordered):
-            left_text = str(left.text or "")
-            left_num = _extract_order_number(left_text)
+            left_num = order_numbers[left.id]
             for offset in (1, 2):
                 j = idx + offset
                 if j >= len(ordered):
                     break
                 right = ordered[j]
-                right_text = str(right.text or "")
-                right_num = _extract_order_number(right_text)
-                overlap = _token_overlap_count(left_text, right_text)
+                right_num = order_numbers[right.id]
+                overlap = _token_overlap_count(token_sets[left.id], token_sets[right.id])
 
                 if left_num is not None and right_num is not None and left_num < right_num:
                     confidence = _RULE_EDGE_CONFIDENCE_STRONG if right_num - left_num <= 1 else _RULE_EDGE_CONFIDENCE_MEDIUM
                     _add_rule_candidate(candidate_map, left.id, right.id, confidence, "rule:number_prefix")
 
-                if overlap >= 2 and _looks_basic(left_text) and _looks_advanced(right_text):
+                if overlap >= 2 and basic_hints[left.id] and _looks_advanced(str(right.text or "")):
                     _add_rule_candidate(
                         candidate_map,
                         left.id,
@@ -620,8 +622,7 @@ def _infer_rule_dependency_edges(
     # only near neighbors in stable order with strong lexical overlap and a basic/ordered cue.
     global_ordered = sorted(keypoints, key=_keypoint_local_sort_tuple)
     for idx, left in enumerate(global_ordered):
-        left_text = str(left.text or "")
-        left_num = _extract_order_number(left_text)
+        left_num = order_numbers[left.id]
         for offset in (1, 2, 3):
             j = idx + offset
             if j >= len(global_ordered):
@@ -629,11 +630,10 @@ def _infer_rule_dependency_edges(
             right = global_ordered[j]
             if left.doc_id == right.doc_id:
                 continue
-            right_text = str(right.text or "")
-            overlap = _token_overlap_count(left_text, right_text)
+            overlap = _token_overlap_count(token_sets[left.id], token_sets[right.id])
             if overlap < 2:
                 continue
-            if left_num is not None or _looks_basic(left_text):
+            if left_num is not None or basic_hints[left.id]:
                 _add_rule_candidate(
                     candidate_map,
                     left.id,
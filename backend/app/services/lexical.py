@@ -1,75 +1,160 @@
-import json
+import heapq
+import mmap
 import os
-from typing import Iterable, List, Optional, Tuple
+import threading
+from dataclasses import dataclass, field, replace
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional, Tuple, Union
 
 from langchain_core.documents import Document
 from rank_bm25 import BM25Okapi
 
 from app.core.config import settings
 from app.core.paths import ensure_user_dirs, user_base_dir
-from app.services.lexical_analyzer import tokenize_for_index, tokenize_for_query
+from app.services.lexical_analyzer import analyzer_signature, tokenize_for_index, tokenize_for_query
+from app.utils.json_tools import dumps_json_bytes, loads_json_bytes
+
+_BM25_CACHE_MAX = 32
+
+
+@dataclass
+class _Bm25Index:
+    signature: Tuple[Any, ...]
+    entries: List[dict]
+    bm25: Optional[BM25Okapi]
+    postings: Dict[str, List[int]] = field(default_factory=dict)
+    corpus_tokens: List[List[str]] = field(default_factory=list)
+
+
+# Keyed by (lexical path, doc_id filter); entries are rebuilt when the file or analyzer changes.
+_BM25_CACHE: Dict[Tuple[str, str], _Bm25Index] = {}
+# Searches and ingests run on different threads; every read-modify-write of the cache holds this.
+_BM25_CACHE_LOCK = threading.Lock()
 
 
 def _lexical_path(user_id: str, kb_id: str) -> str:
     return os.path.join(user_base_dir(user_id), "lexical", f"{kb_id}.jsonl")
 
 
+def _invalidate_bm25_cache(path: str) -> None:
+    with _BM25_CACHE_LOCK:
+        for key in [key for key in _BM25_CACHE if key[0] == path]:
+            _BM25_CACHE.pop(key, None)
+
+
 def append_lexical_chunks(user_id: str, kb_id: str, docs: Iterable[Document]) -> None:
     ensure_user_dirs(user_id)
     path = _lexical_path(user_id, kb_id)
-    with open(path, "a", encoding="utf-8") as f:
-        for doc in docs:
-            text = str(doc.page_content or "")
-            payload = {
-                "text": text,
-                "metadata": doc.metadata or {},
-                "tokens": tokenize_for_index(text, user_id=user_id, kb_id=kb_id),
-                "tokenizer_version": str(getattr(settings, "lexical_tokenizer_version", "v2") or "v2"),
-            }
-            f.write(json.dumps(payload, ensure_ascii=False) + "\n")
+    previous_signature = _file_signature(path)
+    tokenizer_version = str(getattr(settings, "lexical_tokenizer_version", "v2") or "v2")
+    payloads: List[dict] = []
+    lines: List[bytes] = []
+    for doc in docs:
+        text = str(doc.page_content or "")
+        payload = {
+            "text": text,
+            "metadata": dict(doc.metadata or {}),
+            "tokens": tokenize_for_index(text, user_id=user_id, kb_id=kb_id),
+            "tokenizer_version": tokenizer_version,
+        }
+        payloads.append(payload)
+        lines.append(dumps_json_bytes(payload) + b"\n")
+    with open(path, "ab") as f:
+        f.writelines(lines)
+    _extend_bm25_cache(path, previous_signature, payloads)
 
 
-def _load_chunks(user_id: str, kb_id: str) -> List[dict]:
-    path = _lexical_path(user_id, kb_id)
-    if not os.path.exists(path):
+def _doc_id_needle(doc_id: Optional[str]) -> Optional[bytes]:
+    # Only ids that serialize verbatim can be matched against raw jsonl bytes.
+    if not doc_id or not doc_id.isascii() or not doc_id.isprintable() or '"' in doc_id or "\\" in doc_id:
+        return None
+    return doc_id.encode("ascii")
+
+
+def _lines_containing(f: BinaryIO, needle: bytes) -> List[bytes]:
+    # Jump between needle hits in the mapped file instead of splitting every line.
+    lines: List[bytes] = []
+    if os.fstat(f.fileno()).st_size == 0:
+        return lines
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        pos = mm.find(needle)
+        while pos >= 0:
+            start = mm.rfind(b"\n", 0, pos) + 1
+            end = mm.find(b"\n", pos)
+            if end < 0:
+                end = len(mm)
+            lines.append(mm[start:end])
+            pos = mm.find(needle, end + 1)
+    return lines
+
+
+def _load_chunks(user_id: str, kb_id: str, doc_id: Optional[str] = None) -> List[dict]:
+    try:
+        f = open(_lexical_path(user_id, kb_id), "rb")
+    except FileNotFoundError:
         return []
+    needle = _doc_id_needle(doc_id)
     entries = []
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
+    with f:
+        # Rows that cannot mention the requested doc_id are skipped before decoding.
+        for line in f if needle is None else _lines_containing(f, needle):
             line = line.strip()
             if not line:
                 continue
             try:
-                entries.append(json.loads(line))
-            except json.JSONDecodeError:
+                entries.append(loads_json_bytes(line))
+            except ValueError:
                 continue
     return entries
 
 
-def _save_chunks(user_id: str, kb_id: str, entries: List[dict]) -> None:
+def _save_chunks(user_id: str, kb_id: str, entries: List[Union[dict, bytes]]) -> None:
     ensure_user_dirs(user_id)
     path = _lexical_path(user_id, kb_id)
+    _invalidate_bm25_cache(path)
     if not entries:
-        if os.path.exists(path):
+        try:
             os.remove(path)
+        except FileNotFoundError:
+            pass
         return
-    with open(path, "w", encoding="utf-8") as f:
-        for entry in entries:
-            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    with open(path, "wb") as f:
+        f.writelines(
+            (entry if isinstance(entry, bytes) else dumps_json_bytes(entry)) + b"\n" for entry in entries
+        )
+
+
+def _load_rows_for_doc(user_id: str, kb_id: str, doc_id: str) -> List[Union[dict, bytes]]:
+    """Return every row in file order, decoding only the rows that belong to ``doc_id``.
+
+    Rows of other documents stay as raw jsonl bytes so rewrites can pass them through untouched.
+    """
+    try:
+        f = open(_lexical_path(user_id, kb_id), "rb")
+    except FileNotFoundError:
+        return []
+    needle = _doc_id_needle(doc_id)
+    rows: List[Union[dict, bytes]] = []
+    with f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if needle is not None and needle not in line:
+                rows.append(line)
+                continue
+            try:
+                entry = loads_json_bytes(line)
+            except ValueError:
+                continue
+            metadata = entry.get("metadata", {}) if isinstance(entry, dict) else {}
+            rows.append(entry if metadata.get("doc_id") == doc_id else line)
+    return rows
 
 
 def remove_doc_chunks(user_id: str, kb_id: str, doc_id: str) -> int:
-    entries = _load_chunks(user_id, kb_id)
-    if not entries:
-        return 0
-    kept: List[dict] = []
-    removed = 0
-    for entry in entries:
-        metadata = entry.get("metadata", {}) if isinstance(entry, dict) else {}
-        if metadata.get("doc_id") == doc_id:
-            removed += 1
-            continue
-        kept.append(entry)
+    rows = _load_rows_for_doc(user_id, kb_id, doc_id)
+    kept = [row for row in rows if isinstance(row, bytes)]
+    removed = len(rows) - len(kept)
     if removed:
         _save_chunks(user_id, kb_id, kept)
     return removed
@@ -82,14 +167,14 @@ def update_doc_chunks_metadata(
     *,
     source: Optional[str] = None,
 ) -> int:
-    entries = _load_chunks(user_id, kb_id)
+    entries = _load_rows_for_doc(user_id, kb_id, doc_id)
     if not entries:
         return 0
     updated = 0
     for entry in entries:
-        metadata = entry.get("metadata", {}) if isinstance(entry, dict) else {}
-        if metadata.get("doc_id") != doc_id:
+        if isinstance(entry, bytes):
             continue
+        metadata = entry.get("metadata", {})
         if source is not None:
             metadata["source"] = source
         entry["metadata"] = metadata
@@ -115,26 +200,25 @@ def move_doc_chunks(
             source=source,
         )
 
-    source_entries = _load_chunks(user_id, from_kb_id)
+    source_entries = _load_rows_for_doc(user_id, from_kb_id, doc_id)
     if not source_entries:
         return 0
 
-    kept: List[dict] = []
+    kept: List[bytes] = []
     moved_entries: List[dict] = []
     for entry in source_entries:
-        metadata = entry.get("metadata", {}) if isinstance(entry, dict) else {}
-        if metadata.get("doc_id") != doc_id:
+        if isinstance(entry, bytes):
             kept.append(entry)
             continue
-        metadata = dict(metadata)
+        metadata = dict(entry.get("metadata", {}))
         metadata["kb_id"] = to_kb_id
         if source is not None:
             metadata["source"] = source
-        text = str(entry.get("text", "") if isinstance(entry, dict) else "")
-        tokens = entry.get("tokens") if isinstance(entry, dict) else None
+        text = str(entry.get("text", ""))
+        tokens = entry.get("tokens")
         if not isinstance(tokens, list) or not all(isinstance(token, str) for token in tokens):
             tokens = tokenize_for_index(text, user_id=user_id, kb_id=to_kb_id)
-        tokenizer_version = str(entry.get("tokenizer_version") or "") if isinstance(entry, dict) else ""
+        tokenizer_version = str(entry.get("tokenizer_version") or "")
         current_version = str(getattr(settings, "lexical_tokenizer_version", "v2") or "v2")
         if tokenizer_version != current_version:
             tokens = tokenize_for_index(text, user_id=user_id, kb_id=to_kb_id)
@@ -152,24 +236,88 @@ def move_doc_chunks(
         return 0
 
     _save_chunks(user_id, from_kb_id, kept)
-    target_entries = _load_chunks(user_id, to_kb_id)
-    target_entries.extend(moved_entries)
-    _save_chunks(user_id, to_kb_id, target_entries)
+    ensure_user_dirs(user_id)
+    target_path = _lexical_path(user_id, to_kb_id)
+    _invalidate_bm25_cache(target_path)
+    with open(target_path, "ab") as f:
+        f.writelines(dumps_json_bytes(entry) + b"\n" for entry in moved_entries)
     return len(moved_entries)
 
 
-def bm25_search(
+def _file_signature(path: str) -> Tuple[int, int]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return (-1, -1)
+    return (int(stat.st_mtime_ns), int(stat.st_size))
+
+
+def _index_from_corpus(
+    signature: Tuple[Any, ...],
+    entries: List[dict],
+    corpus_tokens: List[List[str]],
+) -> _Bm25Index:
+    if not any(corpus_tokens):
+        return _Bm25Index(signature=signature, entries=entries, bm25=None, corpus_tokens=corpus_tokens)
+
+    bm25 = BM25Okapi(corpus_tokens)
+    postings: Dict[str, List[int]] = {}
+    for idx, frequencies in enumerate(bm25.doc_freqs):
+        for token in frequencies:
+            postings.setdefault(token, []).append(idx)
+    return _Bm25Index(
+        signature=signature,
+        entries=entries,
+        bm25=bm25,
+        postings=postings,
+        corpus_tokens=corpus_tokens,
+    )
+
+
+def _extend_bm25_cache(path: str, previous_signature: Tuple[int, int], added: List[dict]) -> None:
+    """Fold freshly appended rows into cached indexes instead of rereading the whole file."""
+    file_signature = _file_signature(path)
+    with _BM25_CACHE_LOCK:
+        cached = [(key, index) for key, index in _BM25_CACHE.items() if key[0] == path]
+
+    # BM25 rebuilds run outside the lock so lookups on other knowledge bases are not blocked.
+    updates: List[Tuple[Tuple[str, str], _Bm25Index, Optional[_Bm25Index]]] = []
+    for key, index in cached:
+        if index.signature[0] != previous_signature:
+            updates.append((key, index, None))
+            continue
+        signature = (file_signature,) + index.signature[1:]
+        matched = [entry for entry in added if not key[1] or entry["metadata"].get("doc_id") == key[1]]
+        if not matched:
+            updates.append((key, index, replace(index, signature=signature)))
+            continue
+        extended = _index_from_corpus(
+            signature,
+            index.entries + matched,
+            index.corpus_tokens + [[token for token in entry["tokens"] if token] for entry in matched],
+        )
+        updates.append((key, index, extended))
+
+    with _BM25_CACHE_LOCK:
+        for key, index, updated in updates:
+            # Entries rebuilt or evicted meanwhile are left alone; signatures catch any staleness.
+            if _BM25_CACHE.get(key) is not index:
+                continue
+            if updated is None:
+                _BM25_CACHE.pop(key, None)
+            else:
+                _BM25_CACHE[key] = updated
+
+
+def _build_bm25_index(
     user_id: str,
     kb_id: str,
-    query: str,
-    top_k: int = 5,
-    doc_id: Optional[str] = None,
-) -> List[Tuple[Document, float]]:
-    entries = _load_chunks(user_id, kb_id)
+    doc_id: Optional[str],
+    signature: Tuple[Any, ...],
+) -> _Bm25Index:
+    entries = _load_chunks(user_id, kb_id, doc_id)
     if doc_id:
         entries = [e for e in entries if e.get("metadata", {}).get("doc_id") == doc_id]
-    if not entries:
-        return []
 
     current_version = str(getattr(settings, "lexical_tokenizer_version", "v2") or "v2")
     corpus_tokens: List[List[str]] = []
@@ -186,27 +334,66 @@ def bm25_search(
             continue
         corpus_tokens.append(tokenize_for_index(text, user_id=user_id, kb_id=kb_id))
 
-    if not any(corpus_tokens):
-        return []
+    return _index_from_corpus(signature, entries, corpus_tokens)
+
+
+def _get_bm25_index(user_id: str, kb_id: str, doc_id: Optional[str]) -> _Bm25Index:
+    path = _lexical_path(user_id, kb_id)
+    signature = (
+        _file_signature(path),
+        str(getattr(settings, "lexical_tokenizer_version", "v2") or "v2"),
+        analyzer_signature(user_id, kb_id),
+    )
+    key = (path, str(doc_id or ""))
+    with _BM25_CACHE_LOCK:
+        cached = _BM25_CACHE.get(key)
+    if cached and cached.signature == signature:
+        return cached
+
+    # Built outside the lock so a slow rebuild does not stall searches on other knowledge bases.
+    index = _build_bm25_index(user_id, kb_id, doc_id, signature)
+    with _BM25_CACHE_LOCK:
+        _BM25_CACHE.pop(key, None)
+        while len(_BM25_CACHE) >= _BM25_CACHE_MAX:
+            _BM25_CACHE.pop(next(iter(_BM25_CACHE)), None)
+        _BM25_CACHE[key] = index
+    return index
+
 
+def bm25_search(
+    user_id: str,
+    kb_id: str,
+    query: str,
+    top_k: int = 5,
+    doc_id: Optional[str] = None,
+) -> List[Tuple[Document, float]]:
+    # Punctuation-only queries tokenize to nothing; answer them before touching the index.
     query_tokens = tokenize_for_query(query, user_id=user_id, kb_id=kb_id)
     if not query_tokens:
         return []
 
-    bm25 = BM25Okapi(corpus_tokens)
-    scores = bm25.get_scores(query_tokens)
-    ranked = sorted(enumerate(scores), key=lambda x: x[1], reverse=True)[:top_k]
+    index = _get_bm25_index(user_id, kb_id, doc_id)
+    if index.bm25 is None:
+        return []
+
+    # Rows without any query token score exactly zero, so only posting-list rows are scored.
+    candidates = sorted({idx for token in set(query_tokens) for idx in index.postings.get(token, ())})
+    scores = [0.0] * len(index.entries)
+    if candidates:
+        for idx, score in zip(candidates, index.bm25.get_batch_scores(query_tokens, candidates)):
+            scores[idx] = score
+    ranked = heapq.nlargest(top_k, range(len(scores)), key=scores.__getitem__)
 
     results = []
-    for idx, score in ranked:
-        entry = entries[idx]
+    for idx in ranked:
+        entry = index.entries[idx]
         results.append(
             (
                 Document(
                     page_content=entry.get("text", ""),
-                    metadata=entry.get("metadata", {}),
+                    metadata=dict(entry.get("metadata", {})),
                 ),
-                float(score),
+                float(scores[idx]),
             )
         )
     return results
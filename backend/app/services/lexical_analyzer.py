@@ -14,8 +14,12 @@ from app.core.paths import kb_base_dir
 
 logger = logging.getLogger(__name__)
 
-_ZERO_WIDTH_RE = re.compile(r"[\u200b\u200c\u200d\u200e\u200f\u2060\ufeff]")
-_CONTROL_CHAR_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]")
+# Zero-width characters are dropped and control characters blanked in a single translate pass.
+_INVISIBLE_CHAR_TABLE: dict[int, int | None] = {
+    **{cp: 0x20 for cp in (*range(0x00, 0x09), 0x0B, 0x0C, *range(0x0E, 0x20), 0x7F)},
+    **dict.fromkeys((0x200B, 0x200C, 0x200D, 0x200E, 0x200F, 0x2060, 0xFEFF)),
+}
+_WHITESPACE_RUN_RE = re.compile(r"\s+")
 _TOKEN_PART_RE = re.compile(r"[a-z0-9_]+|[\u4e00-\u9fff]+")
 _ASCII_WORD_RE = re.compile(r"^[a-z0-9_]+$")
 
@@ -99,10 +103,8 @@ def _scope_key(user_id: str | None, kb_id: str | None) -> tuple[str, str]:
 
 def _normalize_text(text: str) -> str:
     normalized = unicodedata.normalize("NFKC", str(text or ""))
-    normalized = normalized.replace("\r\n", "\n").replace("\r", "\n")
-    normalized = _ZERO_WIDTH_RE.sub("", normalized)
-    normalized = _CONTROL_CHAR_RE.sub(" ", normalized)
-    normalized = re.sub(r"\s+", " ", normalized)
+    normalized = normalized.translate(_INVISIBLE_CHAR_TABLE)
+    normalized = _WHITESPACE_RUN_RE.sub(" ", normalized)
     return normalized.strip().lower()
 
 
@@ -250,11 +252,9 @@ def _tokenize_impl(
         chunk = str(piece or "").strip()
         if not chunk:
             continue
-        for part in _TOKEN_PART_RE.findall(chunk):
-            token = part.strip()
-            if not token:
-                continue
-            if _ASCII_WORD_RE.fullmatch(token) and len(token) < 2:
+        # Token parts never contain whitespace, so they need no further stripping.
+        for token in _TOKEN_PART_RE.findall(chunk):
+            if len(token) < 2 and _ASCII_WORD_RE.fullmatch(token):
                 continue
             if apply_stopwords and token in state.stopwords:
                 continue
@@ -287,6 +287,10 @@ def _tokenize_with_stopword_fallback(
     return tokens
 
 
+def analyzer_signature(user_id: str | None, kb_id: str | None) -> tuple[Any, ...]:
+    return _get_analyzer_state(user_id=user_id, kb_id=kb_id).signature
+
+
 def tokenize_for_index(text: str, *, user_id: str | None, kb_id: str | None) -> list[str]:
     return _tokenize_with_stopword_fallback(text, user_id=user_id, kb_id=kb_id)
 
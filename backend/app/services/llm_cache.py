@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import hashlib
+from collections import OrderedDict
+from typing import Any, Optional
+
+from app.utils.json_tools import dumps_json_bytes
+
+_RESPONSE_CACHE_MAX = 1024
+# Completed LLM responses keyed by the model configuration and the exact prompt messages.
+_RESPONSE_CACHE: OrderedDict[str, str] = OrderedDict()
+
+
+def response_cache_key(llm: Any, messages: list[Any]) -> str:
+    payload = {
+        "model": str(getattr(llm, "model_name", None) or getattr(llm, "model", None) or type(llm).__name__),
+        "base_url": str(getattr(llm, "openai_api_base", None) or ""),
+        "temperature": getattr(llm, "temperature", None),
+        "messages": [[str(getattr(m, "type", "")), str(getattr(m, "content", ""))] for m in messages],
+    }
+    return hashlib.sha256(dumps_json_bytes(payload)).hexdigest()
+
+
+def get_cached_response(key: str) -> Optional[str]:
+    value = _RESPONSE_CACHE.get(key)
+    if value is not None:
+        _RESPONSE_CACHE.move_to_end(key)
+    return value
+
+
+def set_cached_response(key: str, content: str) -> None:
+    _RESPONSE_CACHE[key] = content
+    _RESPONSE_CACHE.move_to_end(key)
+    while len(_RESPONSE_CACHE) > _RESPONSE_CACHE_MAX:
+        _RESPONSE_CACHE.popitem(last=False)
@@ -1,10 +1,12 @@
 from __future__ import annotations
 
 import re
-from dataclasses import asdict, dataclass, field
+from dataclasses import dataclass, field
 from typing import Any
 
 _CAPTION_RE = re.compile(r"^(图|表|Figure|Fig\.?|Table)\s*([0-9A-Za-z一二三四五六七八九十]+)?")
+# Trailing blanks before a newline and runs of 3+ (possibly blank-padded) newlines, in one sweep.
+_BLANK_RUN_RE = re.compile(r"(?P<gap>(?:[ \t]*\n){3,})|[ \t]+\n")
 
 
 @dataclass
@@ -36,14 +38,27 @@ class PdfLayoutExtractionResult:
     sidecar: dict[str, Any] | None = None
 
 
+def _blank_run_repl(match: re.Match[str]) -> str:
+    return "\n\n" if match.lastgroup == "gap" else "\n"
+
+
 def _normalize_text(text: str) -> str:
     if not text:
         return ""
-    text = text.replace("\x00", "")
-    text = text.replace("\r\n", "\n").replace("\r", "\n")
-    text = re.sub(r"[ \t]+\n", "\n", text)
-    text = re.sub(r"\n{3,}", "\n\n", text)
-    return text.strip()
+    text = text.replace("\x00", "").replace("\r\n", "\n").replace("\r", "\n")
+    return _BLANK_RUN_RE.sub(_blank_run_repl, text).strip()
+
+
+def _block_payload(block: ExtractedBlock) -> dict[str, Any]:
+    # Same shape as dataclasses.asdict, without its recursive deepcopy of every field.
+    return {
+        "block_id": block.block_id,
+        "kind": block.kind,
+        "page": block.page,
+        "bbox": list(block.bbox),
+        "text": block.text,
+        "order_index": block.order_index,
+    }
 
 
 def _is_caption_text(text: str) -> bool:
@@ -172,12 +187,12 @@ def extract_pdf_layout(
             )
             page_results.append(page_layout)
 
-            page_text_parts = [b.text for b in ordered_blocks if b.text]
-            page_text = _normalize_text("\n\n".join(page_text_parts))
+            # Block texts are already normalized and non-empty, so joining them keeps the page normalized.
+            page_text = "\n\n".join(b.text for b in ordered_blocks)
             page_texts.append(page_text)
             all_blocks.extend(ordered_blocks)
 
-        combined_text = "\n\n".join([p for p in page_texts if p])
+        combined_text = "\n\n".join(filter(None, page_texts))
         sidecar = {
             "version": 1,
             "parser": "layout",
@@ -186,7 +201,7 @@ def extract_pdf_layout(
             "pages": [
                 {
                     "page": p.page,
-                    "ordered_blocks": [asdict(block) for block in p.ordered_blocks],
+                    "ordered_blocks": [_block_payload(block) for block in p.ordered_blocks],
                 }
                 for p in page_results
             ],
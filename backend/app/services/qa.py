@@ -1,3 +1,4 @@
+import heapq
 import logging
 import math
 import re
@@ -674,9 +675,8 @@ def _doc_format_hint(meta: dict[str, Any]) -> str | None:
     return infer_format_hint(source)
 
 
-def _sanitize_doc_for_quality(doc: Any) -> tuple[str, bool]:
+def _sanitize_doc_for_quality(doc: Any, mode: str) -> tuple[str, bool]:
     meta = doc.metadata or {}
-    mode = _quality_filter_mode()
     format_hint = _doc_format_hint(meta)
     raw = str(doc.page_content or "")
     cleaned = clean_fragment(raw, mode=mode, format_hint=format_hint)
@@ -692,8 +692,9 @@ def _filter_low_quality_docs(question: str, docs: list[Any]) -> list[Any]:
 
     dropped_count = 0
     kept: list[Any] = []
+    mode = _quality_filter_mode()
     for doc in docs:
-        cleaned_text, dropped = _sanitize_doc_for_quality(doc)
+        cleaned_text, dropped = _sanitize_doc_for_quality(doc, mode)
         if dropped:
             dropped_count += 1
             continue
@@ -828,8 +829,7 @@ def retrieve_documents(
             score = dense_norm * dense_weight + bm25_norm * bm25_weight
             weighted.append((item["doc"], score))
 
-        weighted.sort(key=lambda x: x[1], reverse=True)
-        selected = [doc for doc, _ in weighted[:k]]
+        selected = [doc for doc, _ in heapq.nlargest(k, weighted, key=lambda x: x[1])]
         return _filter_low_quality_docs(question, selected)
 
     def _retrieve_static_documents() -> list[Any]:
@@ -872,10 +872,11 @@ def retrieve_documents(
 def build_sources_and_context(docs: list, user_id: str | None = None) -> Tuple[List[dict], str]:
     sources = []
     context_blocks = []
+    # Settings reads go through the runtime override lookup; resolve the mode once per call.
+    mode = _quality_filter_mode()
 
     for idx, doc in enumerate(docs, start=1):
         metadata = doc.metadata or {}
-        mode = _quality_filter_mode()
 
         source_name = (
             metadata.get("source")
@@ -14,7 +14,7 @@ from app.core.config import settings
 from app.core.llm import get_llm
 from app.core.vectorstore import get_vectorstore
 from app.services.quiz_context import build_quiz_context_from_seeds
-from app.services.text_noise_guard import is_low_quality
+from app.services.text_noise_guard import is_low_quality, visible_chars
 from app.utils.json_tools import safe_json_loads
 
 logger = logging.getLogger(__name__)
@@ -39,6 +39,7 @@ QUIZ_TYPES = {QUIZ_TYPE_SINGLE, QUIZ_TYPE_MULTIPLE, QUIZ_TYPE_TRUE_FALSE, QUIZ_T
 QuizQuestionType = Literal["single_choice", "multiple_choice", "true_false", "fill_blank"]
 FILL_BLANK_PLACEHOLDER_RE = re.compile(r"_{3,}|＿{3,}|\(\s*\)|（\s*）|\[\s*\]|【\s*】")
 FILL_BLANK_CANONICAL_PLACEHOLDER = "____"
+QUIZ_REQUIRED_FIELDS = frozenset({"question", "explanation"})
 
 QUIZ_TYPE_SCHEMA_INSTRUCTIONS: dict[str, str] = {
     QUIZ_TYPE_SINGLE: (
@@ -307,7 +308,7 @@ def _build_context_text(docs, *, max_chars: int) -> str:
 
 
 def _doc_search_identity(doc: Any) -> tuple[str, str, str]:
-    meta = dict(getattr(doc, "metadata", {}) or {})
+    meta = getattr(doc, "metadata", None) or {}
     doc_id = str(meta.get("doc_id") or "")
     chunk = str(meta.get("chunk") or "")
     page = str(meta.get("page") or "")
@@ -604,12 +605,20 @@ def _is_fragmented_quiz_text(text: str) -> bool:
         mode=getattr(settings, "noise_filter_level", "balanced"),
     ):
         return True
-    lengths = [len(re.sub(r"\s+", "", line)) for line in lines]
-    if not lengths:
-        return False
-    avg_len = sum(lengths) / max(1, len(lengths))
-    single_char_ratio = sum(1 for n in lengths if n <= 1) / max(1, len(lengths))
-    short_line_ratio = sum(1 for n in lengths if n <= 6) / max(1, len(lengths))
+    total_len = 0
+    single_char_lines = 0
+    short_lines = 0
+    for line in lines:
+        n = len(visible_chars(line))
+        total_len += n
+        if n <= 1:
+            single_char_lines += 1
+        if n <= 6:
+            short_lines += 1
+    line_count = len(lines)
+    avg_len = total_len / line_count
+    single_char_ratio = single_char_lines / line_count
+    short_line_ratio = short_lines / line_count
     if single_char_ratio >= 0.45:
         return True
     if short_line_ratio >= 0.75 and avg_len < 8:
@@ -627,9 +636,7 @@ def _normalize_and_validate_question(
     if not isinstance(q, dict):
         return None, "invalid_type"
 
-    required_fields = ["question", "explanation"]
-    missing_fields = [field for field in required_fields if field not in q]
-    if missing_fields:
+    if QUIZ_REQUIRED_FIELDS - q.keys():
         return None, "missing_fields"
 
     question = str(q.get("question") or "").strip()
@@ -4,10 +4,17 @@ import json
 import logging
 import os
 import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from difflib import SequenceMatcher
 from typing import Any
 
+try:
+    from rapidfuzz.fuzz import ratio as _fuzz_ratio  # type: ignore
+except Exception:  # noqa: BLE001
+    _fuzz_ratio = None
+
 from app.core.config import settings
 from app.core.paths import kb_base_dir
 from app.core.vectorstore import get_doc_vector_entries
@@ -16,12 +23,25 @@ from app.services.text_noise_guard import (
     infer_format_hint,
     is_low_quality,
     score_text_fragment,
+    visible_chars,
 )
+from app.utils.json_tools import read_json_file
 
 logger = logging.getLogger(__name__)
 
 _CAPTIONISH_RE = re.compile(r"^\s*(图|表|figure|fig\.?|table)\s*[\(（]?\s*[0-9一二三四五六七八九十A-Za-z]+", re.I)
+_CAPTION_LEAD_CHARS = frozenset("图表FfTt")
+_SENTENCE_END_CHARS = frozenset("。！？；;:：")
+_BULLET_CHARS = frozenset("-•*")
 _SEED_MIN_VISIBLE_CHARS = 80
+_SIDECAR_PREFETCH_WORKERS = 8
+# One sweep for the three whitespace rewrites: blank-line runs, trailing blanks, inline runs.
+_WS_FUSED_RE = re.compile(r"(?P<gap>(?:[ \t]*\n){3,})|(?P<eol>[ \t]+\n)|[ \t]{2,}")
+_WS_TRANSLATE = str.maketrans({"\r": "\n", "\x00": None})
+_COMPARE_STRIP_RE = re.compile(r"[^\w\u4e00-\u9fff]+", re.UNICODE)
+_SHINGLE_SIZE = 4
+# Kept well below what a 0.94 SequenceMatcher ratio implies so the prefilter never hides a duplicate.
+_SHINGLE_PREFILTER_MIN = 0.4
 
 
 @dataclass
@@ -38,6 +58,17 @@ class QuizContextPassage:
     build_mode: str
 
 
+@dataclass(slots=True)
+class _SeedRecord:
+    rank: int
+    metadata: dict[str, Any]
+    doc_id: str
+    kb_id: str | None
+    text: str
+    score: float
+    kept: bool = True
+
+
 @dataclass
 class QuizContextBuildResult:
     text: str
@@ -62,12 +93,17 @@ def _safe_float(value: Any) -> float | None:
         return None
 
 
+def _ws_repl(match: re.Match[str]) -> str:
+    if match.lastgroup == "gap":
+        return "\n\n"
+    if match.lastgroup == "eol":
+        return "\n"
+    return " "
+
+
 def _normalize_ws(text: str) -> str:
-    normalized = str(text or "").replace("\r\n", "\n").replace("\r", "\n").replace("\x00", "")
-    normalized = re.sub(r"[ \t]+\n", "\n", normalized)
-    normalized = re.sub(r"\n{3,}", "\n\n", normalized)
-    normalized = re.sub(r"[ \t]{2,}", " ", normalized)
-    return normalized.strip()
+    normalized = str(text or "").replace("\r\n", "\n").translate(_WS_TRANSLATE)
+    return _WS_FUSED_RE.sub(_ws_repl, normalized).strip()
 
 
 def _merge_broken_lines(text: str) -> str:
@@ -88,20 +124,19 @@ def _merge_broken_lines(text: str) -> str:
         if (
             len(line) <= 18
             and len(prev) <= 60
-            and not re.search(r"[。！？；;:：]$", prev)
-            and not re.match(r"^[-•*]\s*", line)
-            and not _CAPTIONISH_RE.match(line)
+            and prev[-1] not in _SENTENCE_END_CHARS
+            and line[0] not in _BULLET_CHARS
+            and not (line[0] in _CAPTION_LEAD_CHARS and _CAPTIONISH_RE.match(line))
         ):
             merged[-1] = f"{prev} {line}".strip()
         else:
             merged.append(line)
-    text = "\n".join(merged)
-    text = re.sub(r"\n{3,}", "\n\n", text)
-    return text.strip()
+    # Blank entries are never adjacent, so the join cannot produce runs of 3+ newlines.
+    return "\n".join(merged).strip()
 
 
 def _visible_chars(text: str) -> str:
-    return "".join(ch for ch in str(text or "") if not ch.isspace())
+    return visible_chars(str(text or ""))
 
 
 def _quality_score(text: str) -> float:
@@ -112,18 +147,56 @@ def _quality_score(text: str) -> float:
     return float(metrics.get("score", 0.0))
 
 
-def _seed_quality_score(text: str, metadata: dict[str, Any]) -> float:
-    format_hint = infer_format_hint(str(metadata.get("source") or ""))
-    cleaned_text = clean_fragment(
-        text,
-        mode=getattr(settings, "noise_filter_level", "balanced"),
-        format_hint=format_hint,
+def _clean_cached(text: str, format_hint: str | None, cache: dict[tuple[str, str], str] | None) -> str:
+    if cache is None:
+        return clean_fragment(
+            text,
+            mode=getattr(settings, "noise_filter_level", "balanced"),
+            format_hint=format_hint,
+        )
+    cache_key = (format_hint or "", text)
+    cleaned = cache.get(cache_key)
+    if cleaned is None:
+        cleaned = clean_fragment(
+            text,
+            mode=getattr(settings, "noise_filter_level", "balanced"),
+            format_hint=format_hint,
+        )
+        cache[cache_key] = cleaned
+    return cleaned
+
+
+@dataclass
+class _SeedTextView:
+    cleaned: str
+    normalized: str
+    visible_len: int
+    metrics: dict[str, Any]
+
+
+def _seed_text_view(
+    text: str,
+    format_hint: str | None,
+    clean_cache: dict[tuple[str, str], str] | None = None,
+) -> _SeedTextView:
+    cleaned = _clean_cached(text, format_hint, clean_cache)
+    normalized = _normalize_ws(cleaned)
+    return _SeedTextView(
+        cleaned=cleaned,
+        normalized=normalized,
+        visible_len=len(_visible_chars(normalized)),
+        metrics=score_text_fragment(
+            cleaned,
+            mode=getattr(settings, "noise_filter_level", "balanced"),
+        ),
     )
-    score = _quality_score(cleaned_text)
-    normalized = _normalize_ws(cleaned_text)
-    if len(_visible_chars(normalized)) < _SEED_MIN_VISIBLE_CHARS:
+
+
+def _seed_quality_score(view: _SeedTextView, metadata: dict[str, Any]) -> float:
+    score = float(view.metrics.get("score", 0.0))
+    if view.visible_len < _SEED_MIN_VISIBLE_CHARS:
         score -= 0.2
-    if _CAPTIONISH_RE.match(normalized) and len(_visible_chars(normalized)) < 120:
+    if view.visible_len < 120 and _CAPTIONISH_RE.match(view.normalized):
         score -= 0.25
     if bool(metadata.get("ocr_override")):
         score -= 0.06
@@ -133,40 +206,58 @@ def _seed_quality_score(text: str, metadata: dict[str, Any]) -> float:
     return max(0.0, min(1.0, score))
 
 
-def _should_filter_seed(text: str, metadata: dict[str, Any], score: float) -> tuple[bool, str | None]:
+def _should_filter_seed(
+    text: str,
+    metadata: dict[str, Any],
+    score: float,
+    view: _SeedTextView | None = None,
+    clean_cache: dict[tuple[str, str], str] | None = None,
+) -> tuple[bool, str | None]:
     format_hint = infer_format_hint(str(metadata.get("source") or ""))
-    normalized = clean_fragment(
-        _normalize_ws(text),
-        mode=getattr(settings, "noise_filter_level", "balanced"),
-        format_hint=format_hint,
-    )
+    normalized = _clean_cached(_normalize_ws(text), format_hint, clean_cache)
     if not normalized:
         return True, "empty"
-    line_count = len([line for line in normalized.split("\n") if line.strip()])
-    visible_len = len(_visible_chars(normalized))
+    # Usually the same text the quality score saw; reuse its measurements when it is.
+    shared = view if view is not None and view.cleaned == normalized else None
+    if shared:
+        line_count = int(shared.metrics.get("line_count", 0))
+        visible_len = shared.visible_len
+    else:
+        line_count = sum(1 for line in normalized.split("\n") if line.strip())
+        visible_len = len(_visible_chars(normalized))
     if score < 0.14 and (line_count >= 2 or visible_len <= 4):
         return True, "low_quality"
     if line_count >= 2 and is_low_quality(
         normalized,
         mode=getattr(settings, "noise_filter_level", "balanced"),
         format_hint=format_hint,
+        metrics=shared.metrics if shared and format_hint != ".md" else None,
     ):
         return True, "too_fragmented"
-    if _CAPTIONISH_RE.match(normalized) and len(_visible_chars(normalized)) < 80:
+    if visible_len < 80 and _CAPTIONISH_RE.match(normalized):
         return True, "short_caption"
     return False, None
 
 
+def _non_blank_strings(items: list[Any]) -> list[str]:
+    out: list[str] = []
+    for item in items:
+        text = item if isinstance(item, str) else str(item)
+        if text.strip():
+            out.append(text)
+    return out
+
+
 def _parse_json_list(value: Any) -> list[str]:
     if isinstance(value, list):
-        return [str(item) for item in value if str(item).strip()]
+        return _non_blank_strings(value)
     if isinstance(value, str) and value.strip():
         try:
             parsed = json.loads(value)
         except Exception:
             return []
         if isinstance(parsed, list):
-            return [str(item) for item in parsed if str(item).strip()]
+            return _non_blank_strings(parsed)
     return []
 
 
@@ -176,23 +267,26 @@ def _sidecar_path(user_id: str, kb_id: str | None, doc_id: str) -> str | None:
     return os.path.join(kb_base_dir(user_id, kb_id), "content_list", f"{doc_id}.layout.json")
 
 
-def _load_sidecar(user_id: str, kb_id: str | None, doc_id: str, cache: dict[tuple[str, str], dict | None]) -> dict | None:
-    if not kb_id:
-        return None
-    cache_key = (kb_id, doc_id)
-    if cache_key in cache:
-        return cache[cache_key]
+def _read_sidecar(user_id: str, kb_id: str, doc_id: str) -> dict | None:
     path = _sidecar_path(user_id, kb_id, doc_id)
-    if not path or not os.path.exists(path):
-        cache[cache_key] = None
+    if not path:
         return None
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            payload = json.load(f)
-        cache[cache_key] = payload if isinstance(payload, dict) else None
+        payload = read_json_file(path)
+    except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+        return None
     except Exception:
         logger.debug("Failed to load quiz sidecar doc_id=%s path=%s", doc_id, path, exc_info=True)
-        cache[cache_key] = None
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+def _load_sidecar(user_id: str, kb_id: str | None, doc_id: str, cache: dict[tuple[str, str], dict | None]) -> dict | None:
+    if not kb_id:
+        return None
+    cache_key = (kb_id, doc_id)
+    if cache_key not in cache:
+        cache[cache_key] = _read_sidecar(user_id, kb_id, doc_id)
     return cache[cache_key]
 
 
@@ -238,6 +332,25 @@ def _build_neighbor_passage(entries: list[dict[str, Any]], *, chunk: int | None,
     left = max(0, center_idx - max(1, window))
     right = min(len(text_entries) - 1, center_idx + max(1, window))
     selected = text_entries[left : right + 1]
+    min_visible = min(220, target_chars // 2)
+
+    # Line merging only rewrites whitespace (and drops NULs), so the visible length of a
+    # merged join is the sum of per-entry visible lengths; merge only the final selection.
+    contents: dict[int, str] = {}
+    visible_lens: dict[int, int] = {}
+
+    def _selection_visible_len(items: list[dict[str, Any]]) -> int:
+        total = 0
+        for item in items:
+            key = id(item)
+            n = visible_lens.get(key)
+            if n is None:
+                content = str(item.get("content") or "")
+                contents[key] = content
+                n = len(_visible_chars(content.replace("\x00", "")))
+                visible_lens[key] = n
+            total += n
+        return total
 
     same_page = []
     if center_page is not None:
@@ -246,18 +359,17 @@ def _build_neighbor_passage(entries: list[dict[str, Any]], *, chunk: int | None,
             for item in selected
             if _safe_int((item.get("metadata") or {}).get("page")) == center_page
         ]
-    if same_page:
-        same_page_text = _merge_broken_lines("\n\n".join(str(item.get("content") or "") for item in same_page))
-        if len(_visible_chars(same_page_text)) >= min(220, target_chars // 2):
-            selected = same_page
+    if same_page and _selection_visible_len(same_page) >= min_visible:
+        selected = same_page
 
     # Widen once if still too short.
-    joined = _merge_broken_lines("\n\n".join(str(item.get("content") or "") for item in selected))
-    if len(_visible_chars(joined)) < min(220, target_chars // 2):
+    if _selection_visible_len(selected) < min_visible:
         left = max(0, center_idx - max(2, window + 2))
         right = min(len(text_entries) - 1, center_idx + max(2, window + 2))
         selected = text_entries[left : right + 1]
-        joined = _merge_broken_lines("\n\n".join(str(item.get("content") or "") for item in selected))
+    joined = _merge_broken_lines(
+        "\n\n".join(contents.get(id(item)) or str(item.get("content") or "") for item in selected)
+    )
 
     selected_chunks = [
         _safe_int((item.get("metadata") or {}).get("chunk"))
@@ -312,30 +424,39 @@ def _build_sidecar_passage(sidecar: dict | None, *, chunk: int | None, page: int
     if not isinstance(ordered_blocks, list):
         return ""
 
-    target_positions: list[int] = []
-    for idx, block in enumerate(ordered_blocks):
-        if not isinstance(block, dict):
-            continue
-        if str(block.get("block_id") or "") in set(block_ids):
-            target_positions.append(idx)
+    wanted_ids = frozenset(block_ids)
+    target_positions = [
+        idx
+        for idx, block in enumerate(ordered_blocks)
+        if isinstance(block, dict) and str(block.get("block_id") or "") in wanted_ids
+    ]
     if not target_positions:
         return ""
 
-    left = min(target_positions)
-    right = max(target_positions)
+    # Widening revisits the same blocks; normalize each one at most once.
+    block_cache: dict[int, tuple[str, int]] = {}
+
+    def _block_text(idx: int) -> tuple[str, int]:
+        cached = block_cache.get(idx)
+        if cached is None:
+            block = ordered_blocks[idx]
+            text = _normalize_ws(str(block.get("text") or "")) if isinstance(block, dict) else ""
+            cached = (text, len(_visible_chars(text)) if text else 0)
+            block_cache[idx] = cached
+        return cached
+
+    left = target_positions[0]
+    right = target_positions[-1]
     target_chars = max(200, int(target_chars or 900))
     while True:
         text_parts: list[str] = []
         visible_len = 0
         for idx in range(left, right + 1):
-            block = ordered_blocks[idx]
-            if not isinstance(block, dict):
-                continue
-            text = _normalize_ws(str(block.get("text") or ""))
+            text, block_visible = _block_text(idx)
             if not text:
                 continue
             text_parts.append(text)
-            visible_len += len(_visible_chars(text))
+            visible_len += block_visible
         if visible_len >= min(320, target_chars // 2):
             break
         if left <= 0 and right >= len(ordered_blocks) - 1:
@@ -367,24 +488,67 @@ def _get_doc_entries_cached(user_id: str, doc_id: str, cache: dict[str, list[dic
     return rows
 
 
+def _prefetch_doc_inputs(
+    user_id: str,
+    targets: list[tuple[str, str | None]],
+    *,
+    doc_entries_cache: dict[str, list[dict[str, Any]]],
+    sidecar_cache: dict[tuple[str, str], dict | None],
+) -> None:
+    doc_ids = list(dict.fromkeys(doc_id for doc_id, _ in targets))
+    pairs = list(
+        dict.fromkeys(
+            (kb_id, doc_id)
+            for doc_id, kb_id in targets
+            if kb_id and (kb_id, doc_id) not in sidecar_cache
+        )
+    )
+    if len(pairs) <= 1:
+        for doc_id in doc_ids:
+            _get_doc_entries_cached(user_id, doc_id, doc_entries_cache)
+        return
+    with ThreadPoolExecutor(max_workers=min(_SIDECAR_PREFETCH_WORKERS, len(pairs))) as pool:
+        futures = {pair: pool.submit(_read_sidecar, user_id, pair[0], pair[1]) for pair in pairs}
+        # Sidecars are plain file reads; vector store access stays on this thread because a
+        # Chroma client is created per call.
+        for doc_id in doc_ids:
+            _get_doc_entries_cached(user_id, doc_id, doc_entries_cache)
+        for pair, future in futures.items():
+            sidecar_cache[pair] = future.result()
+
+
 def _normalize_compare(text: str) -> str:
-    normalized = re.sub(r"\s+", " ", str(text or "").strip().lower())
-    normalized = re.sub(r"[^\w\u4e00-\u9fff]+", "", normalized, flags=re.UNICODE)
-    return normalized
+    return _COMPARE_STRIP_RE.sub("", str(text or "").strip().lower())
+
 
+def _shingles(norm: str) -> frozenset[str]:
+    size = _SHINGLE_SIZE
+    if len(norm) < size:
+        return frozenset((norm,)) if norm else frozenset()
+    return frozenset(norm[i : i + size] for i in range(len(norm) - size + 1))
 
-def _is_similar_passage(text: str, seen: list[str]) -> bool:
-    norm = _normalize_compare(text)
+
+def _is_similar_passage(norm: str, shingles: frozenset[str], seen: list[tuple[str, frozenset[str]]]) -> bool:
     if not norm:
         return True
-    for existing in seen:
-        existing_norm = _normalize_compare(existing)
+    for existing_norm, existing_shingles in seen:
         if not existing_norm:
             continue
         if norm == existing_norm:
             return True
         if len(norm) > 40 and len(existing_norm) > 40:
-            if SequenceMatcher(None, norm, existing_norm).ratio() >= 0.94:
+            # Cheap shingle Jaccard rejects clearly different pairs; the ratio still decides.
+            union = len(shingles | existing_shingles)
+            if union and len(shingles & existing_shingles) / union < _SHINGLE_PREFILTER_MIN:
+                continue
+            if _fuzz_ratio is not None:
+                if _fuzz_ratio(norm, existing_norm, score_cutoff=94.0):
+                    return True
+                continue
+            matcher = SequenceMatcher(None, norm, existing_norm)
+            if matcher.real_quick_ratio() < 0.94 or matcher.quick_ratio() < 0.94:
+                continue
+            if matcher.ratio() >= 0.94:
                 return True
     return False
 
@@ -396,20 +560,20 @@ def _compose_context(passages: list[QuizContextPassage], *, max_chars: int, kb_s
     ordered = sorted(passages, key=lambda item: (item.seed_rank, -(item.quality_score)))
     if kb_scope:
         doc_order: list[str] = []
-        grouped: dict[str, list[QuizContextPassage]] = {}
+        grouped: dict[str, deque[QuizContextPassage]] = {}
         for item in ordered:
             if item.doc_id not in grouped:
-                grouped[item.doc_id] = []
+                grouped[item.doc_id] = deque()
                 doc_order.append(item.doc_id)
             grouped[item.doc_id].append(item)
         interleaved: list[QuizContextPassage] = []
         while True:
             appended = False
             for doc_id in doc_order:
-                bucket = grouped.get(doc_id) or []
+                bucket = grouped[doc_id]
                 if not bucket:
                     continue
-                interleaved.append(bucket.pop(0))
+                interleaved.append(bucket.popleft())
                 appended = True
             if not appended:
                 break
@@ -419,15 +583,16 @@ def _compose_context(passages: list[QuizContextPassage], *, max_chars: int, kb_s
     total = 0
     used = 0
     for item in ordered:
+        # Budget check first so passages past the limit are never normalized.
+        sep_len = 2 if blocks else 0
+        remaining = max_chars - total - sep_len
+        if remaining <= 0:
+            break
         body = _normalize_ws(item.text)
         if not body:
             continue
         header = f"来源: {item.source}".strip()
         segment = f"{header}\n{body}" if header else body
-        sep_len = 2 if blocks else 0
-        remaining = max_chars - total - sep_len
-        if remaining <= 0:
-            break
         if len(segment) > remaining:
             if remaining <= 40:
                 break
@@ -463,39 +628,57 @@ def build_quiz_context_from_seeds(
 
     doc_entries_cache: dict[str, list[dict[str, Any]]] = {}
     sidecar_cache: dict[tuple[str, str], dict | None] = {}
+    # Seed text is cleaned up to three times on the scoring path; reuse results per build.
+    clean_cache: dict[tuple[str, str], str] = {}
 
-    filtered_seeds: list[tuple[int, Any, dict[str, Any], str, float]] = []
-    fallback_seeds: list[tuple[int, Any, dict[str, Any], str, float]] = []
+    seed_records: list[_SeedRecord] = []
     for rank, seed in enumerate(seed_docs or []):
         metadata = dict(getattr(seed, "metadata", {}) or {})
         format_hint = infer_format_hint(str(metadata.get("source") or ""))
-        text = clean_fragment(
+        text = _clean_cached(
             _normalize_ws(str(getattr(seed, "page_content", "") or "")),
-            mode=getattr(settings, "noise_filter_level", "balanced"),
-            format_hint=format_hint,
+            format_hint,
+            clean_cache,
         )
-        score = _seed_quality_score(text, metadata)
-        fallback_seeds.append((rank, seed, metadata, text, score))
-        drop, reason = _should_filter_seed(text, metadata, score)
+        view = _seed_text_view(text, format_hint, clean_cache)
+        score = _seed_quality_score(view, metadata)
+        record = _SeedRecord(
+            rank=rank,
+            metadata=metadata,
+            doc_id=str(metadata.get("doc_id") or "").strip(),
+            kb_id=str(metadata.get("kb_id") or default_kb_id or "").strip() or None,
+            text=text,
+            score=score,
+        )
+        seed_records.append(record)
+        drop, reason = _should_filter_seed(text, metadata, score, view, clean_cache)
         if fragment_filter_enabled and drop:
             stats["filtered_seed_count"] += 1
             if reason:
                 drops = stats["drop_reasons"]
                 drops[reason] = int(drops.get(reason, 0)) + 1
-            continue
-        filtered_seeds.append((rank, seed, metadata, text, score))
+            record.kept = False
 
-    working_seeds = filtered_seeds or fallback_seeds
-    if not filtered_seeds and fragment_filter_enabled:
+    kept_seeds = [record for record in seed_records if record.kept]
+    working_seeds = kept_seeds or seed_records
+    if not kept_seeds and fragment_filter_enabled:
         stats["fallback_used"] = True
 
+    _prefetch_doc_inputs(
+        user_id,
+        [(record.doc_id, record.kb_id) for record in working_seeds if record.doc_id],
+        doc_entries_cache=doc_entries_cache,
+        sidecar_cache=sidecar_cache,
+    )
+
     passages: list[QuizContextPassage] = []
-    seen_passage_texts: list[str] = []
-    for rank, _seed, metadata, seed_text, seed_score in working_seeds:
-        doc_id = str(metadata.get("doc_id") or "").strip()
+    seen_passages: list[tuple[str, frozenset[str]]] = []
+    for record in working_seeds:
+        doc_id = record.doc_id
         if not doc_id:
             continue
-        kb_id = str(metadata.get("kb_id") or default_kb_id or "").strip() or None
+        metadata = record.metadata
+        kb_id = record.kb_id
         source = str(metadata.get("source") or doc_id).strip() or doc_id
         page = _safe_int(metadata.get("page"))
         chunk = _safe_int(metadata.get("chunk"))
@@ -524,8 +707,8 @@ def build_quiz_context_from_seeds(
             candidates.append(("chunk-neighbor", neighbor_text))
         if sidecar_text:
             candidates.append(("sidecar", sidecar_text))
-        if seed_text:
-            candidates.append(("raw-seed", seed_text))
+        if record.text:
+            candidates.append(("raw-seed", record.text))
 
         if not candidates:
             continue
@@ -538,9 +721,11 @@ def build_quiz_context_from_seeds(
             if q + bonus > best_score + (0.02 if best_mode == "sidecar" else 0.0):
                 best_mode, best_text, best_score = mode, text, q
 
-        if _is_similar_passage(best_text, seen_passage_texts):
+        best_norm = _normalize_compare(best_text)
+        best_shingles = _shingles(best_norm)
+        if _is_similar_passage(best_norm, best_shingles, seen_passages):
             continue
-        seen_passage_texts.append(best_text)
+        seen_passages.append((best_norm, best_shingles))
         stats["build_modes"][best_mode] = int(stats["build_modes"].get(best_mode, 0)) + 1
         if best_mode != "raw-seed":
             stats["reconstructed_count"] += 1
@@ -553,8 +738,8 @@ def build_quiz_context_from_seeds(
                 start_chunk=start_chunk,
                 end_chunk=end_chunk,
                 text=best_text,
-                quality_score=max(best_score, seed_score),
-                seed_rank=rank,
+                quality_score=max(best_score, record.score),
+                seed_rank=record.rank,
                 build_mode=best_mode,
             )
         )
@@ -563,10 +748,10 @@ def build_quiz_context_from_seeds(
         stats["fallback_used"] = True
         raw_parts: list[str] = []
         for seed in seed_docs or []:
-            cleaned_seed = clean_fragment(
+            cleaned_seed = _clean_cached(
                 _normalize_ws(str(getattr(seed, "page_content", "") or "")),
-                mode=getattr(settings, "noise_filter_level", "balanced"),
-                format_hint=infer_format_hint(str((getattr(seed, "metadata", {}) or {}).get("source") or "")),
+                infer_format_hint(str((getattr(seed, "metadata", {}) or {}).get("source") or "")),
+                clean_cache,
             )
             if cleaned_seed:
                 raw_parts.append(cleaned_seed)
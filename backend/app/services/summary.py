@@ -1,10 +1,15 @@
-import asyncio
-
+import asyncio
+import logging
+import re
+from typing import AsyncIterator
+
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.messages import HumanMessage, SystemMessage
 
 from app.core.llm import get_llm
-from app.services.sampling import sample_evenly
+from app.services.llm_cache import get_cached_response, response_cache_key, set_cached_response
+
+logger = logging.getLogger(__name__)
 
 SUMMARY_SYSTEM = (
     "你是一位文档摘要专家。你的任务是以清晰、结构化、简洁的方式从教育材料中提取和组织核心内容。\n\n"
@@ -29,69 +34,210 @@ SUMMARY_SYSTEM = (
     "重要：所有输出必须使用中文（简体中文）。"
 )
 
-CHUNK_PROMPT = ChatPromptTemplate.from_messages(
-    [
-        ("system", SUMMARY_SYSTEM),
-        (
-            "human",
-            "分析此文档片段并提取核心内容。重点关注：\n"
-            "- 关键定义、概念或原理\n"
-            "- 重要公式、定理或方法\n"
-            "- 关键关系或模式\n"
-            "- 基本步骤或程序\n\n"
-            "输出一个简洁的摘要（3-5 个要点），捕捉最重要的信息。"
-            "要具体和明确 - 引用材料中的实际内容。"
-            "所有内容必须使用中文（简体中文）。\n\n"
-            "文档片段：\n{chunk}"
-        ),
-    ]
+# The system message never changes; build it once and only format the human turn per call.
+_SUMMARY_SYSTEM_MESSAGE = SystemMessage(content=SUMMARY_SYSTEM)
+
+# DeepSeek and Qwen cache identical prompt prefixes automatically, so single-chunk and batched
+# map calls open with the same system message and instruction text; anything per-call follows it.
+_CHUNK_INSTRUCTIONS = (
+    "分析文档片段并提取核心内容。重点关注：\n"
+    "- 关键定义、概念或原理\n"
+    "- 重要公式、定理或方法\n"
+    "- 关键关系或模式\n"
+    "- 基本步骤或程序\n\n"
+    "为每个片段输出一个简洁的摘要（3-5 个要点），捕捉最重要的信息。"
+    "要具体和明确 - 引用材料中的实际内容。"
+    "所有内容必须使用中文（简体中文）。\n\n"
 )
 
-FINAL_PROMPT = ChatPromptTemplate.from_messages(
-    [
-        ("system", SUMMARY_SYSTEM),
-        (
-            "human",
-            "审查并综合这些片段摘要，生成一份全面而简洁的文档摘要。\n\n"
-            "你的任务：\n"
-            "1. **合并和去重**：合并相似点，删除冗余\n"
-            "2. **逻辑组织**：将相关概念分组，保持逻辑流程\n"
-            "3. **优先核心内容**：仅保留最重要的信息\n"
-            "4. **确保具体性**：每个点应传达具体、明确的信息\n"
-            "5. **保持结构**：使用清晰的标题和要点以提高可读性\n\n"
-            "输出要求：\n"
-            "- 使用 Markdown 格式，结构清晰（标题、要点）\n"
-            "- 目标长度：8-15 个要点，组织成逻辑章节\n"
-            "- 每个点应具体且信息丰富（避免模糊陈述）\n"
-            "- 包含实际的定义、公式或方法（如果存在）\n"
-            "- 确保摘要全面捕捉文档的核心内容\n"
-            "- 所有内容必须使用中文（简体中文）\n\n"
-            "片段摘要：\n{chunks}"
-        ),
-    ]
+CHUNK_HUMAN_TEMPLATE = _CHUNK_INSTRUCTIONS + "文档片段：\n{chunk}"
+
+CHUNK_BATCH_HUMAN_TEMPLATE = _CHUNK_INSTRUCTIONS + (
+    "以下有多个片段，请分别分析。按片段顺序逐个输出，"
+    "每个摘要以对应的标题行开头（### CHUNK A、### CHUNK B ...），不要输出其他内容。\n\n"
+    "{chunks}"
 )
 
-# Larger chunks = fewer LLM calls; cap prevents runaway on huge docs
+FINAL_HUMAN_TEMPLATE = (
+    "审查并综合这些片段摘要，生成一份全面而简洁的文档摘要。\n\n"
+    "你的任务：\n"
+    "1. **合并和去重**：合并相似点，删除冗余\n"
+    "2. **逻辑组织**：将相关概念分组，保持逻辑流程\n"
+    "3. **优先核心内容**：仅保留最重要的信息\n"
+    "4. **确保具体性**：每个点应传达具体、明确的信息\n"
+    "5. **保持结构**：使用清晰的标题和要点以提高可读性\n\n"
+    "输出要求：\n"
+    "- 使用 Markdown 格式，结构清晰（标题、要点）\n"
+    "- 目标长度：8-15 个要点，组织成逻辑章节\n"
+    "- 每个点应具体且信息丰富（避免模糊陈述）\n"
+    "- 包含实际的定义、公式或方法（如果存在）\n"
+    "- 确保摘要全面捕捉文档的核心内容\n"
+    "- 所有内容必须使用中文（简体中文）\n\n"
+    "片段摘要：\n{chunks}"
+)
+
+DOCUMENT_HUMAN_TEMPLATE = (
+    "分析此文档并生成一份全面而简洁的文档摘要。\n\n"
+    "你的任务：\n"
+    "1. **提取核心内容**：关键定义、概念、公式、定理或方法\n"
+    "2. **逻辑组织**：将相关概念分组，保持逻辑流程\n"
+    "3. **优先核心内容**：仅保留最重要的信息\n"
+    "4. **确保具体性**：每个点应传达具体、明确的信息，引用材料中的实际内容\n"
+    "5. **保持结构**：使用清晰的标题和要点以提高可读性\n\n"
+    "输出要求：\n"
+    "- 使用 Markdown 格式，结构清晰（标题、要点）\n"
+    "- 目标长度：8-15 个要点，组织成逻辑章节\n"
+    "- 每个点应具体且信息丰富（避免模糊陈述）\n"
+    "- 包含实际的定义、公式或方法（如果存在）\n"
+    "- 确保摘要全面捕捉文档的核心内容\n"
+    "- 所有内容必须使用中文（简体中文）\n\n"
+    "文档内容：\n{text}"
+)
+
+# Larger chunks = fewer LLM calls; every chunk reaches the map step, however long the document
 _SUMMARY_CHUNK_SIZE = 6000
-_SUMMARY_CHUNK_OVERLAP = 300
-_MAX_CHUNKS = 20
+# Chunk summaries are merged afterwards, so overlapping text would only be paid for twice
+_SUMMARY_CHUNK_OVERLAP = 0
+# Most summaries merged by one reduce prompt; more are first reduced in tiers
+_REDUCE_FANOUT = 20
+# Chunks summarised by one map prompt; amortises the shared prefix and request overhead
+_CHUNKS_PER_CALL = 4
+# Chunk text allowed in one map prompt, so batching never outgrows the model's context window
+_CHUNK_BATCH_MAX_CHARS = 2 * _SUMMARY_CHUNK_SIZE
+_CHUNK_LABELS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+_CHUNK_SECTION_RE = re.compile(r"###\s*CHUNK\s+([A-Z])\s*\n(.*?)(?=###\s*CHUNK|\Z)", re.S)
+# Upper bound on concurrent chunk-summary requests sent to the provider
+_MAX_CONCURRENT_CHUNK_CALLS = 8
+# Splitters hold no per-call state, so one instance serves every request
+_SPLITTER = RecursiveCharacterTextSplitter(
+    chunk_size=_SUMMARY_CHUNK_SIZE, chunk_overlap=_SUMMARY_CHUNK_OVERLAP
+)
+
+
+def _chunk_groups(chunks: list[str]) -> list[list[int]]:
+    groups: list[list[int]] = []
+    group_chars = 0
+    for idx, chunk in enumerate(chunks):
+        fits = group_chars + len(chunk) <= _CHUNK_BATCH_MAX_CHARS
+        if groups and len(groups[-1]) < _CHUNKS_PER_CALL and fits:
+            groups[-1].append(idx)
+            group_chars += len(chunk)
+        else:
+            groups.append([idx])
+            group_chars = len(chunk)
+    return groups
 
 
-async def summarize_text(text: str) -> str:
-    llm = get_llm(temperature=0.2)
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=_SUMMARY_CHUNK_SIZE, chunk_overlap=_SUMMARY_CHUNK_OVERLAP
-    )
-    chunks = splitter.split_text(text)
-    chunks = sample_evenly(chunks, _MAX_CHUNKS)
+def _reduce_messages(summaries: list[str]) -> list:
+    return [
+        _SUMMARY_SYSTEM_MESSAGE,
+        HumanMessage(content=FINAL_HUMAN_TEMPLATE.format(chunks="\n\n".join(summaries))),
+    ]
+
 
-    async def _summarize_chunk(chunk: str) -> str:
-        msg = CHUNK_PROMPT.format_messages(chunk=chunk)
-        result = await llm.ainvoke(msg)
-        return result.content
+async def _batch_contents(llm, prompts: list[list]) -> list[str]:
+    results = await llm.abatch(prompts, config={"max_concurrency": _MAX_CONCURRENT_CHUNK_CALLS})
+    return [result.content for result in results]
 
-    chunk_summaries = await asyncio.gather(*[_summarize_chunk(c) for c in chunks])
 
-    final_msg = FINAL_PROMPT.format_messages(chunks="\n\n".join(chunk_summaries))
-    final_result = await llm.ainvoke(final_msg)
+def _chunk_batch_messages(chunks: list[str]) -> list:
+    sections = "\n\n".join(
+        f"### CHUNK {label}\n{chunk}" for label, chunk in zip(_CHUNK_LABELS, chunks)
+    )
+    return [
+        _SUMMARY_SYSTEM_MESSAGE,
+        HumanMessage(content=CHUNK_BATCH_HUMAN_TEMPLATE.format(chunks=sections)),
+    ]
+
+
+def _parse_chunk_batch(content: str, count: int) -> list[str] | None:
+    sections = {label: body.strip() for label, body in _CHUNK_SECTION_RE.findall(content)}
+    summaries = [sections.get(label, "") for label in _CHUNK_LABELS[:count]]
+    if not all(summaries):
+        return None
+    return summaries
+
+
+async def _summarize_uncached(llm, prompts: list[list], chunks: list[str]) -> list[str]:
+    groups = _chunk_groups(chunks)
+    contents = await _batch_contents(
+        llm,
+        [
+            prompts[group[0]] if len(group) == 1 else _chunk_batch_messages([chunks[idx] for idx in group])
+            for group in groups
+        ],
+    )
+    summaries: list[str | None] = [None] * len(chunks)
+    for group, content in zip(groups, contents):
+        parsed = [content] if len(group) == 1 else _parse_chunk_batch(content, len(group))
+        if parsed is None:
+            continue
+        for idx, summary in zip(group, parsed):
+            summaries[idx] = summary
+    # Batches whose labelled sections cannot be recovered are retried one chunk per call.
+    retry = [idx for idx, summary in enumerate(summaries) if summary is None]
+    if retry:
+        logger.warning("Chunk summary batch output unparsable, retrying %d chunks individually", len(retry))
+        for idx, content in zip(retry, await _batch_contents(llm, [prompts[idx] for idx in retry])):
+            summaries[idx] = content
+    return summaries
+
+
+async def _summarize_chunks(llm, chunks: list[str]) -> list[str]:
+    # Chunk summaries depend only on the chunk text, so unchanged chunks skip the LLM call.
+    # The reduce steps are not cached, so a forced regeneration still produces a fresh summary.
+    prompts = [
+        [_SUMMARY_SYSTEM_MESSAGE, HumanMessage(content=CHUNK_HUMAN_TEMPLATE.format(chunk=c))]
+        for c in chunks
+    ]
+    keys = [response_cache_key(llm, prompt) for prompt in prompts]
+    cached = {key: get_cached_response(key) for key in keys}
+    # Repeated chunks share one call.
+    missing: dict[str, int] = {}
+    for idx, key in enumerate(keys):
+        if cached[key] is None:
+            missing.setdefault(key, idx)
+    if missing:
+        fresh = await _summarize_uncached(
+            llm,
+            [prompts[idx] for idx in missing.values()],
+            [chunks[idx] for idx in missing.values()],
+        )
+        for key, content in zip(missing, fresh):
+            cached[key] = content
+            set_cached_response(key, content)
+    return [cached[key] for key in keys]
+
+
+async def _final_messages(llm, text: str) -> list:
+    # A document that fits in one chunk is summarised in a single call instead of map + reduce.
+    if len(text) <= _SUMMARY_CHUNK_SIZE:
+        return [_SUMMARY_SYSTEM_MESSAGE, HumanMessage(content=DOCUMENT_HUMAN_TEMPLATE.format(text=text))]
+
+    # Splitting megabytes of text is pure Python work; keep it off the event loop
+    chunks = await asyncio.to_thread(_SPLITTER.split_text, text)
+    # No chunk cap: map prompts are bounded by _CHUNK_BATCH_MAX_CHARS, map concurrency by
+    # _MAX_CONCURRENT_CHUNK_CALLS, and the tiered reduce below absorbs any number of summaries.
+
+    # Chunk summaries are an easy, high fan-out task; the reduce steps keep the main model.
+    summaries = await _summarize_chunks(get_llm(temperature=0.2, tier="fast"), chunks)
+
+    # Long documents are reduced in tiers of adjacent summaries so the final prompt stays bounded.
+    while len(summaries) > _REDUCE_FANOUT:
+        groups = [summaries[i : i + _REDUCE_FANOUT] for i in range(0, len(summaries), _REDUCE_FANOUT)]
+        summaries = await _batch_contents(llm, [_reduce_messages(group) for group in groups])
+    return _reduce_messages(summaries)
+
+
+async def summarize_text(text: str) -> str:
+    llm = get_llm(temperature=0.2)
+    final_result = await llm.ainvoke(await _final_messages(llm, text))
     return final_result.content.strip()
+
+
+async def stream_summary_text(text: str) -> AsyncIterator[str]:
+    """Like summarize_text, but yields the final synthesis as the model produces it."""
+    llm = get_llm(temperature=0.2)
+    async for chunk in llm.astream(await _final_messages(llm, text)):
+        if chunk.content:
+            yield chunk.content
@@ -1,8 +1,20 @@
+import codecs
+import contextvars
+import functools
+import hashlib
+import json
 import logging
+import math
+import multiprocessing
+import os
 import re
+import tempfile
+import threading
 import time
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass, field
 from typing import Any, List, Optional, Tuple
 
 import pdfplumber
@@ -13,6 +25,7 @@ from app.services.pdf_layout import (
     PageLayoutResult,
     extract_pdf_layout,
 )
+from app.utils.json_tools import dumps_json_bytes, read_json_file
 
 
 @dataclass
@@ -24,6 +37,7 @@ class ExtractionResult:
     blocks: Optional[List[ExtractedBlock]] = None
     page_blocks: Optional[List[PageLayoutResult]] = None
     sidecar: Optional[dict[str, Any]] = None
+    ocr_failed_pages: List[int] = field(default_factory=list)
 
 
 @dataclass
@@ -32,10 +46,13 @@ class OcrPageResult:
     engine: str
     avg_confidence: Optional[float] = None
     raw_line_count: int = 0
+    failed: bool = False
 
 
 class OcrEngine(ABC):
     name: str
+    # Engines that may be called from several OCR worker threads at once.
+    thread_safe: bool = False
 
     @abstractmethod
     def ocr_page(self, image: Any) -> OcrPageResult:
@@ -50,13 +67,39 @@ FALLBACK_ENCODINGS: Tuple[str, ...] = (
     "big5",
     "latin-1",
 )
+# charset-normalizer cost grows with input size; a text file's head identifies its encoding.
+_ENCODING_SNIFF_BYTES = 64 * 1024
+_CCHARDET_MIN_CONFIDENCE = 0.6
 
 _OCR_LOW_CONF_VISIBLE_CHAR_THRESHOLD = 24
 _OCR_LOW_CONF_QUALITY_THRESHOLD = 0.45
+# Upper bound on consecutive pages rendered by one poppler process.
+_OCR_RENDER_BATCH_PAGES = 8
+
+# For str patterns \s matches exactly the characters where str.isspace() is true.
+_WHITESPACE_RUN_RE = re.compile(r"\s+")
+# Whitespace other than the line boundaries recognised by str.splitlines().
+_INLINE_WHITESPACE_RUN_RE = re.compile(r"[^\S\n\r\x0b\x0c\x1c-\x1e\x85\u2028\u2029]+")
+# Characters whose lower() does not fall in a-z (ASCII letters, U+0130 and the Kelvin sign do).
+_NON_LATIN_RUN_RE = re.compile(r"[^A-Za-z\u0130\u212a]+")
+# \w is str.isalnum() plus "_", so this matches exactly the non-alnum, non-CJK characters.
+_SYMBOL_CHAR_RE = re.compile(r"[^\w\u4e00-\u9fff]|_")
+_TRAILING_SPACE_RE = re.compile(r"[ \t]+\n")
+_BLANK_LINE_RUN_RE = re.compile(r"\n{3,}")
 
 logger = logging.getLogger(__name__)
 
+_PDF_EXTRACTION_CACHE_VERSION = 1
+# Concurrency knobs and the cache switch itself do not change the extracted text.
+_PDF_EXTRACTION_CACHE_IGNORED_OPTIONS = frozenset(
+    {"ocr_max_workers", "pdf_legacy_workers", "pdf_extraction_cache_enabled"}
+)
+
 _OCR_ENGINES: dict[str, OcrEngine] = {}
+# Extraction runs in background-task threads; loading OCR models twice costs seconds and memory
+_OCR_ENGINE_LOCK = threading.Lock()
+# One recognition call at a time per engine that is not known to be thread-safe
+_OCR_ENGINE_CALL_LOCKS: dict[str, threading.Lock] = {}
 _PREPROCESS_DEPENDENCY_WARNING_LOGGED = False
 _PREPROCESS_FAILURE_WARNING_LOGGED = False
 _UNKNOWN_OCR_ENGINE_WARNED: set[str] = set()
@@ -71,14 +114,17 @@ class RapidOcrEngine(OcrEngine):
     def _get_engine(self) -> Any:
         if self._engine is not None:
             return self._engine
-        try:
-            from rapidocr_onnxruntime import RapidOCR  # type: ignore
-        except Exception as exc:  # noqa: BLE001
-            raise RuntimeError(
-                f"OCR dependency missing: rapidocr import failed ({exc}). "
-                "Ensure rapidocr-onnxruntime is installed and required system libraries are present."
-            ) from exc
-        self._engine = RapidOCR()
+        with _OCR_ENGINE_LOCK:
+            if self._engine is not None:
+                return self._engine
+            try:
+                from rapidocr_onnxruntime import RapidOCR  # type: ignore
+            except Exception as exc:  # noqa: BLE001
+                raise RuntimeError(
+                    f"OCR dependency missing: rapidocr import failed ({exc}). "
+                    "Ensure rapidocr-onnxruntime is installed and required system libraries are present."
+                ) from exc
+            self._engine = RapidOCR()
         return self._engine
 
     def ocr_page(self, image: Any) -> OcrPageResult:
@@ -111,6 +157,8 @@ class RapidOcrEngine(OcrEngine):
 
 class TesseractOcrEngine(OcrEngine):
     name = "tesseract"
+    # pytesseract runs a separate tesseract process per call.
+    thread_safe = True
 
     def ocr_page(self, image: Any) -> OcrPageResult:
         try:
@@ -159,12 +207,41 @@ _OCR_ENGINE_CLASSES: dict[str, type[OcrEngine]] = {
 def _normalize_text(text: str) -> str:
     text = text.replace("\x00", "")
     text = text.replace("\r\n", "\n").replace("\r", "\n")
-    text = re.sub(r"[ \t]+\n", "\n", text)
-    text = re.sub(r"\n{3,}", "\n\n", text)
+    text = _TRAILING_SPACE_RE.sub("\n", text)
+    text = _BLANK_LINE_RUN_RE.sub("\n\n", text)
     return text.strip()
 
 
+def _get_text_encoding_detector() -> str:
+    detector = (getattr(settings, "text_encoding_detector", "auto") or "auto").strip().lower()
+    if detector not in {"auto", "cchardet", "charset_normalizer"}:
+        return "auto"
+    return detector
+
+
+def _detect_encoding_cchardet(data: bytes) -> Optional[str]:
+    try:
+        import cchardet  # type: ignore
+    except Exception:
+        return None
+    try:
+        result = cchardet.detect(data) or {}
+        encoding = result.get("encoding")
+        if not encoding or float(result.get("confidence") or 0.0) <= _CCHARDET_MIN_CONFIDENCE:
+            return None
+        return codecs.lookup(encoding).name
+    except Exception:
+        return None
+
+
 def _detect_encoding(data: bytes) -> Optional[str]:
+    detector = _get_text_encoding_detector()
+    if detector != "charset_normalizer":
+        # cchardet (C, optional) is far faster; charset-normalizer covers it when missing or unsure.
+        encoding = _detect_encoding_cchardet(data)
+        if encoding or detector == "cchardet":
+            return encoding
+
     try:
         from charset_normalizer import from_bytes  # type: ignore
 
@@ -176,11 +253,27 @@ def _detect_encoding(data: bytes) -> Optional[str]:
     return None
 
 
+def _encoding_sniff_sample(data: bytes) -> bytes:
+    """Head of data for encoding detection; the strict full decode still validates it."""
+    if len(data) <= _ENCODING_SNIFF_BYTES:
+        return data
+    head = data[:_ENCODING_SNIFF_BYTES]
+    # End on a line break so the sample does not stop inside a multi-byte character.
+    # UTF-16/32 newlines span several bytes, so leave NUL-bearing samples uncut.
+    if b"\x00" not in head:
+        cut = head.rfind(b"\n")
+        if cut > 0:
+            head = head[: cut + 1]
+    return head
+
+
 def _read_text_with_fallback(file_path: str) -> Tuple[str, Optional[str]]:
     with open(file_path, "rb") as f:
         data = f.read()
 
-    encoding = _detect_encoding(data)
+    encoding = _detect_encoding(_encoding_sniff_sample(data))
+    if not encoding and len(data) > _ENCODING_SNIFF_BYTES:
+        encoding = _detect_encoding(data)
     if encoding:
         try:
             return data.decode(encoding), encoding
@@ -232,6 +325,10 @@ def _get_ocr_check_pages() -> int:
     return max(1, _safe_int(getattr(settings, "ocr_check_pages", 3), 3))
 
 
+def _get_ocr_max_workers() -> int:
+    return max(1, _safe_int(getattr(settings, "ocr_max_workers", 4), 4))
+
+
 def _get_ocr_low_confidence_threshold() -> float:
     value = _safe_float(getattr(settings, "ocr_low_confidence_threshold", 0.78))
     if value is None:
@@ -259,6 +356,11 @@ def _get_tesseract_language() -> str:
 
 
 def _is_low_text_page(page_text: str, min_text_length: int) -> bool:
+    if len(page_text) < min_text_length:
+        return True
+    # Pages usually come out of _normalize_text already stripped; only copy when they are not.
+    if not (page_text[:1].isspace() or page_text[-1:].isspace()):
+        return False
     return len(page_text.strip()) < min_text_length
 
 
@@ -273,46 +375,49 @@ def _is_scanned_pdf(pages: List[str], min_text_length: int) -> bool:
 
 
 def _visible_chars(text: str) -> str:
-    return "".join(ch for ch in (text or "") if not ch.isspace())
+    return _WHITESPACE_RUN_RE.sub("", text or "")
 
 
 def _page_text_quality_metrics(page_text: str) -> dict[str, float]:
-    lines = [line.strip() for line in (page_text or "").splitlines() if line.strip()]
-    visible = _visible_chars(page_text)
-    visible_len = len(visible)
-    if not lines or visible_len == 0:
+    # Blank lines have no visible characters, so dropping zero lengths matches skipping them.
+    line_lens = [n for n in map(len, _INLINE_WHITESPACE_RUN_RE.sub("", page_text or "").splitlines()) if n]
+    line_count = len(line_lens)
+    if not line_lens:
         return {
-            "visible_len": float(visible_len),
-            "line_count": float(len(lines)),
+            "visible_len": 0.0,
+            "line_count": 0.0,
             "avg_line_len": 0.0,
-            "single_char_line_ratio": 1.0 if lines else 0.0,
-            "short_line_ratio": 1.0 if lines else 0.0,
-            "symbol_ratio": 1.0 if visible_len else 0.0,
+            "single_char_line_ratio": 0.0,
+            "short_line_ratio": 0.0,
+            "symbol_ratio": 0.0,
             "latin_ratio": 0.0,
         }
 
-    avg_line_len = sum(len(_visible_chars(line)) for line in lines) / max(1, len(lines))
-    single_char_lines = sum(1 for line in lines if len(_visible_chars(line)) <= 1)
-    short_lines = sum(1 for line in lines if len(_visible_chars(line)) <= 4)
-    symbol_count = sum(
-        1
-        for ch in visible
-        if not (ch.isalnum() or ("\u4e00" <= ch <= "\u9fff"))
-    )
-    latin_count = sum(1 for ch in visible if ("a" <= ch.lower() <= "z"))
+    visible = _visible_chars(page_text)
+    visible_len = len(visible)
+    avg_line_len = visible_len / line_count
+    single_char_lines = line_lens.count(1)
+    short_lines = sum(1 for n in line_lens if n <= 4)
+    symbol_count = visible_len - len(_SYMBOL_CHAR_RE.sub("", visible))
+    latin_count = len(_NON_LATIN_RUN_RE.sub("", visible))
     return {
         "visible_len": float(visible_len),
-        "line_count": float(len(lines)),
+        "line_count": float(line_count),
         "avg_line_len": float(avg_line_len),
-        "single_char_line_ratio": single_char_lines / max(1, len(lines)),
-        "short_line_ratio": short_lines / max(1, len(lines)),
+        "single_char_line_ratio": single_char_lines / line_count,
+        "short_line_ratio": short_lines / line_count,
         "symbol_ratio": symbol_count / max(1, visible_len),
         "latin_ratio": latin_count / max(1, visible_len),
     }
 
 
+@functools.lru_cache(maxsize=512)
 def _score_page_text_quality(page_text: str) -> float:
-    m = _page_text_quality_metrics(page_text)
+    # OCR repair scores the same page and OCR strings several times (fallback chain, pick, log).
+    return _score_page_text_metrics(_page_text_quality_metrics(page_text))
+
+
+def _score_page_text_metrics(m: dict[str, float]) -> float:
     visible_len = m["visible_len"]
     if visible_len <= 0:
         return 0.0
@@ -344,7 +449,7 @@ def _is_garbled_text_page(page_text: str) -> bool:
         return True
     if m["symbol_ratio"] > 0.35 and m["avg_line_len"] < 5.0:
         return True
-    return _score_page_text_quality(page_text) < 0.35
+    return _score_page_text_metrics(m) < 0.35
 
 
 def _extract_rapidocr_bbox_sort_key(row: Any, fallback_index: int) -> tuple[float, float, int]:
@@ -371,8 +476,28 @@ def _extract_rapidocr_bbox_sort_key(row: Any, fallback_index: int) -> tuple[floa
     return float(fallback_index), 0.0, fallback_index
 
 
+def _rapidocr_reading_order(boxes: list[Any]) -> Optional[list[int]]:
+    """Sort box indices top-to-bottom, left-to-right in one NumPy pass.
+
+    Returns None when NumPy is unavailable or the boxes are not one uniform
+    numeric (N, points, 2+) array; callers then fall back to per-row sort keys.
+    """
+    try:
+        import numpy as np  # type: ignore
+    except Exception:
+        return None
+    try:
+        polys = np.asarray(boxes, dtype=np.float64)
+    except (TypeError, ValueError):
+        return None
+    if polys.ndim != 3 or polys.shape[1] == 0 or polys.shape[2] < 2 or not np.isfinite(polys).all():
+        return None
+    mins = polys[:, :, :2].min(axis=1)
+    return np.lexsort((np.arange(len(boxes)), mins[:, 0], mins[:, 1])).tolist()
+
+
 def _parse_rapidocr_output(ocr_output: Any) -> tuple[list[str], list[float]]:
-    entries: list[tuple[tuple[float, float, int], str, Optional[float]]] = []
+    entries: list[tuple[int, Any, str, Optional[float]]] = []
     if not ocr_output:
         return [], []
     if not isinstance(ocr_output, (list, tuple)):
@@ -408,11 +533,15 @@ def _parse_rapidocr_output(ocr_output: Any) -> tuple[list[str], list[float]]:
             if score_value > 1.0:
                 score_value = score_value / 100.0
             score_value = min(1.0, max(0.0, score_value))
-        entries.append((_extract_rapidocr_bbox_sort_key(row, row_index), normalized_line, score_value))
+        entries.append((row_index, row, normalized_line, score_value))
 
-    entries.sort(key=lambda item: item[0])
-    lines = [item[1] for item in entries]
-    confidences = [item[2] for item in entries if item[2] is not None]
+    order = _rapidocr_reading_order([item[1][0] for item in entries]) if entries else None
+    if order is not None:
+        entries = [entries[idx] for idx in order]
+    else:
+        entries.sort(key=lambda item: _extract_rapidocr_bbox_sort_key(item[1], item[0]))
+    lines = [item[2] for item in entries]
+    confidences = [item[3] for item in entries if item[3] is not None]
     return lines, confidences
 
 
@@ -432,6 +561,22 @@ def _extract_tesseract_avg_confidence(image: Any, language: str) -> Optional[flo
         return None
 
     raw_values = data.get("conf", []) if isinstance(data, dict) else []
+    if not raw_values:
+        return None
+    try:
+        import numpy as np  # type: ignore
+
+        # One confidence per detected word, so dense pages produce thousands of values.
+        values = np.nan_to_num(np.asarray(raw_values, dtype=np.float64), nan=0.0)
+    except Exception:
+        values = None
+    if values is not None and values.ndim == 1:
+        values = values[values >= 0]
+        if not values.size:
+            return None
+        values = np.clip(np.where(values > 1.0, values / 100.0, values), 0.0, 1.0)
+        return float(values.mean())
+
     confidences: list[float] = []
     for raw in raw_values:
         score = _safe_float(raw)
@@ -452,11 +597,29 @@ def _get_ocr_engine(name: str) -> OcrEngine:
         raise RuntimeError(f"Unsupported OCR engine: {name}")
     engine = _OCR_ENGINES.get(normalized)
     if engine is None:
-        engine = _OCR_ENGINE_CLASSES[normalized]()
-        _OCR_ENGINES[normalized] = engine
+        with _OCR_ENGINE_LOCK:
+            engine = _OCR_ENGINES.get(normalized)
+            if engine is None:
+                engine = _OCR_ENGINE_CLASSES[normalized]()
+                _OCR_ENGINES[normalized] = engine
     return engine
 
 
+def _ocr_engine_call_lock(name: str) -> threading.Lock:
+    with _OCR_ENGINE_LOCK:
+        return _OCR_ENGINE_CALL_LOCKS.setdefault(name, threading.Lock())
+
+
+def _call_ocr_engine(engine_name: str, image: Any) -> OcrPageResult:
+    engine = _get_ocr_engine(engine_name)
+    if getattr(engine, "thread_safe", False):
+        return engine.ocr_page(image)
+    # Parallel page runs share the cached engine, and nothing guarantees a RapidOCR/ONNX Runtime
+    # session tolerates concurrent calls; rendering and preprocessing still overlap.
+    with _ocr_engine_call_lock(engine_name):
+        return engine.ocr_page(image)
+
+
 def _get_ocr_engine_chain_names() -> list[str]:
     primary = (getattr(settings, "ocr_engine", "rapidocr") or "rapidocr").strip().lower()
     configured = _parse_csv(getattr(settings, "ocr_fallback_engines", "rapidocr"))
@@ -533,7 +696,7 @@ def _run_ocr_with_fallbacks(
         has_next_engine = idx < len(engine_chain) - 1
         started = time.perf_counter()
         try:
-            result = _get_ocr_engine(engine_name).ocr_page(image)
+            result = _call_ocr_engine(engine_name, image)
             elapsed_ms = (time.perf_counter() - started) * 1000
         except RuntimeError as exc:
             elapsed_ms = (time.perf_counter() - started) * 1000
@@ -621,7 +784,7 @@ def _deskew_binary_image(binary_image: Any) -> Any:
     except Exception:
         return binary_image
 
-    coords = cv2.findNonZero(255 - binary_image)
+    coords = cv2.findNonZero(cv2.bitwise_not(binary_image))
     if coords is None or len(coords) < 10:
         return binary_image
 
@@ -666,11 +829,12 @@ def _preprocess_ocr_image(image: Any) -> Any:
         return image
 
     try:
-        rgb = image.convert("RGB")
-        rgb_array = np.array(rgb)
-        gray = cv2.cvtColor(rgb_array, cv2.COLOR_RGB2GRAY)
-        denoised = cv2.medianBlur(gray, 3)
-        _, binary = cv2.threshold(denoised, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        # Rendered pages are already RGB, so read them without an extra PIL copy and keep
+        # blur/threshold in the one grayscale buffer instead of allocating a page per step.
+        rgb_array = np.asarray(image if image.mode == "RGB" else image.convert("RGB"))
+        binary = cv2.cvtColor(rgb_array, cv2.COLOR_RGB2GRAY)
+        cv2.medianBlur(binary, 3, dst=binary)
+        cv2.threshold(binary, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=binary)
         if bool(getattr(settings, "ocr_deskew_enabled", True)):
             binary = _deskew_binary_image(binary)
         return Image.fromarray(binary)
@@ -681,7 +845,23 @@ def _preprocess_ocr_image(image: Any) -> Any:
         return image
 
 
-def _render_pdf_page_for_ocr(file_path: str, page_num: int) -> Any:
+def _split_ocr_page_runs(page_nums: list[int], max_len: int) -> list[list[int]]:
+    """Group sorted page numbers into consecutive runs of at most max_len pages."""
+    runs: list[list[int]] = []
+    for page_num in page_nums:
+        if runs and page_num == runs[-1][-1] + 1 and len(runs[-1]) < max_len:
+            runs[-1].append(page_num)
+        else:
+            runs.append([page_num])
+    return runs
+
+
+def _render_pdf_pages_for_ocr(
+    file_path: str,
+    first_page: int,
+    last_page: int,
+    output_folder: str,
+) -> list[str]:
     try:
         from pdf2image import convert_from_path  # type: ignore
     except Exception as exc:  # noqa: BLE001
@@ -690,22 +870,28 @@ def _render_pdf_page_for_ocr(file_path: str, page_num: int) -> Any:
         ) from exc
 
     try:
-        images = convert_from_path(
+        # Pages go to disk so a run costs one poppler process while only the page being
+        # recognized is held in memory.
+        return convert_from_path(
             file_path,
-            first_page=page_num,
-            last_page=page_num,
+            first_page=first_page,
+            last_page=last_page,
             dpi=_get_ocr_render_dpi(),
-            fmt="png",
+            fmt="ppm",
+            output_folder=output_folder,
+            paths_only=True,
         )
     except Exception as exc:  # noqa: BLE001
         raise RuntimeError(
             "Failed to render PDF page for OCR. Please install poppler-utils."
         ) from exc
 
-    if not images:
-        return None
 
-    image = images[0]
+def _load_rendered_page_for_ocr(image_path: str) -> Any:
+    from PIL import Image  # type: ignore
+
+    image = Image.open(image_path)
+    image.load()
     processed_image = _preprocess_ocr_image(image)
     if processed_image is not image:
         try:
@@ -715,24 +901,37 @@ def _render_pdf_page_for_ocr(file_path: str, page_num: int) -> Any:
     return processed_image
 
 
-def _ocr_page(
+def _ocr_page_run(
     file_path: str,
-    page_num: int,
+    page_nums: list[int],
     *,
-    trigger_reasons: list[str] | None = None,
-) -> OcrPageResult:
-    """Run OCR for one PDF page and return normalized text and metadata."""
-    image = _render_pdf_page_for_ocr(file_path, page_num)
-    if image is None:
-        return OcrPageResult(text="", engine="none", avg_confidence=None, raw_line_count=0)
-
-    try:
-        return _run_ocr_with_fallbacks(image, page_num, trigger_reasons=trigger_reasons)
-    finally:
-        try:
-            image.close()
-        except Exception:
-            pass
+    page_reasons: dict[int, list[str]],
+) -> list[OcrPageResult]:
+    """Run OCR for consecutive PDF pages rendered by a single poppler call."""
+    results: list[OcrPageResult] = []
+    with tempfile.TemporaryDirectory(prefix="ocr_pages_") as output_folder:
+        image_paths = _render_pdf_pages_for_ocr(file_path, page_nums[0], page_nums[-1], output_folder)
+        for idx, page_num in enumerate(page_nums):
+            if idx >= len(image_paths):
+                results.append(OcrPageResult(text="", engine="none", avg_confidence=None, raw_line_count=0))
+                continue
+            reasons = page_reasons.get(page_num, [])
+            try:
+                image = _load_rendered_page_for_ocr(image_paths[idx])
+                try:
+                    results.append(_run_ocr_with_fallbacks(image, page_num, trigger_reasons=reasons))
+                finally:
+                    try:
+                        image.close()
+                    except Exception:
+                        pass
+            except RuntimeError:
+                # A scanned PDF has no text layer to fall back on, so its OCR errors stay fatal.
+                if "scanned_pdf" in reasons:
+                    raise
+                logger.exception("Skip OCR on page %s due to setup/runtime error", page_num)
+                results.append(OcrPageResult(text="", engine="none", failed=True))
+    return results
 
 
 def _merge_page_text_with_ocr(
@@ -762,6 +961,17 @@ def _get_pdf_parser_mode() -> str:
     return mode
 
 
+def _get_pdf_legacy_workers() -> int:
+    return max(1, _safe_int(getattr(settings, "pdf_legacy_workers", 1), 1))
+
+
+def _get_pdf_legacy_backend() -> str:
+    backend = (getattr(settings, "pdf_legacy_backend", "pymupdf") or "pymupdf").strip().lower()
+    if backend not in {"pymupdf", "pdfplumber"}:
+        return "pymupdf"
+    return backend
+
+
 def _pick_page_text_after_ocr(
     original_text: str,
     ocr_text: str,
@@ -812,6 +1022,7 @@ def _apply_pdf_ocr_repair(
     *,
     pages: List[str],
     page_blocks: Optional[List[PageLayoutResult]] = None,
+    failed_pages: Optional[List[int]] = None,
 ) -> tuple[List[str], bool]:
     min_text_length = max(1, settings.ocr_min_text_length)
     scanned_pdf = _is_scanned_pdf(pages, min_text_length)
@@ -820,83 +1031,199 @@ def _apply_pdf_ocr_repair(
             logger.info("Scanned PDF detected but OCR is disabled")
         return pages, scanned_pdf
 
-    ocr_pages: list[int] = []
-    page_reasons: dict[int, list[str]] = {}
-    for idx, page_text in enumerate(pages, start=1):
-        reasons: list[str] = []
-        if scanned_pdf:
-            reasons.append("scanned_pdf")
-        else:
-            if _is_low_text_page(page_text, min_text_length):
-                reasons.append("low_text")
-            if _is_garbled_text_page(page_text):
-                reasons.append("garbled_text")
-        if reasons:
-            ocr_pages.append(idx)
-            page_reasons[idx] = reasons
-
-    for page_num in ocr_pages:
-        try:
-            ocr_result = _ocr_page(
-                file_path,
-                page_num,
-                trigger_reasons=page_reasons.get(page_num, []),
-            )
-        except RuntimeError:
+    # Scores are memoised per page string; drop them once this document is repaired so the
+    # cache does not pin page texts for the life of the process.
+    try:
+        ocr_pages: list[int] = []
+        page_reasons: dict[int, list[str]] = {}
+        for idx, page_text in enumerate(pages, start=1):
+            reasons: list[str] = []
             if scanned_pdf:
-                raise
-            logger.exception("Skip OCR on page %s due to setup/runtime error", page_num)
-            continue
+                reasons.append("scanned_pdf")
+            else:
+                if _is_low_text_page(page_text, min_text_length):
+                    reasons.append("low_text")
+                if _is_garbled_text_page(page_text):
+                    reasons.append("garbled_text")
+            if reasons:
+                ocr_pages.append(idx)
+                page_reasons[idx] = reasons
+
+        if not ocr_pages:
+            return pages, scanned_pdf
+
+        workers = min(_get_ocr_max_workers(), len(ocr_pages))
+        runs = _split_ocr_page_runs(
+            ocr_pages,
+            max(1, min(_OCR_RENDER_BATCH_PAGES, math.ceil(len(ocr_pages) / workers))),
+        )
+        # Rendering (poppler), preprocessing (OpenCV) and recognition (ONNX Runtime, tesseract)
+        # release the GIL, so page runs OCR in parallel while results are applied in page order.
+        # Workers copy the context so per-user runtime OCR settings still apply.
+        with ThreadPoolExecutor(max_workers=min(workers, len(runs))) as pool:
+            futures = [
+                pool.submit(
+                    contextvars.copy_context().run,
+                    _ocr_page_run,
+                    file_path,
+                    run,
+                    page_reasons=page_reasons,
+                )
+                for run in runs
+            ]
+            for run, future in zip(runs, futures):
+                try:
+                    run_results = future.result()
+                except RuntimeError:
+                    if scanned_pdf:
+                        for pending in futures:
+                            pending.cancel()
+                        raise
+                    logger.exception(
+                        "Skip OCR on pages %s due to setup/runtime error",
+                        ",".join(str(page_num) for page_num in run),
+                    )
+                    if failed_pages is not None:
+                        failed_pages.extend(run)
+                    continue
 
-        if not ocr_result.text:
-            continue
+                for page_num, ocr_result in zip(run, run_results):
+                    if ocr_result.failed and failed_pages is not None:
+                        failed_pages.append(page_num)
+                    _apply_ocr_page_result(
+                        pages,
+                        page_num,
+                        ocr_result,
+                        page_blocks=page_blocks,
+                        page_reasons=page_reasons,
+                        scanned_pdf=scanned_pdf,
+                        min_text_length=min_text_length,
+                    )
+        return pages, scanned_pdf
+    finally:
+        _score_page_text_quality.cache_clear()
 
-        original_page_text = pages[page_num - 1]
-        chosen_text, choose_reason = _pick_page_text_after_ocr(
-            original_page_text,
-            ocr_result.text,
-            scanned_pdf=scanned_pdf,
-            min_text_length=min_text_length,
-            trigger_reasons=page_reasons.get(page_num, []),
-        )
-        pages[page_num - 1] = chosen_text
 
-        if page_blocks and 0 <= page_num - 1 < len(page_blocks):
-            page_block = page_blocks[page_num - 1]
-            page_block.text_quality_score = _score_page_text_quality(chosen_text)
-            if chosen_text != original_page_text:
-                page_block.ocr_override_text = chosen_text
+def _apply_ocr_page_result(
+    pages: List[str],
+    page_num: int,
+    ocr_result: OcrPageResult,
+    *,
+    page_blocks: Optional[List[PageLayoutResult]],
+    page_reasons: dict[int, list[str]],
+    scanned_pdf: bool,
+    min_text_length: int,
+) -> None:
+    if not ocr_result.text:
+        return
+
+    original_page_text = pages[page_num - 1]
+    chosen_text, choose_reason = _pick_page_text_after_ocr(
+        original_page_text,
+        ocr_result.text,
+        scanned_pdf=scanned_pdf,
+        min_text_length=min_text_length,
+        trigger_reasons=page_reasons.get(page_num, []),
+    )
+    pages[page_num - 1] = chosen_text
+    original_score = _score_page_text_quality(original_page_text)
+    ocr_score = _score_page_text_quality(ocr_result.text)
+
+    if page_blocks and 0 <= page_num - 1 < len(page_blocks):
+        page_block = page_blocks[page_num - 1]
+        page_block.text_quality_score = ocr_score if chosen_text == ocr_result.text else original_score
+        if chosen_text != original_page_text:
+            page_block.ocr_override_text = chosen_text
+
+    logger.info(
+        "PDF page=%s ocr_trigger=%s choose=%s reason=%s fallback=%s orig_chars=%s ocr_chars=%s orig_q=%.3f ocr_q=%.3f",
+        page_num,
+        ",".join(page_reasons.get(page_num, [])) or "none",
+        "ocr" if chosen_text == ocr_result.text else "text_layer",
+        choose_reason,
+        choose_reason == "garbled_force_fallback_short_ocr",
+        len(_visible_chars(original_page_text)),
+        len(_visible_chars(ocr_result.text)),
+        original_score,
+        ocr_score,
+    )
 
-        logger.info(
-            "PDF page=%s ocr_trigger=%s choose=%s reason=%s fallback=%s orig_chars=%s ocr_chars=%s orig_q=%.3f ocr_q=%.3f",
-            page_num,
-            ",".join(page_reasons.get(page_num, [])) or "none",
-            "ocr" if chosen_text == ocr_result.text else "text_layer",
-            choose_reason,
-            choose_reason == "garbled_force_fallback_short_ocr",
-            len(_visible_chars(original_page_text)),
-            len(_visible_chars(ocr_result.text)),
-            _score_page_text_quality(original_page_text),
-            _score_page_text_quality(ocr_result.text),
-        )
-    return pages, scanned_pdf
 
+def _read_pdf_pages_pymupdf(file_path: str) -> List[str]:
+    import fitz  # type: ignore
 
-def _extract_pdf_legacy(file_path: str) -> ExtractionResult:
+    pages: List[str] = []
+    doc = fitz.open(file_path)
+    try:
+        for page in doc:
+            try:
+                page_text = page.get_text("text") or ""
+            except Exception:
+                page_text = ""
+            pages.append(_normalize_text(page_text))
+    finally:
+        doc.close()
+    return pages
+
+
+def _read_pdf_page_range_pdfplumber(file_path: str, start: int, stop: int | None) -> List[str]:
     pages: List[str] = []
     with pdfplumber.open(file_path) as pdf:
-        page_count = len(pdf.pages)
-        for page in pdf.pages:
+        for page in pdf.pages[start:stop]:
             try:
                 page_text = page.extract_text() or ""
             except Exception:
                 page_text = ""
             pages.append(_normalize_text(page_text))
+    return pages
+
+
+def _read_pdf_pages_pdfplumber(file_path: str) -> List[str]:
+    workers = _get_pdf_legacy_workers()
+    if workers > 1:
+        with pdfplumber.open(file_path) as pdf:
+            page_count = len(pdf.pages)
+        if page_count > 1:
+            step = math.ceil(page_count / workers)
+            # pdfminer layout analysis is pure Python, so only processes run it in parallel.
+            # Each worker re-opens the PDF, trading memory per worker for wall time. Spawned
+            # workers avoid forking a process that is running threads.
+            starts = list(range(0, page_count, step))
+            try:
+                with ProcessPoolExecutor(
+                    max_workers=len(starts),
+                    mp_context=multiprocessing.get_context("spawn"),
+                ) as pool:
+                    parts = pool.map(
+                        _read_pdf_page_range_pdfplumber,
+                        [file_path] * len(starts),
+                        starts,
+                        [start + step for start in starts],
+                    )
+                    return [page for part in parts for page in part]
+            except (BrokenProcessPool, OSError):
+                logger.warning("pdfplumber worker processes failed, fallback to a single process", exc_info=True)
+    return _read_pdf_page_range_pdfplumber(file_path, 0, None)
+
+
+def _extract_pdf_legacy(file_path: str, *, allow_pymupdf: bool = True) -> ExtractionResult:
+    pages: Optional[List[str]] = None
+    if allow_pymupdf and _get_pdf_legacy_backend() == "pymupdf":
+        # Plain-text extraction in PyMuPDF is an order of magnitude faster than pdfminer;
+        # pdfplumber stays as the fallback for files or installs PyMuPDF cannot handle.
+        try:
+            pages = _read_pdf_pages_pymupdf(file_path)
+        except Exception:
+            logger.warning("PyMuPDF text extraction failed, fallback to pdfplumber", exc_info=True)
+    if pages is None:
+        pages = _read_pdf_pages_pdfplumber(file_path)
+    page_count = len(pages)
 
-    pages, _ = _apply_pdf_ocr_repair(file_path, pages=pages, page_blocks=None)
+    failed_pages: List[int] = []
+    pages, _ = _apply_pdf_ocr_repair(file_path, pages=pages, page_blocks=None, failed_pages=failed_pages)
 
-    combined = "\n\n".join([p for p in pages if p])
-    return ExtractionResult(text=combined, page_count=page_count, pages=pages)
+    combined = "\n\n".join(filter(None, pages))
+    return ExtractionResult(text=combined, page_count=page_count, pages=pages, ocr_failed_pages=failed_pages)
 
 
 def _extract_pdf_layout_mode(
@@ -907,17 +1234,23 @@ def _extract_pdf_layout_mode(
     doc_id: str | None = None,
 ) -> ExtractionResult:
     parsed = extract_pdf_layout(file_path, user_id=user_id, kb_id=kb_id, doc_id=doc_id)
-    pages = [str(p or "") for p in parsed.pages]
-    page_blocks = list(parsed.page_blocks)
-    pages, _ = _apply_pdf_ocr_repair(file_path, pages=pages, page_blocks=page_blocks)
-    combined = "\n\n".join([p for p in pages if p])
+    # The layout result is built fresh per call, so OCR repair can update its lists in place.
+    failed_pages: List[int] = []
+    pages, _ = _apply_pdf_ocr_repair(
+        file_path,
+        pages=parsed.pages,
+        page_blocks=parsed.page_blocks,
+        failed_pages=failed_pages,
+    )
+    combined = "\n\n".join(filter(None, pages))
     return ExtractionResult(
         text=combined,
         page_count=parsed.page_count,
         pages=pages,
-        blocks=list(parsed.blocks),
-        page_blocks=page_blocks,
+        blocks=parsed.blocks,
+        page_blocks=parsed.page_blocks,
         sidecar=parsed.sidecar,
+        ocr_failed_pages=failed_pages,
     )
 
 
@@ -941,6 +1274,8 @@ def _extract_pdf(
             if mode == "layout":
                 raise
             logger.exception("PDF layout parser failed, fallback to legacy parser")
+            # The layout parser is PyMuPDF too; reopening the file with it would fail the same way.
+            return _extract_pdf_legacy(file_path, allow_pymupdf=False)
     return _extract_pdf_legacy(file_path)
 
 
@@ -993,10 +1328,142 @@ def _extract_pptx(file_path: str) -> ExtractionResult:
                 parts.append(shape_text)
         pages.append(_normalize_text("\n\n".join(parts)) if parts else "")
 
-    combined = "\n\n".join([p for p in pages if p])
+    combined = "\n\n".join(filter(None, pages))
     return ExtractionResult(text=combined, page_count=len(pages), pages=pages)
 
 
+def _file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _pdf_extraction_cache_dir() -> str:
+    return os.path.join(settings.data_dir, "cache", "pdf_extraction")
+
+
+def _pdf_extraction_cache_path(file_path: str, file_hash: Optional[str] = None) -> Optional[str]:
+    if not bool(getattr(settings, "pdf_extraction_cache_enabled", True)):
+        return None
+    if not file_hash:
+        try:
+            file_hash = _file_sha256(file_path)
+        except OSError:
+            return None
+    # Parser and OCR settings change the extracted pages, so they are part of the key.
+    options = {
+        name: getattr(settings, name, None)
+        for name in sorted(type(settings).model_fields)
+        if name.startswith(("pdf_", "ocr_")) and name not in _PDF_EXTRACTION_CACHE_IGNORED_OPTIONS
+    }
+    options["version"] = _PDF_EXTRACTION_CACHE_VERSION
+    options_hash = hashlib.sha256(json.dumps(options, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    return os.path.join(_pdf_extraction_cache_dir(), f"{file_hash}-{options_hash[:16]}.json")
+
+
+def remove_pdf_extraction_cache(file_hash: str | None) -> int:
+    """Delete every cached extraction of a file, whatever options it was parsed with."""
+    if not file_hash:
+        return 0
+    cache_dir = _pdf_extraction_cache_dir()
+    try:
+        names = os.listdir(cache_dir)
+    except OSError:
+        return 0
+    removed = 0
+    prefix = f"{file_hash}-"
+    for name in names:
+        if not (name.startswith(prefix) and name.endswith(".json")):
+            continue
+        try:
+            os.remove(os.path.join(cache_dir, name))
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def _extraction_from_payload(payload: dict[str, Any]) -> ExtractionResult:
+    def _blocks(items: Any) -> List[ExtractedBlock]:
+        return [ExtractedBlock(**item) for item in items or []]
+
+    page_blocks = payload.get("page_blocks")
+    blocks = payload.get("blocks")
+    return ExtractionResult(
+        text=str(payload.get("text") or ""),
+        page_count=int(payload.get("page_count") or 0),
+        pages=[str(p or "") for p in payload.get("pages") or []],
+        encoding=payload.get("encoding"),
+        blocks=_blocks(blocks) if blocks is not None else None,
+        page_blocks=(
+            [
+                PageLayoutResult(
+                    page=int(item["page"]),
+                    text_blocks=_blocks(item.get("text_blocks")),
+                    ordered_blocks=_blocks(item.get("ordered_blocks")),
+                    ocr_override_text=item.get("ocr_override_text"),
+                    text_quality_score=item.get("text_quality_score"),
+                )
+                for item in page_blocks
+            ]
+            if page_blocks is not None
+            else None
+        ),
+        sidecar=payload.get("sidecar"),
+    )
+
+
+def _extract_pdf_cached(
+    file_path: str,
+    *,
+    user_id: str | None = None,
+    kb_id: str | None = None,
+    doc_id: str | None = None,
+    file_hash: str | None = None,
+    refresh_cache: bool = False,
+) -> ExtractionResult:
+    cache_path = _pdf_extraction_cache_path(file_path, file_hash)
+    if cache_path and not refresh_cache:
+        try:
+            payload = read_json_file(cache_path)
+            if isinstance(payload, dict):
+                logger.info("PDF extraction cache hit doc_id=%s path=%s", doc_id, cache_path)
+                return _extraction_from_payload(payload)
+        except FileNotFoundError:
+            pass
+        except Exception:  # noqa: BLE001
+            logger.exception("Ignore unreadable PDF extraction cache path=%s", cache_path)
+
+    result = _extract_pdf(file_path, user_id=user_id, kb_id=kb_id, doc_id=doc_id)
+    if cache_path and result.ocr_failed_pages:
+        # A transient OCR failure must not become the permanent answer for this file.
+        logger.info(
+            "Skip PDF extraction cache write doc_id=%s ocr_failed_pages=%s",
+            doc_id,
+            ",".join(str(page_num) for page_num in result.ocr_failed_pages),
+        )
+    elif cache_path:
+        tmp_path = None
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(dumps_json_bytes(asdict(result)))
+            os.replace(tmp_path, cache_path)
+            tmp_path = None
+        except Exception:  # noqa: BLE001
+            logger.exception("Failed to write PDF extraction cache path=%s", cache_path)
+        finally:
+            if tmp_path:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+    return result
+
+
 def extract_text(
     file_path: str,
     suffix: str,
@@ -1004,10 +1471,19 @@ def extract_text(
     user_id: str | None = None,
     kb_id: str | None = None,
     doc_id: str | None = None,
+    file_hash: str | None = None,
+    refresh_cache: bool = False,
 ) -> ExtractionResult:
     normalized_suffix = (suffix or "").lower()
     if normalized_suffix == ".pdf":
-        return _extract_pdf(file_path, user_id=user_id, kb_id=kb_id, doc_id=doc_id)
+        return _extract_pdf_cached(
+            file_path,
+            user_id=user_id,
+            kb_id=kb_id,
+            doc_id=doc_id,
+            file_hash=file_hash,
+            refresh_cache=refresh_cache,
+        )
     if normalized_suffix in {".txt", ".md"}:
         return _extract_text_file(file_path)
     if normalized_suffix == ".docx":
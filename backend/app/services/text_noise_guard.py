@@ -18,6 +18,21 @@ _EMAIL_RE = re.compile(r"\b[A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+\.[A-Za-z]{2,}\b")
 _ZERO_WIDTH_RE = re.compile(r"[\u200b\u200c\u200d\u200e\u200f\u2060\ufeff]")
 _CONTROL_CHAR_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]")
 _PAGE_NUMBER_LINE_RE = re.compile(r"^(第?\s*\d{1,4}\s*页?|[0-9]{1,4})$")
+_BLANK_LINE_RUN_RE = re.compile(r"\n{3,}")
+_INLINE_SPACE_RUN_RE = re.compile(r"[ \t]{2,}")
+_SPACE_BEFORE_PUNCT_RE = re.compile(r"\s+([，。！？；：,.;!?])")
+_DOTTED_LATIN_RE = re.compile(r"[A-Za-z][._-][A-Za-z]")
+_HYPHEN_BREAK_END_RE = re.compile(r"[A-Za-z]-$")
+_LATIN_WORD_START_RE = re.compile(r"^[A-Za-z]{2,}")
+_SENTENCE_END_RE = re.compile(r"[。！？；.!?;:：]$")
+_SOFT_BREAK_END_RE = re.compile(r"[，、,:;：；]$")
+# Every code point where str.isspace() is true lies at or below U+3000.
+_WHITESPACE_DELETE = dict.fromkeys((cp for cp in range(0x3001) if chr(cp).isspace()), None)
+# Characters whose lower() falls in a-z: ASCII letters plus U+0130 and the Kelvin sign.
+_LATIN_LETTER_DELETE = dict.fromkeys(
+    [*range(ord("A"), ord("Z") + 1), *range(ord("a"), ord("z") + 1), 0x130, 0x212A],
+    None,
+)
 
 _SAFE_LATIN_TERMS = {
     "ai",
@@ -97,12 +112,12 @@ def _normalize_text(text: str, *, apply_nfkc: bool = True) -> str:
     normalized = _ZERO_WIDTH_RE.sub("", normalized)
     normalized = _CONTROL_CHAR_RE.sub("", normalized)
     normalized = "\n".join(line.rstrip() for line in normalized.split("\n"))
-    normalized = re.sub(r"\n{3,}", "\n\n", normalized)
+    normalized = _BLANK_LINE_RUN_RE.sub("\n\n", normalized)
     return normalized.strip()
 
 
-def _visible_chars(text: str) -> str:
-    return "".join(ch for ch in (text or "") if not ch.isspace())
+def visible_chars(text: str) -> str:
+    return (text or "").translate(_WHITESPACE_DELETE)
 
 
 def _contains_chinese(text: str) -> bool:
@@ -179,7 +194,7 @@ def _looks_like_short_latin_noise_line(
     if all(_is_safe_latin_token(token) for token in tokens):
         return False
 
-    dotted_or_joined = bool(re.search(r"[A-Za-z][._-][A-Za-z]", stripped))
+    dotted_or_joined = _DOTTED_LATIN_RE.search(stripped) is not None
     if dotted_or_joined and len(stripped) <= 18 and " " not in stripped:
         if any(not _is_safe_latin_token(token) and len(token) <= 6 for token in tokens):
             return True
@@ -231,8 +246,8 @@ def _is_markdown_structural_line(stripped: str) -> bool:
 
 
 def _normalize_inline_spacing(line: str) -> str:
-    normalized = re.sub(r"[ \t]{2,}", " ", line.strip())
-    normalized = re.sub(r"\s+([，。！？；：,.;!?])", r"\1", normalized)
+    normalized = _INLINE_SPACE_RUN_RE.sub(" ", line.strip())
+    normalized = _SPACE_BEFORE_PUNCT_RE.sub(r"\1", normalized)
     return normalized
 
 
@@ -298,7 +313,7 @@ def _clean_markdown_lines(lines: list[str]) -> tuple[list[str], int]:
 
 
 def _join_lines(left: str, right: str) -> str:
-    if re.search(r"[A-Za-z]-$", left) and re.match(r"^[A-Za-z]{2,}", right):
+    if _HYPHEN_BREAK_END_RE.search(left) and _LATIN_WORD_START_RE.match(right):
         return f"{left[:-1]}{right}"
     left_has_ch = _contains_chinese(left)
     right_has_ch = _contains_chinese(right)
@@ -317,16 +332,16 @@ def _can_merge_lines(left: str, right: str, *, preserve_structure: bool) -> bool
             return False
     if _URL_RE.search(left) or _URL_RE.search(right) or _EMAIL_RE.search(left) or _EMAIL_RE.search(right):
         return False
-    if re.search(r"[。！？；.!?;:：]$", left):
+    if _SENTENCE_END_RE.search(left):
         return False
     if _MARKDOWN_LIST_RE.match(right):
         return False
-    if re.search(r"[A-Za-z]-$", left) and re.match(r"^[A-Za-z]{2,}", right):
+    if _HYPHEN_BREAK_END_RE.search(left) and _LATIN_WORD_START_RE.match(right):
         return True
-    if re.search(r"[，、,:;：；]$", left):
+    if _SOFT_BREAK_END_RE.search(left):
         return True
-    left_len = len(_visible_chars(left))
-    right_len = len(_visible_chars(right))
+    left_len = len(visible_chars(left))
+    right_len = len(visible_chars(right))
     if (
         not _contains_chinese(left)
         and not _contains_chinese(right)
@@ -366,7 +381,7 @@ def _normalize_chinese_punctuation(line: str) -> tuple[str, int]:
     if _URL_RE.search(line) or _EMAIL_RE.search(line):
         return line, 0
     changed = 0
-    normalized = re.sub(r"\s+([，。！？；：,.;!?])", r"\1", line)
+    normalized = _SPACE_BEFORE_PUNCT_RE.sub(r"\1", line)
     if normalized != line:
         changed += 1
     line = normalized
@@ -506,8 +521,8 @@ def score_text_fragment(
     resolved_mode = _normalize_mode(mode)
     resolved_format = infer_format_hint(format_hint)
     normalized = _normalize_text(text)
-    lines = [line.strip() for line in normalized.split("\n") if line.strip()]
-    visible = _visible_chars(normalized)
+    lines = [line for line in map(str.strip, normalized.split("\n")) if line]
+    visible = visible_chars(normalized)
     visible_len = len(visible)
     if not lines or visible_len <= 0:
         return {
@@ -524,21 +539,31 @@ def score_text_fragment(
             "latin_ratio": 0.0,
         }
 
-    line_lengths = [len(_visible_chars(line)) for line in lines]
-    noise_flags = [
-        _looks_like_short_latin_noise_line(
+    line_count = len(lines)
+    single_line_input = line_count <= 1
+    total_line_len = 0
+    single_char_lines = 0
+    short_lines = 0
+    noise_lines = 0
+    for idx, line in enumerate(lines):
+        n = len(visible_chars(line))
+        total_line_len += n
+        if n <= 1:
+            single_char_lines += 1
+        if n <= 4:
+            short_lines += 1
+        if _looks_like_short_latin_noise_line(
             line,
             neighbor_has_chinese=_neighbor_has_chinese(lines, idx),
-            single_line_input=(len(lines) <= 1),
-        )
-        for idx, line in enumerate(lines)
-    ]
-    avg_line_len = sum(line_lengths) / max(1, len(line_lengths))
-    single_char_line_ratio = sum(1 for n in line_lengths if n <= 1) / max(1, len(line_lengths))
-    short_line_ratio = sum(1 for n in line_lengths if n <= 4) / max(1, len(line_lengths))
-    noise_line_ratio = sum(1 for flag in noise_flags if flag) / max(1, len(lines))
+            single_line_input=single_line_input,
+        ):
+            noise_lines += 1
+    avg_line_len = total_line_len / line_count
+    single_char_line_ratio = single_char_lines / line_count
+    short_line_ratio = short_lines / line_count
+    noise_line_ratio = noise_lines / line_count
     line_break_ratio = normalized.count("\n") / max(1, visible_len)
-    latin_ratio = sum(1 for ch in visible if ("a" <= ch.lower() <= "z")) / max(1, visible_len)
+    latin_ratio = (visible_len - len(visible.translate(_LATIN_LETTER_DELETE))) / max(1, visible_len)
 
     score = 0.35
     score += min(0.28, visible_len / 1400.0)
@@ -584,8 +609,10 @@ def is_low_quality(
     *,
     mode: str | None = _MODE_BALANCED,
     format_hint: str | None = None,
+    metrics: dict[str, Any] | None = None,
 ) -> bool:
-    metrics = score_text_fragment(text, mode=mode, format_hint=format_hint)
+    if metrics is None:
+        metrics = score_text_fragment(text, mode=mode, format_hint=format_hint)
     score = float(metrics.get("score", 0.0))
     visible_len = float(metrics.get("visible_len", 0.0))
     line_count = int(metrics.get("line_count", 0.0))
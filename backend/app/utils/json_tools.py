@@ -2,6 +2,11 @@ import ast
 import json
 import re
 
+try:
+    import orjson  # type: ignore
+except Exception:  # noqa: BLE001
+    orjson = None
+
 
 def extract_json_block(text: str) -> str:
     # Find first JSON array or object block
@@ -24,3 +29,24 @@ def safe_json_loads(text: str):
         except json.JSONDecodeError:
             # Fall back to Python literal parsing for single-quote JSON-like output.
             return ast.literal_eval(cleaned)
+
+
+def loads_json_bytes(data: bytes):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data.decode("utf-8"))
+
+
+def dumps_json_bytes(value, *, indent: bool = False) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, option=orjson.OPT_INDENT_2 if indent else None)
+        except TypeError:
+            pass
+    return json.dumps(value, ensure_ascii=False, indent=2 if indent else None).encode("utf-8")
+
+
+def read_json_file(path: str):
+    with open(path, "rb") as f:
+        data = f.read()
+    return loads_json_bytes(data)
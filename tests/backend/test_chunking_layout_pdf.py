@@ -171,3 +171,33 @@ def test_build_chunked_documents_removes_pdf_repeated_header_footer_and_page_num
     assert "\n63" not in combined
     assert "正文一" in combined
     assert "正文二" in combined
+
+
+def test_paragraph_merge_splitter_merges_paragraphs_and_splits_oversized_ones(monkeypatch):
+    monkeypatch.setattr(chunking_service.settings, "chunk_fast_splitter_enabled", True)
+    splitter = chunking_service._splitter(40, 0)
+    assert isinstance(splitter, chunking_service._ParagraphMergeSplitter)
+
+    long_paragraph = "。".join(["矩阵分解的应用"] * 12)
+    chunks = splitter.split_text(f"短段一\n\n短段二\n\n\n{long_paragraph}\n\n尾段")
+
+    assert chunks[0] == "短段一\n\n短段二"
+    assert chunks[-1] == "尾段"
+    assert all(len(chunk) <= 40 for chunk in chunks)
+    assert "".join(chunks[1:-1]).replace("。", "") == long_paragraph.replace("。", "")
+
+
+def test_paragraph_merge_splitter_carries_overlap_across_oversized_paragraphs(monkeypatch):
+    monkeypatch.setattr(chunking_service.settings, "chunk_fast_splitter_enabled", True)
+    splitter = chunking_service._splitter(40, 8)
+
+    long_paragraph = "，".join(["矩阵分解的应用"] * 12)
+    chunks = splitter.split_text(f"短段一的内容较长，前文结尾\n\n{long_paragraph}\n\n尾段内容")
+
+    assert len(chunks) > 3
+    assert all(len(chunk) <= 40 for chunk in chunks)
+    assert chunks[0] == "短段一的内容较长，前文结尾"
+    assert chunks[1].startswith("前文结尾")
+    assert chunks[-1].endswith("尾段内容")
+    for previous, current in zip(chunks, chunks[1:]):
+        assert any(previous.endswith(current[:size]) for size in range(1, 9)), (previous, current)
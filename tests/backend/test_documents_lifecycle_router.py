@@ -187,6 +187,7 @@ def test_reprocess_doc_changes_status_and_triggers_task(client, db_session):
     assert called[1] == user_id
     assert called[2] == kb_id
     assert called[3] == raw_path
+    assert task_mock.call_args.kwargs == {"refresh_cache": True}
 
 
 def test_delete_doc_cleans_records_and_files(client, db_session):
@@ -284,6 +285,7 @@ def test_delete_doc_cleans_records_and_files(client, db_session):
     with (
         patch("app.routers.documents.delete_doc_vectors", return_value=1),
         patch("app.routers.documents.remove_doc_chunks", return_value=1),
+        patch("app.routers.documents.remove_pdf_extraction_cache") as cache_mock,
     ):
         resp = client.delete(f"/api/docs/{doc_id}", params={"user_id": user_id})
 
@@ -301,6 +303,7 @@ def test_delete_doc_cleans_records_and_files(client, db_session):
     )
     assert not os.path.exists(raw_path)
     assert not os.path.exists(text_path)
+    cache_mock.assert_called_once_with(f"hash-{doc_id}")
 
 
 def test_doc_task_center_and_retry_failed(client, db_session):
@@ -2,6 +2,7 @@ from pathlib import Path
 import json
 from unittest.mock import MagicMock
 
+import pytest
 from langchain_core.documents import Document
 
 from app.services.chunking import ChunkBuildResult
@@ -105,3 +106,56 @@ def test_ingest_document_writes_lexical_tokens_and_version(monkeypatch, tmp_path
     assert isinstance(tokens, list)
     assert "python" in tokens
     assert "ai" in tokens
+
+
+def test_index_dense_docs_batches_embeddings_and_upserts(monkeypatch):
+    monkeypatch.setattr(ingest_service.settings, "ingest_embedding_batch_size", 2)
+    monkeypatch.setattr(ingest_service.settings, "ingest_vector_batch_size", 3)
+
+    docs = [
+        Document(page_content=f"chunk {idx}", metadata={"doc_id": "doc1", "chunk": idx})
+        for idx in range(5)
+    ]
+    embedded_batches: list[list[str]] = []
+
+    def _embed(texts):
+        embedded_batches.append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+    vectorstore = MagicMock()
+    vectorstore.embeddings.embed_documents.side_effect = _embed
+
+    ingest_service._index_dense_docs(vectorstore, docs)
+
+    assert embedded_batches == [["chunk 0", "chunk 1"], ["chunk 2", "chunk 3"], ["chunk 4"]]
+    vectorstore.add_documents.assert_not_called()
+    upserts = vectorstore._collection.upsert.call_args_list
+    assert [len(call.kwargs["ids"]) for call in upserts] == [3, 2]
+    assert [doc for call in upserts for doc in call.kwargs["documents"]] == [d.page_content for d in docs]
+    assert upserts[1].kwargs["metadatas"] == [docs[3].metadata, docs[4].metadata]
+
+
+def test_ingest_document_rolls_back_lexical_rows_when_dense_indexing_fails(monkeypatch, tmp_path):
+    monkeypatch.setattr(ingest_service.settings, "data_dir", str(tmp_path))
+
+    source_file = Path(tmp_path) / "sample3.txt"
+    source_file.write_text("raw", encoding="utf-8")
+    extraction = ExtractionResult(text="矩阵分解", page_count=1, pages=["矩阵分解"])
+    monkeypatch.setattr("app.services.ingest.extract_text", lambda *args, **kwargs: extraction)
+
+    text_doc = Document(
+        page_content="矩阵分解",
+        metadata={"doc_id": "doc3", "kb_id": "kb3", "source": "sample3.txt", "modality": "text", "chunk": 1},
+    )
+    chunk_result = ChunkBuildResult(text_docs=[text_doc], all_docs=[text_doc], manifest=[])
+    monkeypatch.setattr("app.services.ingest.build_chunked_documents", lambda *args, **kwargs: chunk_result)
+
+    vectorstore = MagicMock()
+    vectorstore.add_documents.side_effect = RuntimeError("embedding unavailable")
+    monkeypatch.setattr("app.services.ingest.get_vectorstore", lambda _user_id: vectorstore)
+
+    with pytest.raises(RuntimeError, match="embedding unavailable"):
+        ingest_document(str(source_file), "sample3.txt", "doc3", "u3", "kb3")
+
+    lexical_path = Path(tmp_path) / "users" / "u3" / "lexical" / "kb3.jsonl"
+    assert not lexical_path.exists()
@@ -27,7 +27,7 @@ def test_process_document_task_uses_requesting_user_runtime_config(db_session, m
 
     captured = {}
 
-    def fake_ingest_document(file_path, filename, doc_id, user_id, kb_id):
+    def fake_ingest_document(file_path, filename, doc_id, user_id, kb_id, **_kwargs):
         captured["chunk_size"] = settings.chunk_size
         return str(tmp_path / "out.txt"), 3, 1, 42
 
@@ -228,3 +228,22 @@ def test_save_keypoints_to_db_overwrite_deletes_vectors_with_chroma_and_filter(m
     vectorstore.delete.assert_called_once_with(
         where=build_chroma_eq_filter(doc_id="doc-1", type="keypoint")
     )
+
+
+def test_extract_keypoints_sends_chunk_braces_verbatim(monkeypatch):
+    sent: list[list] = []
+
+    class _RecordingLLM(_FakeAsyncLLM):
+        async def ainvoke(self, msg):
+            sent.append(msg)
+            return await super().ainvoke(msg)
+
+    llm = _RecordingLLM([json.dumps([{"text": "集合表示"}], ensure_ascii=False), "[]"])
+    monkeypatch.setattr(kp, "get_llm", lambda temperature=0.2: llm)
+    monkeypatch.setattr(kp, "_attach_source", lambda user_id, doc_id, point: point)
+
+    asyncio.run(kp.extract_keypoints("集合 S = {1, 2}", user_id="u1", doc_id="d1"))
+
+    assert sent[0][0].content == kp.KEYPOINT_SYSTEM
+    assert sent[0][1].content.endswith("文档片段：\n集合 S = {1, 2}")
+    assert "[{text: string" in sent[0][0].content
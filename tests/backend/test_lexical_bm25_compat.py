@@ -1,6 +1,9 @@
 import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from langchain_core.documents import Document
+
 from app.services import lexical as lexical_service
 from app.services import lexical_analyzer as analyzer
 from app.services.lexical import bm25_search
@@ -27,6 +30,7 @@ def _configure(monkeypatch, tmp_path: Path) -> None:
     monkeypatch.setattr(analyzer.settings, "lexical_stopwords_enabled", True)
     monkeypatch.setattr(analyzer.settings, "lexical_tokenizer_version", "v2")
     analyzer._ANALYZER_CACHE.clear()
+    lexical_service._BM25_CACHE.clear()
 
 
 def test_bm25_search_supports_legacy_entries_without_tokens(monkeypatch, tmp_path):
@@ -95,3 +99,204 @@ def test_bm25_search_refalls_to_text_when_tokenizer_version_mismatch(monkeypatch
     assert len(results) == 1
     assert results[0][0].metadata.get("doc_id") == "doc-stale"
 
+
+
+def test_bm25_search_reuses_index_until_lexical_file_changes(monkeypatch, tmp_path):
+    _configure(monkeypatch, tmp_path)
+    path = _lexical_file(tmp_path, user_id="u1", kb_id="kb1")
+    _write_entries(
+        path,
+        [
+            {
+                "text": "特征值分解",
+                "metadata": {"doc_id": "doc-a", "kb_id": "kb1", "source": "a.txt"},
+                "tokens": ["特征值", "分解"],
+                "tokenizer_version": "v2",
+            }
+        ],
+    )
+
+    first = bm25_search("u1", "kb1", "特征值", top_k=5)
+    cached = lexical_service._BM25_CACHE[(str(path), "")]
+    bm25_search("u1", "kb1", "分解", top_k=5)
+    assert lexical_service._BM25_CACHE[(str(path), "")] is cached
+
+    lexical_service.append_lexical_chunks(
+        "u1",
+        "kb1",
+        [Document(page_content="特征值与特征向量", metadata={"doc_id": "doc-b", "kb_id": "kb1"})],
+    )
+    second = bm25_search("u1", "kb1", "特征值", top_k=5)
+
+    assert [doc.metadata.get("doc_id") for doc, _ in first] == ["doc-a"]
+    assert {doc.metadata.get("doc_id") for doc, _ in second} == {"doc-a", "doc-b"}
+
+
+def test_bm25_search_doc_filter_skips_other_documents(monkeypatch, tmp_path):
+    _configure(monkeypatch, tmp_path)
+    path = _lexical_file(tmp_path, user_id="u1", kb_id="kb1")
+    _write_entries(
+        path,
+        [
+            {
+                "text": "特征值分解",
+                "metadata": {"doc_id": "doc-a", "kb_id": "kb1", "source": "a.txt"},
+                "tokens": ["特征值", "分解"],
+                "tokenizer_version": "v2",
+            },
+            {
+                "text": "特征值估计",
+                "metadata": {"doc_id": "doc-b", "kb_id": "kb1", "source": "b.txt"},
+                "tokens": ["特征值", "估计"],
+                "tokenizer_version": "v2",
+            },
+        ],
+    )
+
+    results = bm25_search("u1", "kb1", "特征值", top_k=5, doc_id="doc-b")
+
+    assert [doc.metadata.get("doc_id") for doc, _ in results] == ["doc-b"]
+
+
+def test_doc_chunk_rewrites_keep_other_rows_verbatim(monkeypatch, tmp_path):
+    _configure(monkeypatch, tmp_path)
+    path = _lexical_file(tmp_path, user_id="u1", kb_id="kb1")
+    # doc-a is a prefix of doc-ab, so the raw byte prefilter alone must not decide membership.
+    other_line = '{"text": "保留", "metadata": {"doc_id": "doc-ab", "kb_id": "kb1"}, "tokens": ["保留"]}'
+    path.write_text(
+        "\n".join(
+            [
+                other_line,
+                json.dumps({"text": "移动", "metadata": {"doc_id": "doc-a", "kb_id": "kb1"}}, ensure_ascii=False),
+            ]
+        )
+        + "\n",
+        encoding="utf-8",
+    )
+
+    assert lexical_service.update_doc_chunks_metadata("u1", "kb1", "doc-a", source="a.txt") == 1
+    assert lexical_service.move_doc_chunks("u1", "kb1", "kb2", "doc-a") == 1
+
+    assert path.read_text(encoding="utf-8") == other_line + "\n"
+    moved = lexical_service._load_chunks("u1", "kb2")
+    assert [entry["metadata"] for entry in moved] == [{"doc_id": "doc-a", "kb_id": "kb2", "source": "a.txt"}]
+    assert lexical_service.remove_doc_chunks("u1", "kb1", "doc-a") == 0
+    assert lexical_service.remove_doc_chunks("u1", "kb1", "doc-ab") == 1
+    assert not path.exists()
+
+
+def test_append_extends_cached_index_without_rereading_file(monkeypatch, tmp_path):
+    _configure(monkeypatch, tmp_path)
+    path = _lexical_file(tmp_path, user_id="u1", kb_id="kb1")
+    _write_entries(
+        path,
+        [
+            {
+                "text": "特征值分解",
+                "metadata": {"doc_id": "doc-a", "kb_id": "kb1"},
+                "tokens": ["特征值", "分解"],
+                "tokenizer_version": "v2",
+            }
+        ],
+    )
+    bm25_search("u1", "kb1", "特征值", top_k=5)
+    bm25_search("u1", "kb1", "特征值", top_k=5, doc_id="doc-a")
+
+    lexical_service.append_lexical_chunks(
+        "u1",
+        "kb1",
+        [Document(page_content="特征值与特征向量", metadata={"doc_id": "doc-b", "kb_id": "kb1"})],
+    )
+
+    def _fail_load(*_args, **_kwargs):
+        raise AssertionError("cached index should have been extended in place")
+
+    monkeypatch.setattr(lexical_service, "_load_chunks", _fail_load)
+    extended = bm25_search("u1", "kb1", "特征向量 特征值", top_k=5)
+    filtered = bm25_search("u1", "kb1", "特征值", top_k=5, doc_id="doc-a")
+    monkeypatch.undo()
+
+    _configure(monkeypatch, tmp_path)
+    rebuilt = bm25_search("u1", "kb1", "特征向量 特征值", top_k=5)
+    assert [(doc.metadata, score) for doc, score in extended] == [(doc.metadata, score) for doc, score in rebuilt]
+    assert [doc.metadata.get("doc_id") for doc, _ in filtered] == ["doc-a"]
+
+
+def test_append_rebuilds_cached_index_outside_the_cache_lock(monkeypatch, tmp_path):
+    _configure(monkeypatch, tmp_path)
+    path = _lexical_file(tmp_path, user_id="u1", kb_id="kb1")
+    _write_entries(
+        path,
+        [
+            {
+                "text": "特征值分解",
+                "metadata": {"doc_id": "doc-a", "kb_id": "kb1"},
+                "tokens": ["特征值", "分解"],
+                "tokenizer_version": "v2",
+            }
+        ],
+    )
+    bm25_search("u1", "kb1", "特征值", top_k=5)
+    build_index = lexical_service._index_from_corpus
+    lock_states: list[bool] = []
+
+    def _checked_build(*args, **kwargs):
+        lock_states.append(lexical_service._BM25_CACHE_LOCK.locked())
+        return build_index(*args, **kwargs)
+
+    def _fail_decode(*_args, **_kwargs):
+        raise AssertionError("appended rows should not be decoded again")
+
+    monkeypatch.setattr(lexical_service, "_index_from_corpus", _checked_build)
+    monkeypatch.setattr(lexical_service, "loads_json_bytes", _fail_decode)
+    lexical_service.append_lexical_chunks(
+        "u1",
+        "kb1",
+        [Document(page_content="特征值与特征向量", metadata={"doc_id": "doc-b", "kb_id": "kb1"})],
+    )
+
+    assert lock_states == [False]
+    cached = lexical_service._BM25_CACHE[(str(path), "")]
+    assert [entry["metadata"]["doc_id"] for entry in cached.entries] == ["doc-a", "doc-b"]
+
+
+def test_bm25_search_skips_index_for_queries_without_tokens(monkeypatch, tmp_path):
+    _configure(monkeypatch, tmp_path)
+
+    def _fail_index(*_args, **_kwargs):
+        raise AssertionError("empty queries should not load the index")
+
+    monkeypatch.setattr(lexical_service, "_get_bm25_index", _fail_index)
+
+    assert bm25_search("u1", "kb1", "？！...", top_k=5) == []
+
+
+def test_bm25_cache_survives_concurrent_search_and_invalidation(monkeypatch, tmp_path):
+    _configure(monkeypatch, tmp_path)
+    monkeypatch.setattr(lexical_service, "_BM25_CACHE_MAX", 2)
+    path = _lexical_file(tmp_path, user_id="u1", kb_id="kb1")
+    doc_ids = [f"doc-{idx}" for idx in range(6)]
+    _write_entries(
+        path,
+        [
+            {
+                "text": "矩阵分解",
+                "metadata": {"doc_id": doc_id, "kb_id": "kb1"},
+                "tokens": ["矩阵", "分解"],
+                "tokenizer_version": "v2",
+            }
+            for doc_id in doc_ids
+        ],
+    )
+
+    def _work(idx: int) -> int:
+        if idx % 3 == 0:
+            lexical_service._invalidate_bm25_cache(str(path))
+            return 1
+        return len(bm25_search("u1", "kb1", "矩阵", top_k=5, doc_id=doc_ids[idx % len(doc_ids)]))
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        counts = list(pool.map(_work, range(60)))
+
+    assert counts == [1] * 60
+    assert len(lexical_service._BM25_CACHE) <= 2
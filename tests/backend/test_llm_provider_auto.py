@@ -1,9 +1,12 @@
 """Tests for provider auto-resolution in app.core.llm."""
 
+from collections import OrderedDict
+
 import pytest
 
 from app.core import llm
 from app.core.config import settings
+from app.core.runtime_user_config import reset_runtime_settings, set_runtime_settings
 
 
 @pytest.fixture(autouse=True)
@@ -79,3 +82,75 @@ def test_auto_provider_raises_clear_error_when_no_key_configured():
 
     with pytest.raises(ValueError, match="No embedding provider is available"):
         llm.resolve_embedding_provider(strict=True)
+
+
+def test_get_embeddings_reuses_client_until_config_changes(monkeypatch):
+    monkeypatch.setattr(settings, "qwen_api_key", "qwen_test_key")
+    monkeypatch.setattr(llm, "_EMBEDDINGS_CACHE", OrderedDict())
+
+    first = llm.get_embeddings()
+    assert llm.get_embeddings() is first
+
+    monkeypatch.setattr(settings, "qwen_embedding_model", "text-embedding-v3")
+    assert llm.get_embeddings() is not first
+
+
+def test_get_embeddings_evicts_least_recently_used_clients(monkeypatch):
+    monkeypatch.setattr(llm, "_EMBEDDINGS_CACHE", OrderedDict())
+    monkeypatch.setattr(llm, "_EMBEDDINGS_CACHE_MAX", 2)
+
+    monkeypatch.setattr(settings, "qwen_api_key", "user_a_key")
+    user_a = llm.get_embeddings()
+    monkeypatch.setattr(settings, "qwen_api_key", "user_b_key")
+    llm.get_embeddings()
+    monkeypatch.setattr(settings, "qwen_api_key", "user_a_key")
+    assert llm.get_embeddings() is user_a
+    monkeypatch.setattr(settings, "qwen_api_key", "user_c_key")
+    llm.get_embeddings()
+
+    assert [key[1] for key in llm._EMBEDDINGS_CACHE] == ["user_a_key", "user_c_key"]
+
+
+def test_dashscope_embeddings_keep_input_order_across_workers(monkeypatch):
+    def _fake_call(*, model, input):  # noqa: A002
+        text = input[0]["text"]
+        return {"status_code": 200, "output": {"embeddings": [{"embedding": [float(len(text))]}]}}
+
+    monkeypatch.setattr(llm.dashscope.MultiModalEmbedding, "call", _fake_call)
+    embeddings = llm.DashScopeVLEmbeddings(api_key="k", model="m")
+    texts = ["x" * size for size in range(1, 21)]
+
+    assert embeddings.embed_documents(texts) == [[float(size)] for size in range(1, 21)]
+
+
+def test_get_llm_shares_one_keepalive_http_pool(monkeypatch):
+    monkeypatch.setattr(settings, "qwen_api_key", "qwen_test_key")
+    monkeypatch.setattr(settings, "deepseek_api_key", "deepseek_test_key")
+
+    qwen_llm = llm.get_llm(temperature=0.2)
+    monkeypatch.setattr(settings, "llm_provider", "deepseek")
+    deepseek_llm = llm.get_llm(temperature=0.7)
+
+    for chat in (qwen_llm, deepseek_llm):
+        assert chat.http_client is llm._LLM_HTTP_CLIENT
+        assert chat.http_async_client is llm._LLM_HTTP_ASYNC_CLIENT
+    assert llm._LLM_HTTP_LIMITS.keepalive_expiry == 30.0
+
+
+def test_get_llm_fast_tier_uses_fast_model_only_on_deployment_endpoint(monkeypatch):
+    monkeypatch.setattr(settings, "llm_provider", "qwen")
+    monkeypatch.setattr(settings, "qwen_api_key", "qwen_test_key")
+    monkeypatch.setattr(settings, "qwen_model", "qwen-plus")
+    monkeypatch.setattr(settings, "qwen_fast_model", "qwen-turbo")
+
+    assert llm.get_llm().model_name == "qwen-plus"
+    assert llm.get_llm(tier="fast").model_name == "qwen-turbo"
+
+    token = set_runtime_settings({"qwen_base_url": "https://example.invalid/v1"})
+    try:
+        assert llm.get_llm(tier="fast").model_name == "qwen-plus"
+    finally:
+        reset_runtime_settings(token)
+
+    monkeypatch.setattr(settings, "qwen_fast_model", None)
+    assert llm.get_llm(tier="fast").model_name == "qwen-plus"
@@ -2,7 +2,16 @@ import json
 from types import SimpleNamespace
 from unittest.mock import patch
 
-from app.services.quiz_context import build_quiz_context_from_seeds
+import pytest
+
+from app.services.quiz_context import (
+    _is_similar_passage,
+    _normalize_compare,
+    _normalize_ws,
+    _shingles,
+    _visible_chars,
+    build_quiz_context_from_seeds,
+)
 
 
 def _seed(*, doc_id: str, kb_id: str, source: str, chunk: int, page: int, text: str, **meta):
@@ -222,3 +231,36 @@ def test_quiz_context_filters_dotted_and_long_latin_noise_seed():
     assert "daikocicn" not in result.text
     assert "z.nyong" not in result.text
     assert "改变生活，带来便利" in result.text
+
+
+def test_normalize_ws_collapses_blank_runs_trailing_and_inline_whitespace():
+    raw = "\x00第一行  \t\r\n\r\n \n\t\n第二  行\r第三\t行 \n"
+    assert _normalize_ws(raw) == "第一行\n\n第二 行\n第三\t行"
+    assert _normalize_ws("a\n\n  b") == "a\n\n b"
+    assert _normalize_ws(None) == ""
+
+
+def test_visible_chars_drops_unicode_whitespace():
+    assert _visible_chars("矩 阵\t变\u3000换\xa0a\u2028b\u202f\x1c") == "矩阵变换ab"
+    assert _visible_chars("\u200b") == "\u200b"
+    assert _visible_chars(None) == ""
+
+
+@pytest.mark.parametrize("use_rapidfuzz", [True, False])
+def test_is_similar_passage_flags_near_duplicates_and_keeps_distinct_text(use_rapidfuzz, monkeypatch):
+    if not use_rapidfuzz:
+        monkeypatch.setattr("app.services.quiz_context._fuzz_ratio", None)
+
+    def _compare_key(text):
+        norm = _normalize_compare(text)
+        return norm, _shingles(norm)
+
+    base = "矩阵变换的定义：通过线性映射将点从一个坐标系映射到另一个坐标系，行列式为负时图形会发生翻转。"
+    assert _is_similar_passage(*_compare_key(base), []) is False
+    seen = [_compare_key(base)]
+
+    near_dup = base.replace("翻转", "反转")
+    assert _is_similar_passage(*_compare_key(near_dup), seen) is True
+    distinct = "在二维平面中，关于 y 轴对称可由 x 坐标取相反数表示，这是一种常见的反射变换形式与应用。"
+    assert _is_similar_passage(*_compare_key(distinct), seen) is False
+    assert _is_similar_passage(*_compare_key("，。"), seen) is True
@@ -0,0 +1,17 @@
+from app.services.sampling import sample_evenly
+
+
+def test_sample_evenly_returns_all_chunks_when_under_limit():
+    chunks = ["a", "b", "c"]
+    assert sample_evenly(chunks, 5) is chunks
+
+
+def test_sample_evenly_uses_exact_integer_positions():
+    chunks = [str(i) for i in range(30)]
+
+    sampled = sample_evenly(chunks, 22)
+
+    assert len(sampled) == 22
+    # 11 * 30 / 22 == 15 exactly; float stepping used to land on chunk 14.
+    assert sampled[11] == "15"
+    assert len(set(sampled)) == len(sampled)
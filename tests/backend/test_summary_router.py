@@ -0,0 +1,103 @@
+"""Tests for summary router streaming."""
+
+import json
+from unittest.mock import patch
+
+import pytest
+
+from app.models import Document, SummaryRecord, User
+
+
+def _parse_sse_events(raw_text: str):
+    events = []
+    blocks = [block.strip() for block in raw_text.split("\n\n") if block.strip()]
+    for block in blocks:
+        event_name = None
+        data_lines = []
+        for line in block.splitlines():
+            if line.startswith("event:"):
+                event_name = line.split(":", 1)[1].strip()
+            elif line.startswith("data:"):
+                data_lines.append(line.split(":", 1)[1].strip())
+        payload = json.loads("\n".join(data_lines)) if data_lines else {}
+        events.append((event_name, payload))
+    return events
+
+
+def _read_sse(client, url, **kwargs):
+    with client.stream("POST", url, **kwargs) as resp:
+        body = "".join(resp.iter_text())
+        return resp, _parse_sse_events(body)
+
+
+@pytest.fixture
+def summary_doc(db_session, tmp_path, request):
+    suffix = request.node.name[-40:]
+    user_id = f"summary_user_{suffix}"
+    doc_id = f"summary_doc_{suffix}"
+    text_path = tmp_path / "doc.txt"
+    text_path.write_text("矩阵是按行列排列的数表。", encoding="utf-8")
+    db_session.add(User(id=user_id, username=user_id, password_hash="test_hash", name="Test"))
+    db_session.add(
+        Document(
+            id=doc_id,
+            user_id=user_id,
+            filename="doc.txt",
+            file_type="txt",
+            text_path=str(text_path),
+            num_chunks=1,
+            num_pages=1,
+            char_count=12,
+            status="ready",
+        )
+    )
+    db_session.commit()
+    return {"user_id": user_id, "doc_id": doc_id}
+
+
+async def _fake_stream(_text):
+    for delta in ["## 摘要\n", "- 矩阵定义 "]:
+        yield delta
+
+
+async def _failing_stream(_text):
+    yield "partial"
+    raise RuntimeError("llm down")
+
+
+def test_summary_stream_emits_chunks_then_saves(client, db_session, summary_doc):
+    with patch("app.routers.summary.stream_summary_text", new=_fake_stream):
+        resp, events = _read_sse(client, "/api/summary/stream", json=summary_doc)
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    names = [name for name, _ in events]
+    assert names == ["status", "chunk", "chunk", "done"]
+    assert events[-1][1] == {"doc_id": summary_doc["doc_id"], "summary": "## 摘要\n- 矩阵定义", "cached": False}
+    record = db_session.query(SummaryRecord).filter(SummaryRecord.doc_id == summary_doc["doc_id"]).one()
+    assert record.summary_text == "## 摘要\n- 矩阵定义"
+
+    _, cached_events = _read_sse(client, "/api/summary/stream", json=summary_doc)
+
+    assert cached_events == [
+        ("done", {"doc_id": summary_doc["doc_id"], "summary": "## 摘要\n- 矩阵定义", "cached": True})
+    ]
+
+
+def test_summary_stream_reports_generation_errors(client, db_session, summary_doc):
+    with patch("app.routers.summary.stream_summary_text", new=_failing_stream):
+        resp, events = _read_sse(client, "/api/summary/stream", json=summary_doc)
+
+    assert resp.status_code == 200
+    assert [name for name, _ in events] == ["status", "chunk", "error"]
+    assert events[-1][1]["code"] == "generation_failed"
+    assert db_session.query(SummaryRecord).filter(SummaryRecord.doc_id == summary_doc["doc_id"]).count() == 0
+
+
+def test_summary_stream_missing_doc_returns_404(client, summary_doc):
+    resp = client.post(
+        "/api/summary/stream",
+        json={"doc_id": "missing-doc", "user_id": summary_doc["user_id"]},
+    )
+
+    assert resp.status_code == 404
@@ -0,0 +1,242 @@
+import asyncio
+import re
+from collections import OrderedDict
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import llm_cache
+from app.services import summary as summary_service
+
+
+@pytest.fixture(autouse=True)
+def _fresh_response_cache(monkeypatch):
+    monkeypatch.setattr(llm_cache, "_RESPONSE_CACHE", OrderedDict())
+
+
+def _long_text() -> str:
+    return "".join(f"第{idx}段内容。" for idx in range(3000))
+
+
+class _FakeLLM:
+    def __init__(self, *, label_batches=True):
+        self.label_batches = label_batches
+        self.batch_calls = []
+        self.batch_inputs = []
+        self.final_messages = None
+        self.next_summary = 0
+
+    def _summary(self):
+        content = f"summary-{self.next_summary}"
+        self.next_summary += 1
+        return content
+
+    def _respond(self, messages):
+        labels = re.findall(r"^### CHUNK ([A-Z])$", messages[-1].content, re.M)
+        if not labels:
+            return self._summary()
+        if not self.label_batches:
+            return "unlabelled batch output"
+        return "\n\n".join(f"### CHUNK {label}\n{self._summary()}" for label in labels)
+
+    async def abatch(self, inputs, config=None):
+        self.batch_calls.append((len(inputs), config))
+        self.batch_inputs.append(inputs)
+        return [SimpleNamespace(content=self._respond(messages)) for messages in inputs]
+
+    async def ainvoke(self, messages):
+        self.final_messages = messages
+        return SimpleNamespace(content="  final summary  ")
+
+    async def astream(self, messages):
+        self.final_messages = messages
+        for delta in ["final ", "", "summary"]:
+            yield SimpleNamespace(content=delta)
+
+
+def test_summarize_text_batches_chunk_calls_in_order(monkeypatch):
+    fake_llm = _FakeLLM()
+    monkeypatch.setattr(summary_service, "get_llm", lambda temperature=0.2, **_kwargs: fake_llm)
+    text = _long_text()
+    chunks = summary_service._SPLITTER.split_text(text)
+    chunk_count = len(chunks)
+
+    result = asyncio.run(summary_service.summarize_text(text))
+
+    assert result == "final summary"
+    assert len(fake_llm.batch_calls) == 1
+    prompt_count, config = fake_llm.batch_calls[0]
+    assert chunk_count > summary_service._CHUNKS_PER_CALL
+    assert prompt_count == len(summary_service._chunk_groups(chunks)) < chunk_count
+    assert config == {"max_concurrency": summary_service._MAX_CONCURRENT_CHUNK_CALLS}
+    final_text = fake_llm.final_messages[-1].content
+    assert final_text.index("summary-0") < final_text.index(f"summary-{chunk_count - 1}")
+    assert "### CHUNK" not in final_text
+
+
+def test_summarize_text_retries_unparsable_batches_per_chunk(monkeypatch):
+    fake_llm = _FakeLLM(label_batches=False)
+    monkeypatch.setattr(summary_service, "get_llm", lambda temperature=0.2, **_kwargs: fake_llm)
+    monkeypatch.setattr(summary_service._SPLITTER, "split_text", lambda text: ["甲", "乙", "丙"])
+
+    asyncio.run(summary_service.summarize_text(_long_text()))
+
+    assert [size for size, _ in fake_llm.batch_calls] == [1, 3]
+    assert fake_llm.final_messages[-1].content.endswith("summary-0\n\nsummary-1\n\nsummary-2")
+
+
+def test_parse_chunk_batch_requires_every_label():
+    content = "### CHUNK A\n- 要点一\n\n### CHUNK B\n- 要点二\n"
+
+    assert summary_service._parse_chunk_batch(content, 2) == ["- 要点一", "- 要点二"]
+    assert summary_service._parse_chunk_batch(content, 3) is None
+
+
+def test_summarize_text_reduces_long_documents_in_tiers(monkeypatch):
+    fake_llm = _FakeLLM()
+    monkeypatch.setattr(summary_service, "get_llm", lambda temperature=0.2, **_kwargs: fake_llm)
+    monkeypatch.setattr(summary_service, "_REDUCE_FANOUT", 2)
+    text = _long_text()
+    chunk_count = len(summary_service._SPLITTER.split_text(text))
+
+    result = asyncio.run(summary_service.summarize_text(text))
+
+    assert result == "final summary"
+    assert chunk_count > 2
+    tier_sizes = [size for size, _ in fake_llm.batch_calls[1:]]
+    remaining = chunk_count
+    for size in tier_sizes:
+        assert size == (remaining + 1) // 2
+        remaining = size
+    assert remaining <= 2
+
+
+def test_summarize_text_reuses_cached_chunk_summaries(monkeypatch):
+    fake_llm = _FakeLLM()
+    monkeypatch.setattr(summary_service, "get_llm", lambda temperature=0.2, **_kwargs: fake_llm)
+    text = _long_text()
+
+    asyncio.run(summary_service.summarize_text(text))
+    first_final = fake_llm.final_messages[-1].content
+    fake_llm.batch_calls.clear()
+    fake_llm.final_messages = None
+
+    result = asyncio.run(summary_service.summarize_text(text))
+
+    assert result == "final summary"
+    assert fake_llm.batch_calls == []
+    assert fake_llm.final_messages[-1].content == first_final
+
+
+def test_summarize_text_calls_llm_once_per_distinct_chunk(monkeypatch):
+    fake_llm = _FakeLLM()
+    monkeypatch.setattr(summary_service, "get_llm", lambda temperature=0.2, **_kwargs: fake_llm)
+    monkeypatch.setattr(summary_service._SPLITTER, "split_text", lambda text: ["重复段落", "其他段落", "重复段落"])
+
+    asyncio.run(summary_service.summarize_text(_long_text()))
+
+    batch_prompt = fake_llm.batch_inputs[0][0][-1].content
+    assert re.findall(r"^### CHUNK ([A-Z])$", batch_prompt, re.M) == ["A", "B"]
+    assert fake_llm.final_messages[-1].content.endswith("summary-0\n\nsummary-1\n\nsummary-0")
+
+
+def test_chunk_prompts_share_a_static_prefix(monkeypatch):
+    fake_llm = _FakeLLM()
+    monkeypatch.setattr(summary_service, "get_llm", lambda temperature=0.2, **_kwargs: fake_llm)
+    monkeypatch.setattr(
+        summary_service._SPLITTER, "split_text", lambda text: [f"片段{idx}" for idx in range(9)]
+    )
+
+    asyncio.run(summary_service.summarize_text(_long_text()))
+
+    # Two batched prompts and one single-chunk prompt all open with the same text.
+    assert ["### CHUNK A\n" in messages[1].content for messages in fake_llm.batch_inputs[0]] == [True, True, False]
+    for messages in fake_llm.batch_inputs[0]:
+        assert messages[0].content == summary_service.SUMMARY_SYSTEM
+        assert messages[1].content.startswith(summary_service._CHUNK_INSTRUCTIONS)
+
+
+def test_summarize_text_maps_every_chunk_past_the_old_cap(monkeypatch):
+    fake_llm = _FakeLLM()
+    monkeypatch.setattr(summary_service, "get_llm", lambda temperature=0.2, **_kwargs: fake_llm)
+    segments = [f"片段{idx}" for idx in range(130)]
+    segments[125] = "越界标记"
+    monkeypatch.setattr(summary_service._SPLITTER, "split_text", lambda text: segments)
+
+    asyncio.run(summary_service.summarize_text(_long_text()))
+
+    prompt_text = "\n".join(messages[-1].content for messages in fake_llm.batch_inputs[0])
+    assert "越界标记" in prompt_text
+    assert all(segment in prompt_text for segment in segments)
+    # 130 map summaries are reduced in a tier of 7 prompts before the final call.
+    assert len(fake_llm.batch_inputs) == 2
+    assert len(fake_llm.batch_inputs[1]) == 7
+
+
+def test_summarize_text_keeps_map_prompts_bounded_for_huge_documents(monkeypatch):
+    fake_llm = _FakeLLM()
+    monkeypatch.setattr(summary_service, "get_llm", lambda temperature=0.2, **_kwargs: fake_llm)
+    size = summary_service._SUMMARY_CHUNK_SIZE
+    segments = [f"{idx}" * size for idx in range(10)]
+    monkeypatch.setattr(summary_service._SPLITTER, "split_text", lambda text: segments)
+
+    asyncio.run(summary_service.summarize_text(_long_text()))
+
+    map_prompts = [messages[-1].content for messages in fake_llm.batch_inputs[0]]
+    assert fake_llm.next_summary == 10
+    assert len(map_prompts) == 5
+    for prompt in map_prompts:
+        chunk_text = prompt.split("### CHUNK A\n", 1)[1]
+        assert len(chunk_text) <= summary_service._CHUNK_BATCH_MAX_CHARS + 20
+
+
+def test_stream_summary_text_yields_final_deltas(monkeypatch):
+    fake_llm = _FakeLLM()
+    monkeypatch.setattr(summary_service, "get_llm", lambda temperature=0.2, **_kwargs: fake_llm)
+
+    async def _collect():
+        return [delta async for delta in summary_service.stream_summary_text(_long_text())]
+
+    deltas = asyncio.run(_collect())
+
+    assert deltas == ["final ", "summary"]
+    assert len(fake_llm.batch_calls) == 1
+    assert "summary-0" in fake_llm.final_messages[-1].content
+
+
+def test_summarize_text_uses_one_call_for_short_documents(monkeypatch):
+    fake_llm = _FakeLLM()
+    monkeypatch.setattr(summary_service, "get_llm", lambda temperature=0.2, **_kwargs: fake_llm)
+
+    result = asyncio.run(summary_service.summarize_text("矩阵是按行列排列的数表。"))
+
+    assert result == "final summary"
+    assert fake_llm.batch_calls == []
+    assert fake_llm.final_messages[-1].content.endswith("文档内容：\n矩阵是按行列排列的数表。")
+
+
+def test_summary_chunks_do_not_repeat_overlapping_text():
+    text = _long_text()
+
+    chunks = summary_service._SPLITTER.split_text(text)
+
+    assert len(chunks) > 1
+    assert sum(len(chunk) for chunk in chunks) <= len(text)
+
+
+def test_summarize_text_runs_map_step_on_fast_tier(monkeypatch):
+    map_llm = _FakeLLM()
+    reduce_llm = _FakeLLM()
+    monkeypatch.setattr(
+        summary_service,
+        "get_llm",
+        lambda temperature=0.2, tier="quality": map_llm if tier == "fast" else reduce_llm,
+    )
+
+    result = asyncio.run(summary_service.summarize_text(_long_text()))
+
+    assert result == "final summary"
+    assert len(map_llm.batch_calls) == 1
+    assert reduce_llm.batch_calls == []
+    assert map_llm.final_messages is None
+    assert "summary-0" in reduce_llm.final_messages[-1].content
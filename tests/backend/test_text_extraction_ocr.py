@@ -1,10 +1,17 @@
 from __future__ import annotations
 
+import hashlib
+import sys
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Any
 
 import pytest
 
+from app.core.runtime_user_config import reset_runtime_settings, set_runtime_settings
 from app.services import text_extraction as te
 
 
@@ -50,9 +57,122 @@ class _RaisingEngine:
 @pytest.fixture(autouse=True)
 def _reset_ocr_state(monkeypatch: pytest.MonkeyPatch):
     monkeypatch.setattr(te, "_OCR_ENGINES", {})
+    # Most tests fake pdfplumber.open; only the PyMuPDF tests switch the legacy backend back.
+    monkeypatch.setattr(te.settings, "pdf_legacy_backend", "pdfplumber")
     monkeypatch.setattr(te, "_UNKNOWN_OCR_ENGINE_WARNED", set())
 
 
+def test_rapidocr_model_loads_once_under_concurrent_extraction(monkeypatch: pytest.MonkeyPatch):
+    loads: list[int] = []
+
+    class _SlowRapidOCR:
+        def __init__(self) -> None:
+            time.sleep(0.05)
+            loads.append(1)
+
+    monkeypatch.setitem(sys.modules, "rapidocr_onnxruntime", types.SimpleNamespace(RapidOCR=_SlowRapidOCR))
+
+    def _load(_):
+        return te._get_ocr_engine("rapidocr")._get_engine()
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        models = list(pool.map(_load, range(8)))
+
+    assert len(loads) == 1
+    assert all(model is models[0] for model in models)
+
+
+def test_page_text_quality_metrics_counts_symbols_and_latin_letters():
+    metrics = te._page_text_quality_metrics("矩阵 A_1\u3000+\n\u212a\n")
+
+    assert metrics["visible_len"] == 7.0
+    assert metrics["line_count"] == 2.0
+    assert metrics["avg_line_len"] == 3.5
+    assert metrics["single_char_line_ratio"] == 0.5
+    assert metrics["symbol_ratio"] == pytest.approx(2 / 7)
+    assert metrics["latin_ratio"] == pytest.approx(2 / 7)
+
+
+def test_score_page_text_quality_reuses_metrics_for_repeated_text(monkeypatch: pytest.MonkeyPatch):
+    calls: list[str] = []
+    original_metrics = te._page_text_quality_metrics
+
+    def _counting_metrics(page_text: str) -> dict[str, float]:
+        calls.append(page_text)
+        return original_metrics(page_text)
+
+    te._score_page_text_quality.cache_clear()
+    monkeypatch.setattr(te, "_page_text_quality_metrics", _counting_metrics)
+    text = "线性代数复习提纲\n矩阵的秩与线性方程组"
+
+    first = te._score_page_text_quality(text)
+    second = te._score_page_text_quality(text)
+
+    assert first == second
+    assert calls == [text]
+
+
+def test_parse_rapidocr_output_sorts_lines_in_reading_order():
+    np = pytest.importorskip("numpy")
+    output = [
+        [[[60, 40], [90, 40], [90, 50], [60, 50]], "第三行", 0.8],
+        [np.array([[50, 10], [80, 10], [80, 20], [50, 20]]), "第一行右", 90],
+        [[[5, 10], [40, 10], [40, 20], [5, 20]], "第一行左", 0.9],
+    ]
+
+    lines, confidences = te._parse_rapidocr_output(output)
+
+    assert lines == ["第一行左", "第一行右", "第三行"]
+    assert confidences == pytest.approx([0.9, 0.9, 0.8])
+
+
+def test_parse_rapidocr_output_falls_back_to_row_keys_for_ragged_boxes():
+    output = [
+        [[[60, 40], [90, 40], [90, 50], [60, 50]], "有框", 0.8],
+        ["无框", 0.7],
+    ]
+
+    lines, confidences = te._parse_rapidocr_output(output)
+
+    assert lines == ["无框", "有框"]
+    assert confidences == pytest.approx([0.7, 0.8])
+
+
+def test_is_low_text_page_ignores_only_surrounding_whitespace():
+    assert te._is_low_text_page("", 1)
+    assert te._is_low_text_page("  矩阵  \n", 3)
+    assert not te._is_low_text_page("  矩阵 定义  \n", 4)
+    assert not te._is_low_text_page("矩阵的定义", 5)
+    assert te._is_low_text_page("矩阵的定义", 6)
+
+
+@pytest.mark.parametrize(
+    ("raw_conf", "expected"),
+    [
+        ([-1, 96, 0.5, 150, "-1", "84"], (0.96 + 0.5 + 1.0 + 0.84) / 4),
+        (["", "90", None, -1, "70"], 0.8),
+        ([-1, "-1"], None),
+    ],
+)
+def test_extract_tesseract_avg_confidence_normalizes_word_scores(
+    monkeypatch: pytest.MonkeyPatch,
+    raw_conf: list[Any],
+    expected: float | None,
+):
+    fake_pytesseract = types.SimpleNamespace(
+        Output=types.SimpleNamespace(DICT="dict"),
+        image_to_data=lambda image, lang, output_type: {"conf": raw_conf},
+    )
+    monkeypatch.setitem(sys.modules, "pytesseract", fake_pytesseract)
+
+    result = te._extract_tesseract_avg_confidence(object(), "chi_sim")
+
+    if expected is None:
+        assert result is None
+    else:
+        assert result == pytest.approx(expected)
+
+
 def test_get_tesseract_language_prefers_new_setting(monkeypatch: pytest.MonkeyPatch):
     monkeypatch.setattr(te.settings, "ocr_language", "chi_sim+eng")
     monkeypatch.setattr(te.settings, "ocr_tesseract_language", "eng")
@@ -207,14 +327,14 @@ def test_extract_pdf_does_not_invoke_ocr_when_text_layer_is_sufficient(monkeypat
 
     def _unexpected_ocr(
         file_path: str,
-        page_num: int,
+        page_nums: list[int],
         *,
-        trigger_reasons: list[str] | None = None,
-    ) -> te.OcrPageResult:  # noqa: ARG001
-        called_pages.append(page_num)
-        return te.OcrPageResult(text="should-not-happen", engine="rapidocr")
+        page_reasons: dict[int, list[str]],
+    ) -> list[te.OcrPageResult]:  # noqa: ARG001
+        called_pages.extend(page_nums)
+        return [te.OcrPageResult(text="should-not-happen", engine="rapidocr") for _ in page_nums]
 
-    monkeypatch.setattr(te, "_ocr_page", _unexpected_ocr)
+    monkeypatch.setattr(te, "_ocr_page_run", _unexpected_ocr)
 
     result = te._extract_pdf("dummy.pdf")
 
@@ -237,8 +357,8 @@ def test_extract_pdf_scanned_pdf_replaces_low_quality_text_with_ocr(monkeypatch:
     }
     monkeypatch.setattr(
         te,
-        "_ocr_page",
-        lambda file_path, page_num, *, trigger_reasons=None: ocr_map[page_num],
+        "_ocr_page_run",
+        lambda file_path, page_nums, *, page_reasons: [ocr_map[page_num] for page_num in page_nums],
     )
 
     result = te._extract_pdf("scanned.pdf")
@@ -247,6 +367,222 @@ def test_extract_pdf_scanned_pdf_replaces_low_quality_text_with_ocr(monkeypatch:
     assert result.text == "第一页 OCR 内容\n\n第二页 OCR 内容"
 
 
+def test_ocr_repair_releases_page_score_cache(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(te.pdfplumber, "open", lambda path: _FakePdf(["这是一段足够长的文本内容，用来保留文本层。", ""]))
+    monkeypatch.setattr(te.settings, "ocr_enabled", True)
+    monkeypatch.setattr(te.settings, "ocr_min_text_length", 10)
+    monkeypatch.setattr(
+        te,
+        "_ocr_page_run",
+        lambda file_path, page_nums, *, page_reasons: [
+            te.OcrPageResult(text="第二页 OCR 内容", engine="rapidocr", avg_confidence=0.9) for _ in page_nums
+        ],
+    )
+
+    result = te._extract_pdf("mixed.pdf")
+
+    assert result.pages[1] == "第二页 OCR 内容"
+    assert te._score_page_text_quality.cache_info().currsize == 0
+
+
+class _FakeImage:
+    def __init__(self, path: str):
+        self.path = path
+        self.closed = False
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def test_extract_pdf_ocrs_page_runs_in_parallel_and_keeps_page_order(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(te.pdfplumber, "open", lambda path: _FakePdf([""] * 6))
+    monkeypatch.setattr(te.settings, "ocr_enabled", True)
+    monkeypatch.setattr(te.settings, "ocr_min_text_length", 10)
+    monkeypatch.setattr(te.settings, "ocr_max_workers", 3)
+    barrier = threading.Barrier(3, timeout=5)
+    rendered: list[tuple[int, int, Any]] = []
+    images: list[_FakeImage] = []
+
+    def _render(file_path, first_page, last_page, output_folder):  # noqa: ANN001, ARG001
+        rendered.append((first_page, last_page, te.settings.ocr_render_dpi))
+        return [f"{output_folder}/page-{num}.ppm" for num in range(first_page, last_page + 1)]
+
+    def _load(image_path):  # noqa: ANN001
+        images.append(_FakeImage(image_path))
+        return images[-1]
+
+    def _recognize(image, page_num, *, trigger_reasons=None):  # noqa: ANN001, ARG001
+        barrier.wait()
+        time.sleep(0.01 * (6 - page_num))
+        return te.OcrPageResult(text=f"第{page_num}页 OCR 内容", engine="rapidocr", avg_confidence=0.9)
+
+    monkeypatch.setattr(te, "_render_pdf_pages_for_ocr", _render)
+    monkeypatch.setattr(te, "_load_rendered_page_for_ocr", _load)
+    monkeypatch.setattr(te, "_run_ocr_with_fallbacks", _recognize)
+    token = set_runtime_settings({"ocr_render_dpi": 150})
+    try:
+        result = te._extract_pdf("scanned.pdf")
+    finally:
+        reset_runtime_settings(token)
+
+    assert result.pages == [f"第{num}页 OCR 内容" for num in range(1, 7)]
+    assert sorted(rendered) == [(1, 2, 150), (3, 4, 150), (5, 6, 150)]
+    assert len(images) == 6
+    assert all(image.closed for image in images)
+
+
+def test_ocr_page_run_keeps_completed_pages_when_one_page_fails(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(
+        te,
+        "_render_pdf_pages_for_ocr",
+        lambda file_path, first, last, output_folder: [f"page-{num}" for num in range(first, last + 1)],
+    )
+    monkeypatch.setattr(te, "_load_rendered_page_for_ocr", _FakeImage)
+
+    def _recognize(image, page_num, *, trigger_reasons=None):  # noqa: ANN001, ARG001
+        if page_num == 2:
+            raise RuntimeError("tesseract crashed")
+        return te.OcrPageResult(text=f"第{page_num}页 OCR 内容", engine="rapidocr", avg_confidence=0.9)
+
+    monkeypatch.setattr(te, "_run_ocr_with_fallbacks", _recognize)
+
+    results = te._ocr_page_run("mixed.pdf", [1, 2, 3], page_reasons={num: ["low_text"] for num in (1, 2, 3)})
+
+    assert [result.text for result in results] == ["第1页 OCR 内容", "", "第3页 OCR 内容"]
+    assert [result.failed for result in results] == [False, True, False]
+    with pytest.raises(RuntimeError):
+        te._ocr_page_run("scanned.pdf", [1, 2, 3], page_reasons={num: ["scanned_pdf"] for num in (1, 2, 3)})
+
+
+def test_parallel_ocr_runs_do_not_enter_a_shared_engine_concurrently(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(te.pdfplumber, "open", lambda path: _FakePdf([""] * 4))
+    monkeypatch.setattr(te.settings, "ocr_enabled", True)
+    monkeypatch.setattr(te.settings, "ocr_min_text_length", 10)
+    monkeypatch.setattr(te.settings, "ocr_max_workers", 2)
+    monkeypatch.setattr(
+        te,
+        "_render_pdf_pages_for_ocr",
+        lambda file_path, first, last, output_folder: [f"page-{num}" for num in range(first, last + 1)],
+    )
+    monkeypatch.setattr(te, "_load_rendered_page_for_ocr", _FakeImage)
+    monkeypatch.setattr(te, "_get_ocr_engine_chain_names", lambda: ["rapidocr"])
+    monkeypatch.setattr(te, "_preprocess_ocr_image", lambda image: image)
+
+    class _NonReentrantEngine:
+        def __init__(self) -> None:
+            self.active = 0
+            self.overlaps = 0
+
+        def ocr_page(self, image: Any) -> te.OcrPageResult:
+            self.active += 1
+            if self.active > 1:
+                self.overlaps += 1
+            time.sleep(0.02)
+            self.active -= 1
+            return te.OcrPageResult(text=f"{image.path} 的 OCR 内容", engine="rapidocr", avg_confidence=0.95)
+
+    engine = _NonReentrantEngine()
+    monkeypatch.setattr(te, "_OCR_ENGINES", {"rapidocr": engine})
+
+    result = te._extract_pdf("scanned.pdf")
+
+    assert engine.overlaps == 0
+    assert result.pages == [f"page-{num} 的 OCR 内容" for num in range(1, 5)]
+
+
+def test_preprocess_ocr_image_binarizes_without_touching_rendered_page(monkeypatch: pytest.MonkeyPatch):
+    np = pytest.importorskip("numpy")
+    pytest.importorskip("cv2")
+    from PIL import Image
+
+    monkeypatch.setattr(te.settings, "ocr_preprocess_enabled", True)
+    monkeypatch.setattr(te.settings, "ocr_deskew_enabled", False)
+    pixels = np.full((40, 60, 3), 230, dtype=np.uint8)
+    pixels[10:30, 10:50] = 30
+    image = Image.fromarray(pixels)
+
+    processed = te._preprocess_ocr_image(image)
+
+    assert processed.mode == "L"
+    assert set(np.unique(np.asarray(processed)).tolist()) == {0, 255}
+    assert np.asarray(processed)[20, 20] == 0
+    assert np.array_equal(np.asarray(image), pixels)
+
+
+def test_split_ocr_page_runs_groups_consecutive_pages():
+    assert te._split_ocr_page_runs([1, 2, 3, 5, 6, 9], 2) == [[1, 2], [3], [5, 6], [9]]
+
+
+def _write_text_pdf(path, page_texts: list[str]) -> None:  # noqa: ANN001
+    fitz = pytest.importorskip("fitz")
+    doc = fitz.open()
+    for text in page_texts:
+        page = doc.new_page()
+        page.insert_text((72, 72), text)
+    doc.save(str(path))
+    doc.close()
+
+
+def test_extract_pdf_legacy_reads_text_with_pymupdf(monkeypatch: pytest.MonkeyPatch, tmp_path):
+    pdf_path = tmp_path / "notes.pdf"
+    _write_text_pdf(pdf_path, ["Matrix rank and linear systems", "Eigenvalues and eigenvectors"])
+    monkeypatch.setattr(te.settings, "ocr_enabled", False)
+    monkeypatch.setattr(te.settings, "pdf_legacy_backend", "pymupdf")
+
+    def _unexpected_pdfplumber(path):  # noqa: ANN001
+        raise AssertionError("pdfplumber should not be used when PyMuPDF succeeds")
+
+    monkeypatch.setattr(te.pdfplumber, "open", _unexpected_pdfplumber)
+
+    result = te._extract_pdf_legacy(str(pdf_path))
+
+    assert result.page_count == 2
+    assert result.pages == ["Matrix rank and linear systems", "Eigenvalues and eigenvectors"]
+
+
+def test_extract_pdf_legacy_falls_back_to_pdfplumber(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(te.settings, "ocr_enabled", False)
+    monkeypatch.setattr(te.settings, "pdf_legacy_backend", "pymupdf")
+    monkeypatch.setattr(te.pdfplumber, "open", lambda path: _FakePdf(["第一页正文内容", "第二页正文内容"]))
+
+    result = te._extract_pdf_legacy("missing.pdf")
+
+    assert result.page_count == 2
+    assert result.text == "第一页正文内容\n\n第二页正文内容"
+
+
+def test_extract_pdf_auto_skips_pymupdf_after_layout_failure(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(te.settings, "ocr_enabled", False)
+    monkeypatch.setattr(te.settings, "pdf_parser_mode", "auto")
+    monkeypatch.setattr(te.settings, "pdf_legacy_backend", "pymupdf")
+
+    def _broken_layout(file_path, **kwargs):  # noqa: ANN001, ARG001
+        raise RuntimeError("damaged xref")
+
+    def _unexpected_pymupdf(file_path):  # noqa: ANN001
+        raise AssertionError("PyMuPDF already failed in the layout parser")
+
+    monkeypatch.setattr(te, "extract_pdf_layout", _broken_layout)
+    monkeypatch.setattr(te, "_read_pdf_pages_pymupdf", _unexpected_pymupdf)
+    monkeypatch.setattr(te.pdfplumber, "open", lambda path: _FakePdf(["第一页正文内容"]))
+
+    result = te._extract_pdf("damaged.pdf")
+
+    assert result.pages == ["第一页正文内容"]
+
+
+def test_extract_pdf_legacy_pdfplumber_splits_pages_across_processes(monkeypatch: pytest.MonkeyPatch, tmp_path):
+    pdf_path = tmp_path / "notes.pdf"
+    page_texts = [f"Section {idx} covers matrix rank" for idx in range(1, 6)]
+    _write_text_pdf(pdf_path, page_texts)
+    monkeypatch.setattr(te.settings, "ocr_enabled", False)
+    monkeypatch.setattr(te.settings, "pdf_legacy_workers", 2)
+
+    result = te._extract_pdf_legacy(str(pdf_path))
+
+    assert result.pages == page_texts
+
+
 def test_extract_pdf_scanned_pdf_with_ocr_disabled_does_not_call_ocr(monkeypatch: pytest.MonkeyPatch):
     monkeypatch.setattr(te.pdfplumber, "open", lambda path: _FakePdf(["", ""]))
     monkeypatch.setattr(te.settings, "ocr_enabled", False)
@@ -255,13 +591,13 @@ def test_extract_pdf_scanned_pdf_with_ocr_disabled_does_not_call_ocr(monkeypatch
 
     def _unexpected_ocr(
         file_path: str,
-        page_num: int,
+        page_nums: list[int],
         *,
-        trigger_reasons: list[str] | None = None,
+        page_reasons: dict[int, list[str]],
     ):  # noqa: ANN001, ARG001
         raise AssertionError("OCR should not be called when disabled")
 
-    monkeypatch.setattr(te, "_ocr_page", _unexpected_ocr)
+    monkeypatch.setattr(te, "_ocr_page_run", _unexpected_ocr)
 
     result = te._extract_pdf("scanned.pdf")
 
@@ -306,3 +642,91 @@ def test_pick_page_text_after_ocr_fallbacks_when_garbled_ocr_is_too_short(monkey
 
     assert chosen == original_text
     assert reason == "garbled_force_fallback_short_ocr"
+
+
+def test_extract_text_pdf_reuses_content_hash_cache(monkeypatch: pytest.MonkeyPatch, tmp_path):
+    monkeypatch.setattr(te.settings, "data_dir", str(tmp_path))
+    monkeypatch.setattr(te.settings, "pdf_extraction_cache_enabled", True)
+    block = te.ExtractedBlock(block_id="p1:t1", kind="text", page=1, bbox=[0.0, 0.0, 1.0, 1.0], text="正文")
+    expected = te.ExtractionResult(
+        text="正文",
+        page_count=1,
+        pages=["正文"],
+        blocks=[block],
+        page_blocks=[te.PageLayoutResult(page=1, text_blocks=[block], ordered_blocks=[block], text_quality_score=0.9)],
+        sidecar={"version": 1, "pages": []},
+    )
+    calls: list[str] = []
+
+    def _fake_extract_pdf(file_path: str, **kwargs: Any) -> te.ExtractionResult:  # noqa: ARG001
+        calls.append(file_path)
+        return expected
+
+    monkeypatch.setattr(te, "_extract_pdf", _fake_extract_pdf)
+    first_path = tmp_path / "a.pdf"
+    renamed_path = tmp_path / "b.pdf"
+    first_path.write_bytes(b"%PDF-1.4 same bytes")
+    renamed_path.write_bytes(b"%PDF-1.4 same bytes")
+
+    first = te.extract_text(str(first_path), ".pdf")
+    second = te.extract_text(str(renamed_path), ".pdf")
+
+    def _no_rehash(_file_path: str) -> str:
+        raise AssertionError("known upload hash should be reused")
+
+    monkeypatch.setattr(te, "_file_sha256", _no_rehash)
+    known_hash = hashlib.sha256(b"%PDF-1.4 same bytes").hexdigest()
+    third = te.extract_text(str(renamed_path), ".pdf", file_hash=known_hash)
+
+    assert calls == [str(first_path)]
+    assert first == expected
+    assert second == expected
+    assert third == expected
+
+    fourth = te.extract_text(str(renamed_path), ".pdf", file_hash=known_hash, refresh_cache=True)
+
+    assert calls == [str(first_path), str(renamed_path)]
+    assert fourth == expected
+    assert te.remove_pdf_extraction_cache(known_hash) == 1
+    assert not list((tmp_path / "cache" / "pdf_extraction").iterdir())
+
+
+def test_extract_text_pdf_skips_cache_write_after_ocr_failure(monkeypatch: pytest.MonkeyPatch, tmp_path):
+    monkeypatch.setattr(te.settings, "data_dir", str(tmp_path))
+    monkeypatch.setattr(te.settings, "pdf_extraction_cache_enabled", True)
+    monkeypatch.setattr(te.settings, "pdf_parser_mode", "legacy")
+    monkeypatch.setattr(te.pdfplumber, "open", lambda path: _FakePdf(["这是一段足够长的正文内容，不需要 OCR。", ""]))
+    monkeypatch.setattr(te.settings, "ocr_enabled", True)
+    monkeypatch.setattr(te.settings, "ocr_min_text_length", 10)
+    calls: list[list[int]] = []
+
+    def _failing_ocr(file_path, page_nums, *, page_reasons):  # noqa: ANN001, ARG001
+        calls.append(page_nums)
+        raise RuntimeError("poppler missing")
+
+    monkeypatch.setattr(te, "_ocr_page_run", _failing_ocr)
+    pdf_path = tmp_path / "partial.pdf"
+    pdf_path.write_bytes(b"%PDF-1.4 partial")
+
+    first = te.extract_text(str(pdf_path), ".pdf")
+    second = te.extract_text(str(pdf_path), ".pdf")
+
+    assert first.ocr_failed_pages == [2]
+    assert second.ocr_failed_pages == [2]
+    assert calls == [[2], [2]]
+    assert not (tmp_path / "cache" / "pdf_extraction").exists()
+
+
+def test_pdf_extraction_cache_key_ignores_concurrency_settings(monkeypatch: pytest.MonkeyPatch, tmp_path):
+    monkeypatch.setattr(te.settings, "data_dir", str(tmp_path))
+    monkeypatch.setattr(te.settings, "pdf_extraction_cache_enabled", True)
+    monkeypatch.setattr(te.settings, "ocr_max_workers", 1)
+    monkeypatch.setattr(te.settings, "pdf_legacy_workers", 1)
+    base = te._pdf_extraction_cache_path("unused.pdf", "abc")
+
+    monkeypatch.setattr(te.settings, "ocr_max_workers", 8)
+    monkeypatch.setattr(te.settings, "pdf_legacy_workers", 4)
+    assert te._pdf_extraction_cache_path("unused.pdf", "abc") == base
+
+    monkeypatch.setattr(te.settings, "ocr_render_dpi", 123)
+    assert te._pdf_extraction_cache_path("unused.pdf", "abc") != base
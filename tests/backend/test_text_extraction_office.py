@@ -1,7 +1,10 @@
+import sys
+import types
 from pathlib import Path
 
 import pytest
 
+from app.services import text_extraction as te
 from app.services.text_extraction import extract_text
 
 
@@ -87,3 +90,50 @@ def test_extract_text_pptx_empty_slides_return_empty_text(tmp_path: Path):
     assert result.page_count == 1
     assert result.pages == [""]
     assert result.text == ""
+
+
+def test_extract_text_txt_sniffs_encoding_from_file_head(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    lines = [f"第{idx}节：矩阵的秩与线性方程组的解。" for idx in range(8000)]
+    file_path = tmp_path / "notes.txt"
+    file_path.write_bytes("\n".join(lines).encode("gb18030"))
+    sampled: list[int] = []
+    detect = te._detect_encoding
+
+    def _recording_detect(data: bytes):
+        sampled.append(len(data))
+        return detect(data)
+
+    monkeypatch.setattr(te, "_detect_encoding", _recording_detect)
+
+    result = extract_text(str(file_path), ".txt")
+
+    assert result.encoding == "gb18030"
+    assert result.text == "\n".join(lines)
+    assert sampled and all(size <= te._ENCODING_SNIFF_BYTES for size in sampled)
+
+
+@pytest.mark.parametrize(
+    ("detector", "cchardet_result", "expected"),
+    [
+        ("auto", {"encoding": "GB18030", "confidence": 0.99}, "gb18030"),
+        ("auto", {"encoding": "ISO-8859-1", "confidence": 0.2}, "from-charset-normalizer"),
+        ("cchardet", {"encoding": "ISO-8859-1", "confidence": 0.2}, None),
+        ("charset_normalizer", {"encoding": "GB18030", "confidence": 0.99}, "from-charset-normalizer"),
+    ],
+)
+def test_detect_encoding_prefers_confident_cchardet(
+    monkeypatch: pytest.MonkeyPatch,
+    detector: str,
+    cchardet_result: dict,
+    expected: str | None,
+):
+    monkeypatch.setitem(sys.modules, "cchardet", types.SimpleNamespace(detect=lambda data: cchardet_result))
+    fake_match = types.SimpleNamespace(encoding="from-charset-normalizer")
+    monkeypatch.setitem(
+        sys.modules,
+        "charset_normalizer",
+        types.SimpleNamespace(from_bytes=lambda data: types.SimpleNamespace(best=lambda: fake_match)),
+    )
+    monkeypatch.setattr(te.settings, "text_encoding_detector", detector)
+
+    assert te._detect_encoding("矩阵".encode("gb18030")) == expected
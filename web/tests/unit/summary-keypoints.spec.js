@@ -6,7 +6,7 @@ import { createRouter, createMemoryHistory } from 'vue-router'
 
 import App from '@/App.vue'
 import { routes } from '@/router'
-import { apiGet, apiPost, getSettings, authMe, getSystemProviderSettings, getSystemSettings } from '@/api'
+import { apiGet, apiPost, apiSsePost, getSettings, authMe, getSystemProviderSettings, getSystemSettings } from '@/api'
 import {
   buildProviderConfigResponse,
   buildSettingsResponse,
@@ -19,6 +19,7 @@ vi.mock('@/api', async (importOriginal) => {
     ...actual,
     apiGet: vi.fn(),
     apiPost: vi.fn(),
+    apiSsePost: vi.fn(),
     getSettings: vi.fn(),
     authMe: vi.fn(),
     getSystemSettings: vi.fn(),
@@ -168,8 +169,13 @@ beforeEach(() => {
     return Promise.resolve({})
   })
 
+  apiSsePost.mockImplementation(async (path, _body, handlers = {}) => {
+    if (path === '/api/summary/stream') {
+      handlers.onChunk?.({ delta: 'ok' })
+      handlers.onDone?.({ summary: 'ok', cached: false })
+    }
+  })
   apiPost.mockImplementation((path) => {
-    if (path === '/api/summary') return Promise.resolve({ summary: 'ok', cached: false })
     if (path === '/api/keypoints') {
       return Promise.resolve({
         keypoints: [{ text: 'k1', explanation: 'explanation for k1', page: 1 }],
@@ -195,9 +201,10 @@ describe('Summary/Keypoints payloads', () => {
     expect(summarizeBtn).toBeTruthy()
     await summarizeBtn.trigger('click')
 
-    expect(apiPost).toHaveBeenCalledWith(
-      '/api/summary',
-      expect.objectContaining({ force: false })
+    expect(apiSsePost).toHaveBeenCalledWith(
+      '/api/summary/stream',
+      expect.objectContaining({ force: false }),
+      expect.any(Object)
     )
   }, 10000)
 